@@ -0,0 +1,73 @@
+# Performance profiles of common USB serial adapters. debugWIRE needs many small round trips, so
+# the time an adapter holds on to received data before sending it to the host matters more than
+# anything else. FTDI chips wait for 16ms by default.
+
+import sys
+from collections import namedtuple
+
+AdapterProfile = namedtuple("AdapterProfile", [
+    # human readable name
+    "name",
+    # interface to use when picked automatically, see preferred_backend
+    "backend",
+    # latency timer in milliseconds to set if the adapter has one, None to leave it alone
+    "latency_timer",
+    # how long to hold a break and wait for the sync byte after it
+    "break_time",
+    # fastest rate the adapter can use, None if unknown
+    "max_baudrate",
+    # USB transfer size to use with libftdi, None for the default
+    "transfer_size",
+])
+
+# How long adapters hold on to received data when their latency timer is left alone or can't be
+# set, 16ms is the default of FTDI, CH340 and CP210x parts
+DEFAULT_LATENCY = 0.016
+
+GENERIC = AdapterProfile("USB serial adapter", "serial", None, 0.002, None, None)
+
+# keyed by USB (vendor ID, product ID)
+PROFILES = {
+    (0x0403, 0x6001): AdapterProfile("FTDI FT232R", "ftdi", 1, 0.002, 3000000, 512),
+    (0x0403, 0x6010): AdapterProfile("FTDI FT2232", "ftdi", 1, 0.002, 3000000, 512),
+    (0x0403, 0x6011): AdapterProfile("FTDI FT4232", "ftdi", 1, 0.002, 3000000, 512),
+    (0x0403, 0x6014): AdapterProfile("FTDI FT232H", "ftdi", 1, 0.002, 3000000, 512),
+    (0x0403, 0x6015): AdapterProfile("FTDI FT-X", "ftdi", 1, 0.002, 3000000, 512),
+    (0x1a86, 0x7523): AdapterProfile("WCH CH340", "serial", None, 0.003, 2000000, None),
+    (0x1a86, 0x55d4): AdapterProfile("WCH CH9102", "serial", None, 0.003, 3000000, None),
+    (0x10c4, 0xea60): AdapterProfile("Silicon Labs CP210x", "serial", None, 0.002, 921600, None),
+    (0x067b, 0x2303): AdapterProfile("Prolific PL2303", "serial", None, 0.003, 1228800, None),
+}
+
+def find_profile(vid, pid):
+    """Returns the profile of the adapter with the given USB IDs, or GENERIC if it's unknown."""
+
+    return PROFILES.get((vid, pid), GENERIC)
+
+def find_profile_by_name(name):
+    """Returns the profile with the given name, or GENERIC if there is none."""
+
+    return next((p for p in PROFILES.values() if p.name == name), GENERIC)
+
+def usb_port_info(port):
+    """Returns the pySerial port info of a USB serial port, or None if it's not a USB device."""
+
+    from serial.tools.list_ports import comports
+
+    return next((p for p in comports() if p.device == port and p.vid), None)
+
+def preferred_backend(profile):
+    """Returns the name of the fastest available interface for an adapter."""
+
+    if profile.backend == "ftdi":
+        # the Linux driver sets the latency timer to 1ms in low latency mode, which is as fast as
+        # libftdi and keeps the port usable as a normal serial port
+        if sys.platform.startswith("linux"):
+            return "serial"
+
+        try:
+            import pylibftdi
+        except ImportError:
+            return "serial"
+
+    return profile.backend
@@ -0,0 +1,505 @@
+# asyncio versions of the serial interface and DebugWire. Nothing here blocks the event loop, so a
+# single process can drive many adapters at once. Timeouts and cancellation work like with any
+# other coroutine, e.g. with asyncio.wait_for. A cancelled operation leaves the link in an unknown
+# state, call reset() before using it again.
+
+import asyncio
+import os
+import time
+import avrasm as asm
+from debugwire import (DWException, Fuses, CMD_DIVISOR, DEFAULT_DIVISOR, CMD_RESET, CMD_RUN, CMD_DISABLE, CMD_READ_SIG,
+    RW_MODE_READ_REGS, RW_MODE_READ_SRAM, RW_MODE_WRITE_SRAM, RW_MODE_READ_FLASH, REG_Z,
+    DEFAULT_CHUNK_LEN, MAX_READ_LEN, RAMPZ_START, ELPM_BATCH_LEN,
+    rw_cmd, write_regs_cmd, exec_cmd, page_write_cmds, page_write_check, read_fuses_code, spm_time)
+from interfaces import (hexdump, echo_mismatch, usb_serial_ports, sync_byte_bounds,
+    baudrate_candidates, pick_baudrate, SAMPLE_BAUDRATES, SYNC_BYTE_TIME, BAUDRATE_GUESSES)
+from adapters import DEFAULT_LATENCY
+
+class AsyncSerialInterface:
+    """Serial port interface driven by the event loop. Only works on POSIX systems."""
+
+    adapter_id = None
+
+    def __init__(self, port, baudrate, timeout=2, enable_log=False):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.enable_log = enable_log
+        self.round_trips = 0
+        self.dev = None
+
+        self._received = bytearray()
+
+    def _log(self, msg):
+        if self.enable_log:
+            print(msg)
+
+    async def open(self):
+        from serial import Serial
+
+        if self.port is None:
+            ports = usb_serial_ports()
+
+            if not ports:
+                raise DWException("Failed to find a USB serial adapter.")
+
+            self.port = ports[0]
+
+        self.dev = Serial(port=self.port, baudrate=self.baudrate or 9600, timeout=0)
+        self.dev.reset_input_buffer()
+
+        self._data_event = asyncio.Event()
+
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self.dev.fileno(), self._on_readable)
+
+        if self.baudrate is None:
+            self.baudrate = await self._detect_baudrate()
+
+        return self.baudrate
+
+    async def _break_response(self, baudrate):
+        # see BaseSerialInterface._break_response
+
+        self.dev.baudrate = baudrate
+        self.discard_input()
+
+        self.dev.break_condition = True
+        try:
+            await asyncio.sleep(0.002)
+        finally:
+            self.dev.break_condition = False
+
+        # the latency timer of the adapter is left alone
+        await asyncio.sleep(SYNC_BYTE_TIME + DEFAULT_LATENCY)
+
+        response = bytes(self._received)
+        self._received.clear()
+
+        return response
+
+    async def _detect_baudrate(self):
+        # same algorithm as BaseSerialInterface._detect_baudrate
+
+        bounds = None
+
+        for sample_baudrate in SAMPLE_BAUDRATES:
+            bounds = sync_byte_bounds(await self._break_response(sample_baudrate), sample_baudrate)
+
+            if bounds:
+                break
+
+        working = []
+
+        if bounds:
+            for rate in baudrate_candidates(*bounds):
+                if 0x55 in await self._break_response(rate):
+                    working.append(rate)
+
+        if working:
+            baudrate = pick_baudrate(working)
+        else:
+            self._log("Failed to measure sync byte, trying fixed guesses")
+
+            for guess in BAUDRATE_GUESSES:
+                if 0x55 in await self._break_response(guess):
+                    baudrate = guess
+                    break
+            else:
+                raise DWException("Failed to autodetect baudrate.")
+
+        self.dev.baudrate = baudrate
+
+        await self.send_break()
+        await self.write([CMD_READ_SIG])
+        await self.read(2)
+
+        self._log("Baudrate detected as {}".format(baudrate))
+
+        return baudrate
+
+    async def close(self):
+        if self.dev:
+            self._loop.remove_reader(self.dev.fileno())
+            self.dev.close()
+            self.dev = None
+
+    def _on_readable(self):
+        self._received += self.dev.read(max(1, self.dev.in_waiting))
+        self._data_event.set()
+
+    async def _write_all(self, data):
+        fd = self.dev.fileno()
+        pos = 0
+
+        while pos < len(data):
+            try:
+                pos += os.write(fd, data[pos:])
+            except BlockingIOError:
+                writable = self._loop.create_future()
+                self._loop.add_writer(fd, writable.set_result, None)
+
+                try:
+                    await writable
+                finally:
+                    self._loop.remove_writer(fd)
+
+    async def write(self, data):
+        data = bytes(data)
+
+        if self.enable_log:
+            self._log(">" + hexdump(data))
+
+        try:
+            await asyncio.wait_for(self._write_all(data), self.timeout)
+        except asyncio.TimeoutError:
+            raise DWException("Write timeout. Check connections and make sure debugWIRE is enabled.")
+
+        echo = await self.read(len(data), _log=False)
+
+        if echo != data:
+            raise echo_mismatch(0, data, echo)
+
+    async def _wait_for_data(self, nread):
+        while len(self._received) < nread:
+            self._data_event.clear()
+            await self._data_event.wait()
+
+    async def read(self, nread, _log=True):
+        self.round_trips += 1
+
+        try:
+            await asyncio.wait_for(self._wait_for_data(nread), self.timeout)
+        except asyncio.TimeoutError:
+            raise DWException("Read timeout. Check connections and make sure debugWIRE is enabled.")
+
+        buf = bytes(self._received[:nread])
+        del self._received[:nread]
+
+        if _log and self.enable_log:
+            self._log("<" + hexdump(buf))
+
+        return buf
+
+    def discard_input(self):
+        self.dev.reset_input_buffer()
+        self._received.clear()
+
+    async def flush(self):
+        pass
+
+    async def set_baudrate(self, baudrate):
+        # writes only return once the data has been sent
+        self.dev.baudrate = baudrate
+        self.baudrate = baudrate
+
+    async def send_break(self):
+        self._log(">break")
+
+        self.dev.break_condition = True
+        try:
+            await asyncio.sleep(0.002)
+        finally:
+            self.dev.break_condition = False
+
+        await asyncio.sleep(0.002)
+
+        return await self.read(2)
+
+class AsyncInterfaceAdapter:
+    """Makes a blocking interface usable with AsyncDebugWire by running it in a worker thread.
+
+    Useful for interfaces without a native asyncio implementation, such as FTDI and the simulator.
+    Cancelling an operation doesn't stop the worker thread until the blocking call returns."""
+
+    def __init__(self, iface):
+        self.iface = iface
+
+    def __getattr__(self, name):
+        return getattr(self.iface, name)
+
+    async def _call(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def open(self):
+        return await self._call(self.iface.open)
+
+    async def close(self):
+        await self._call(self.iface.close)
+
+    async def write(self, data):
+        await self._call(self.iface.write, data)
+
+    async def read(self, nread):
+        return await self._call(self.iface.read, nread)
+
+    async def flush(self):
+        await self._call(self.iface.flush)
+
+    async def set_baudrate(self, baudrate):
+        await self._call(self.iface.set_baudrate, baudrate)
+
+    def discard_input(self):
+        self.iface.discard_input()
+
+    async def send_break(self):
+        return await self._call(self.iface.send_break)
+
+class AsyncDebugWire:
+    """asyncio version of DebugWire. All methods that talk to the target are coroutines."""
+
+    def __init__(self, iface, timed_sync=False, chunk_len=DEFAULT_CHUNK_LEN):
+        self.iface = iface
+        self.timed_sync = timed_sync
+        self.chunk_len = chunk_len
+
+        self._busy_until = 0
+        self._baudrate = None
+
+        # see DebugWire.check_timed_pages
+        self._timed_pages = []
+        self._timed_dev = None
+
+    async def open(self):
+        """Open the interface. Returns interface baud rate."""
+
+        baudrate = self._baudrate = await self.iface.open()
+        await self.reset()
+
+        return baudrate
+
+    async def close(self):
+        await self.wait_ready()
+        await self.iface.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, type, value, traceback):
+        await self.close()
+
+    async def wait_ready(self):
+        """Wait until the target is done with a timed SPM operation."""
+
+        delay = self._busy_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _set_busy(self, duration):
+        await self.iface.flush()
+
+        self._busy_until = time.monotonic() + duration
+
+    async def _write(self, data):
+        await self.wait_ready()
+        await self.iface.write(data)
+
+    async def reset(self):
+        """Reset the target device."""
+
+        await self.check_timed_pages()
+        await self.wait_ready()
+        await self.iface.send_break()
+        await self.iface.write([CMD_RESET])
+
+        while (await self.iface.read(1))[0] != 0x55:
+            pass
+
+    async def run(self):
+        """Run the code on the target device."""
+
+        await self._write([CMD_RUN])
+
+    async def disable(self):
+        """Disable DebugWire and enable ISP until the next power cycle."""
+
+        await self._write([CMD_DISABLE])
+
+    async def read_signature(self):
+        """Returns the device debugWIRE signature as an integer."""
+
+        await self._write([CMD_READ_SIG])
+        sig = await self.iface.read(2)
+
+        return (sig[0] << 8) | sig[1]
+
+    async def read_regs(self, start, count):
+        """Read registers from the target and return a list."""
+
+        await self._write(rw_cmd(RW_MODE_READ_REGS, start, start + count))
+
+        return await self.iface.read(count)
+
+    async def write_regs(self, start, values):
+        """Write a list of register values to the target."""
+
+        await self._write(write_regs_cmd(start, values))
+
+    async def read_sram(self, start, count):
+        """Read a segment of SRAM memory from the target."""
+
+        await self.write_regs(REG_Z, [start & 0xff, (start >> 8) & 0xff])
+        await self._write(rw_cmd(RW_MODE_READ_SRAM, 0, count * 2))
+
+        return await self.iface.read(count)
+
+    async def write_sram(self, start, values):
+        """Write a segment of SRAM memory to the target."""
+
+        await self.write_regs(REG_Z, [start & 0xff, (start >> 8) & 0xff])
+        await self._write(rw_cmd(RW_MODE_WRITE_SRAM, 1, len(values) * 2 + 1) + bytes(values))
+
+    async def read_flash(self, start, count, dev=None):
+        """Read a segment of flash memory from the target. dev is needed above 64 KiB."""
+
+        await self.check_timed_pages()
+
+        buf = b""
+
+        while len(buf) < count:
+            addr = start + len(buf)
+
+            if addr >= RAMPZ_START:
+                return buf + await self._read_flash_extended(dev, addr, count - len(buf))
+
+            end = len(buf) + min(count - len(buf), MAX_READ_LEN, RAMPZ_START - addr)
+
+            await self.write_regs(REG_Z, [addr & 0xff, (addr >> 8) & 0xff])
+            await self._write(rw_cmd(RW_MODE_READ_FLASH, 0, (end - len(buf)) * 2))
+
+            # in blocks, see DebugWire.read_flash
+            while len(buf) < end:
+                buf += await self.iface.read(min(end - len(buf), 64))
+
+        return buf
+
+    async def _read_flash_extended(self, dev, start, count):
+        # see DebugWire._read_flash_extended
+
+        if not dev or not dev.reg_rampz:
+            raise DWException("Flash above 64 KiB can only be read from devices with RAMPZ")
+
+        await self.write_regs(REG_Z, [start & 0xff, (start >> 8) & 0xff])
+        await self._write(exec_cmd([
+            asm.ldi(16, start >> 16),     # ldi r16, (bits 16-23 of address)
+            asm.out(dev.reg_rampz, 16)])) # out RAMPZ, r16
+
+        buf = b""
+
+        while len(buf) < count:
+            n = min(count - len(buf), ELPM_BATCH_LEN)
+
+            await self._write(exec_cmd([asm.elpm_inc(r) for r in range(n)]))
+
+            buf += await self.read_regs(0, n)
+
+        return buf
+
+    async def _resync(self):
+        # see DebugWire._resync
+
+        self.iface.discard_input()
+        response = await self.iface.send_break()
+
+        await asyncio.sleep(0.01)
+        self.iface.discard_input()
+
+        return response
+
+    async def _find_target(self):
+        # see DebugWire._find_target, the link always runs at the default divisor here
+
+        for divisor in sorted(CMD_DIVISOR, key=lambda d: d != DEFAULT_DIVISOR):
+            await self.iface.set_baudrate(self._baudrate * DEFAULT_DIVISOR // divisor)
+
+            try:
+                if (await self._resync())[-1:] != b"\x55":
+                    continue
+            except DWException:
+                continue
+
+            if divisor != DEFAULT_DIVISOR:
+                await self.iface.write([CMD_DIVISOR[DEFAULT_DIVISOR]])
+                await self.iface.set_baudrate(self._baudrate)
+
+            return
+
+        await self.iface.set_baudrate(self._baudrate)
+
+        raise DWException("Target stopped responding after missing commands.")
+
+    async def write_flash_page(self, dev, start, data, erase=True):
+        """Write a page of flash memory to the target. See DebugWire.write_flash_page, including
+        how pages written with timed_sync are checked later."""
+
+        if start % dev.flash_pagesize != 0:
+            raise DWException("Bad page offset")
+
+        if len(data) != dev.flash_pagesize:
+            raise DWException("Bad page size")
+
+        if self.timed_sync and not self._timed_pages:
+            # clear the sum checked by check_timed_pages
+            await self.write_regs(20, [0, 0])
+
+        await self._write_flash_page(dev, start, data, erase, self.timed_sync)
+
+        if self.timed_sync:
+            self._timed_pages.append((start, data))
+            self._timed_dev = dev
+
+    async def check_timed_pages(self):
+        """Check the pages written with timed_sync since the last check and write the ones the
+        target missed commands for again with break synchronization. See
+        DebugWire.check_timed_pages, this is done by read_flash and reset."""
+
+        if not self._timed_pages:
+            return
+
+        dev, pages = self._timed_dev, self._timed_pages
+        self._timed_pages = []
+
+        await self.wait_ready()
+        await self._find_target()
+
+        if await self.read_regs(20, 2) == page_write_check(dev, (start for start, data in pages)):
+            return
+
+        for start, data in pages:
+            if await self.read_flash(start, len(data), dev) != data:
+                await self._write_flash_page(dev, start, data, True, timed=False)
+
+    async def _write_flash_page(self, dev, start, data, erase, timed):
+        cmds = page_write_cmds(dev, start, data, self.chunk_len)
+
+        await self.wait_ready()
+
+        if timed:
+            await self.iface.write(cmds.setup + (cmds.erase if erase else b""))
+
+            if erase:
+                await self._set_busy(spm_time(dev, "erase"))
+        else:
+            await self.iface.write(cmds.setup)
+            await self.iface.send_break()
+
+            if erase:
+                await self.iface.write(cmds.erase)
+                await self.iface.send_break()
+
+        for buf in cmds.load:
+            await self._write(buf)
+
+        await self.iface.write(cmds.write)
+
+        if timed:
+            await self._set_busy(spm_time(dev, "write"))
+        else:
+            await self.iface.send_break()
+
+    async def read_fuses(self, dev):
+        """Reads the fuse and lock bits from the target and returns them as a named tuple."""
+
+        await self._write(exec_cmd(read_fuses_code(dev)))
+
+        return Fuses(*await self.read_regs(0, 4))
@@ -1,5 +1,17 @@
 """Extra simple AVR assembler used for some debugWIRE operations."""
 
+def adc(dest, src):
+    return (0x1c00
+        | ((src & 0x10) << 5)
+        | (dest << 4)
+        | (src & 0x0f))
+
+def add(dest, src):
+    return (0x0c00
+        | ((src & 0x10) << 5)
+        | (dest << 4)
+        | (src & 0x0f))
+
 def adiw(reg, val):
     return (0x9600
         | ((val & 0x30) << 2)
@@ -38,5 +50,18 @@ def out(addr, reg):
 def lpm():
     return 0x95c8
 
+def elpm_inc(reg):
+    # elpm reg, Z+
+    return (0x9007
+        | ((reg & 0x1f) << 4))
+
+def nop():
+    return 0x0000
+
+def sbi(addr, bit):
+    return (0x9a00
+        | ((addr & 0x1f) << 3)
+        | (bit & 0x07))
+
 def spm():
     return 0x95e8
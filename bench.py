@@ -0,0 +1,175 @@
+# Benchmarks for measuring programming throughput on real or simulated targets. Note that most
+# workloads overwrite the flash memory of the target.
+
+import random
+import time
+from collections import OrderedDict
+from debugwire import PhaseProfiler, page_write_cmds, exec_cmd, load_word_code
+
+WORKLOADS = ["full", "sparse", "patch", "verify", "fuses", "host"]
+
+# how many pages to skip between written pages in the sparse workload
+SPARSE_STRIDE = 8
+
+# how many times to repeat the fuse read workload
+FUSE_READS = 10
+
+# how many times to build the commands for the whole image in the host workload
+HOST_REPEATS = 5
+
+def make_image(dev, seed):
+    """Generate a deterministic random image that fills the whole flash memory."""
+
+    rng = random.Random(seed)
+
+    return bytes(rng.getrandbits(8) for i in range(dev.flash_size))
+
+def image_pages(dev, image, stride=1):
+    return [
+        (start, image[start:start + dev.flash_pagesize])
+        for start in range(0, dev.flash_size, dev.flash_pagesize * stride)]
+
+class Benchmark:
+    def __init__(self, dw, dev, seed=0, progress=None):
+        self.dw = dw
+        self.dev = dev
+        self.image = make_image(dev, seed)
+        self.progress = progress or (lambda workload, current, count: None)
+
+    def run(self, workloads=WORKLOADS):
+        """Run the given workloads and return the results as a JSON-serializable dict."""
+
+        return {
+            "device": self.dev.devid,
+            "port": self.dw.iface.port,
+            "adapter": self.dw.iface.adapter_id,
+            "baudrate": self.dw.iface.baudrate,
+            "chunk_len": self.dw.chunk_len,
+            "timed_sync": self.dw.timed_sync,
+            "results": [self._run_workload(w) for w in workloads],
+        }
+
+    def _run_workload(self, workload):
+        if workload not in WORKLOADS:
+            raise ValueError("Unknown workload: {}".format(workload))
+
+        prof = PhaseProfiler()
+        round_trips = self.dw.iface.round_trips
+        start_time = time.monotonic()
+
+        self.dw.profiler = prof
+        try:
+            nbytes, npages = getattr(self, "_bench_" + workload)()
+        finally:
+            self.dw.profiler = None
+
+        elapsed = time.monotonic() - start_time
+        round_trips = self.dw.iface.round_trips - round_trips
+
+        # time spent between page writes is host overhead of the caller
+        phases = OrderedDict(
+            ("outside_page_write" if k == "starting_page_write" else k, v)
+            for k, v in prof.totals.items())
+
+        return {
+            "workload": workload,
+            "bytes": nbytes,
+            "pages": npages,
+            "seconds": elapsed,
+            "bytes_per_s": nbytes / elapsed if elapsed else None,
+            "pages_per_s": npages / elapsed if elapsed else None,
+            "round_trips": round_trips,
+            "round_trips_per_page": round_trips / npages if npages else None,
+            "phases": phases,
+        }
+
+    def _write_pages(self, workload, pages):
+        self.dw.write_flash_pages(self.dev, pages,
+            progress=lambda current, count: self.progress(workload, current, count))
+
+        self.dw.wait_ready()
+
+        return len(pages) * self.dev.flash_pagesize, len(pages)
+
+    def _bench_full(self):
+        return self._write_pages("full", image_pages(self.dev, self.image))
+
+    def _bench_sparse(self):
+        return self._write_pages("sparse", image_pages(self.dev, self.image, SPARSE_STRIDE))
+
+    def _bench_patch(self):
+        # flip the bits of the last page so that it actually has to be rewritten
+        start = self.dev.flash_size - self.dev.flash_pagesize
+        data = bytes(b ^ 0xff for b in self.image[start:])
+
+        return self._write_pages("patch", [(start, data)])
+
+    def _bench_verify(self):
+        # comparing is negligible, so only the readback is measured
+
+        npages = self.dev.flash_size // self.dev.flash_pagesize
+        pos = 0
+
+        stream = self.dw.read_flash_stream(
+            0, self.dev.flash_size, self.dev.flash_pagesize, dev=self.dev)
+
+        for block in stream:
+            self.progress("verify", pos // self.dev.flash_pagesize, npages)
+            pos += len(block)
+
+        return self.dev.flash_size, npages
+
+    def _bench_fuses(self):
+        for i in range(FUSE_READS):
+            self.progress("fuses", i, FUSE_READS)
+            self.dw.read_fuses(self.dev)
+
+        return FUSE_READS * 4, 0
+
+    def _bench_host(self):
+        # host CPU time for building the buffer load commands of every page, without the target.
+        # Compare the per_word_encoding and load_template phases for the cost of each approach.
+
+        prof = self.dw.profiler
+        pages = image_pages(self.dev, self.image)
+
+        prof.step("Setup")
+
+        for i in range(HOST_REPEATS):
+            self.progress("host", i, HOST_REPEATS * 2)
+
+            for start, data in pages:
+                per_word_load_cmds(self.dev, data, self.dw.chunk_len)
+
+        prof.step("Per word encoding")
+
+        for i in range(HOST_REPEATS):
+            self.progress("host", HOST_REPEATS + i, HOST_REPEATS * 2)
+
+            for start, data in pages:
+                page_write_cmds(self.dev, start, data, self.dw.chunk_len).load
+
+        prof.step("Load template")
+
+        return HOST_REPEATS * len(pages) * self.dev.flash_pagesize, HOST_REPEATS * len(pages)
+
+def per_word_load_cmds(dev, data, chunk_len):
+    """Buffer load commands encoded word by word, the way they were built before LoadTemplate.
+    Only used as a baseline for the host workload."""
+
+    load = []
+
+    for ci in range(0, len(data), chunk_len):
+        buf = []
+
+        for ii in range(ci, min(ci + chunk_len, len(data)), 2):
+            buf += load_word_code(dev, data[ii], data[ii + 1])
+
+        load.append(exec_cmd(buf))
+
+    return load
+
+def run_benchmarks(dw, dev, workloads=WORKLOADS, seed=0, progress=None):
+    """Run benchmark workloads on an open DebugWire target and return the results."""
+
+    return Benchmark(dw, dev, seed, progress).run(workloads)
@@ -1,23 +1,94 @@
-# A list isn't the most efficient way to store a potentially sparse set of memory segments, but then
-# again this isn't exactly designed for huge programs.
-
 from debugwire import DWException
 
-MAX_ADDRESS = 0xffff
+MAX_ADDRESS = 0x3ffff
+
+# ELF addresses from this up are data, EEPROM and fuses instead of flash
+ELF_DATA_START = 0x800000
+
+# Where avr-gcc puts the .eeprom section in ELF files
+ELF_EEPROM_START = 0x810000
+ELF_EEPROM_END = 0x820000
+
+# Data bytes per record written by write_hex
+HEX_RECORD_LEN = 16
+
+class MemoryImage:
+    """Sparse memory image parsed from a binary.
+
+    The contents are kept in a bytearray with a coverage map next to it that holds a 1 for every
+    address that was written to. Gaps read as 0x00. Pages are handed out as memoryviews of the
+    data without copying, so the image can't be written to while they are in use."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.cover = bytearray()
+
+    def __len__(self):
+        return len(self.data)
+
+    def _grow(self, size):
+        if len(self.data) < size:
+            self.data += bytes(size - len(self.data))
+            self.cover += bytes(size - len(self.cover))
 
-class memlist(list):
     def write(self, offset, values):
-        if offset + len(values) > MAX_ADDRESS:
+        """Write values at offset. Overlapping writes replace earlier data."""
+
+        end = offset + len(values)
+
+        if end > MAX_ADDRESS + 1:
             raise DWException("Binary is too large.")
 
-        while len(self) < offset + len(values):
-            self.append(None)
+        self._grow(end)
+
+        self.data[offset:end] = values
+        self.cover[offset:end] = b"\x01" * len(values)
+
+    def touched(self, start, end):
+        """Returns True if anything was written between start and end."""
+
+        return self.cover.find(1, start, end) != -1
+
+    def segments(self):
+        """Returns a list of (start, bytes) tuples for all contiguous runs that were written to."""
+
+        segments = []
+        end = 0
+
+        while True:
+            start = self.cover.find(1, end)
+            if start == -1:
+                return segments
+
+            end = self.cover.find(0, start)
+            if end == -1:
+                end = len(self.cover)
+
+            segments.append((start, bytes(self.data[start:end])))
+
+    def pages(self, pagesize):
+        """Returns a list of (start, data) tuples for all pages that were written to."""
+
+        view = memoryview(self.data)
+        pages = []
+
+        for start in range(0, len(self.data), pagesize):
+            if self.touched(start, start + pagesize):
+                page = view[start:start + pagesize]
 
-        for i, b in enumerate(values):
-            self[offset + i] = b
+                if len(page) < pagesize:
+                    # only the last page can be incomplete, pad a copy of it
+                    page = bytes(page) + bytes(pagesize - len(page))
+
+                pages.append((start, page))
+
+        return pages
 
 def parse_hex(f):
-    mem = memlist()
+    mem = MemoryImage()
+
+    # set by extended segment and linear address records
+    base = 0
 
     for line in f:
         if line[0:1] != b":":
@@ -32,20 +103,48 @@ def parse_hex(f):
         addr = (lb[1] << 8) | lb[2]
         rtype = lb[3]
 
-        checksum = 0x100 - (sum(lb[:-1]) & 0xff)
+        checksum = (0x100 - sum(lb[:-1])) & 0xff
         if checksum != lb[-1]:
             raise DWException("Invalid hex line checksum")
 
         if rtype == 0x00:
-            mem.write(addr, lb[4:-1])
+            mem.write(base + addr, lb[4:-1])
         elif rtype == 0x01:
             break
+        elif rtype == 0x02:
+            base = ((lb[4] << 8) | lb[5]) << 4
+        elif rtype == 0x04:
+            base = ((lb[4] << 8) | lb[5]) << 16
+        elif rtype in (0x03, 0x05):
+            # start address, meaningless for AVR
+            pass
         else:
             raise DWException("Unknown hex line")
 
     return mem
 
-def parse_elf(f):
+def write_hex(f, data, start=0):
+    """Write data to the binary file f as Intel HEX, starting at address start."""
+
+    def record(rtype, addr, values):
+        lb = bytes([len(values), (addr >> 8) & 0xff, addr & 0xff, rtype]) + bytes(values)
+
+        f.write(":{}{:02X}\r\n".format(lb.hex().upper(), (0x100 - sum(lb)) & 0xff).encode("ascii"))
+
+    base = 0
+
+    for pos in range(0, len(data), HEX_RECORD_LEN):
+        addr = start + pos
+
+        if addr >> 16 != base:
+            base = addr >> 16
+            record(0x04, 0, [base >> 8, base & 0xff])
+
+        record(0x00, addr & 0xffff, data[pos:pos + HEX_RECORD_LEN])
+
+    record(0x01, 0, b"")
+
+def parse_elf(f, eeprom=False):
     from elftools.elf.elffile import ELFFile
     from elftools.elf.enums import ENUM_E_MACHINE
 
@@ -54,22 +153,49 @@ def parse_elf(f):
     if elf["e_machine"] != "EM_AVR":
         raise DWException("Invalid ELF architecture")
 
-    mem = memlist()
+    mem = MemoryImage()
 
     for s in elf.iter_segments():
-        if s["p_filesz"] > 0:
-            mem.write(s["p_paddr"], s.data())
+        addr = s["p_paddr"]
+
+        if s["p_filesz"] == 0:
+            continue
+
+        if eeprom:
+            if ELF_EEPROM_START <= addr < ELF_EEPROM_END:
+                mem.write(addr - ELF_EEPROM_START, s.data())
+        elif addr < ELF_DATA_START:
+            mem.write(addr, s.data())
 
     return mem
 
-def parse_binary(filename):
+def binary_format(data):
+    """Returns the format of a binary file ("elf" or "hex") from its first bytes."""
+
+    if data[:4] == b"\x7fELF":
+        return "elf"
+    elif len(data) >= 9 and data[0:1] == b":" and data[7:9] in (b"00", b"01", b"02", b"04"):
+        return "hex"
+    else:
+        raise DWException("Unknown binary file type.")
+
+def parse_binary(filename, eeprom=False):
+    """Parse an ELF or HEX file. With eeprom, the .eeprom section of an ELF file is returned instead
+    of flash. HEX files only hold one memory, so they are returned as is."""
+
     with open(filename, "rb") as f:
-        magic = f.read(9)
+        fmt = binary_format(f.read(9))
         f.seek(0)
 
-        if magic[:4] == b"\x7fELF":
-            return parse_elf(f)
-        elif len(magic) == 9 and magic[0:1] == b":" and magic[7:9] in (b"00", b"01"):
-            return parse_hex(f)
+        if fmt == "elf":
+            return parse_elf(f, eeprom)
         else:
-            raise DWException("Unknown binary file type.")
+            return parse_hex(f)
+
+def split_into_pages(mem, dev):
+    """Split a parsed binary into a list of (start, bytes) tuples for non-empty pages of dev."""
+
+    if len(mem) > dev.flash_size:
+        raise DWException("Binary too large for target.")
+
+    return mem.pages(dev.flash_pagesize)
@@ -1,6 +1,8 @@
+import functools
 import time
 import avrasm as asm
-from collections import namedtuple
+from collections import OrderedDict, namedtuple
+from metrics import DummyMetrics
 
 class DummyProfiler:
     def step(self, title): pass
@@ -14,6 +16,20 @@ class SimpleProfiler:
         print("{:10.6f}s {}".format(now - self.prev, msg))
         self.prev = now
 
+class PhaseProfiler:
+    """Accumulates the time spent in each step of page writes across multiple pages."""
+
+    def __init__(self):
+        self.totals = OrderedDict()
+        self.prev = time.monotonic()
+
+    def step(self, msg):
+        now = time.monotonic()
+        key = msg.lower().replace(" ", "_")
+
+        self.totals[key] = self.totals.get(key, 0) + now - self.prev
+        self.prev = now
+
 class DWException(Exception):
     pass
 
@@ -33,6 +49,10 @@ CMD_SET_BP = 0xd1
 CMD_SET_IR= 0xd2
 CMD_READ_SIG = 0xf3
 
+# commands that set the clock divisor of the debugWIRE link, the default is 128
+CMD_DIVISOR = OrderedDict([(16, 0x80), (32, 0x81), (64, 0x82), (128, 0x83)])
+DEFAULT_DIVISOR = 128
+
 # CMD_RW_MODE modes
 RW_MODE_READ_SRAM = 0x00
 RW_MODE_READ_REGS = 0x01
@@ -47,21 +67,401 @@ PGWRT = 0x04
 RFLB = 0x08
 CTPB = 0x10
 
+# EECR register bit numbers, EEPE and EEMPE are called EEWE and EEMWE on older parts
+EERE = 0
+EEPE = 1
+EEMPE = 2
+
+# Worst case EEPROM erase and write time of a single byte (tWD_EEPROM)
+EEPROM_WRITE_TIME = 0.0036
+
+# How many EEPROM bytes to read at once into r0-r15
+EEPROM_BATCH_LEN = 16
+
+# Worst case self-programming page erase and write time (tWD_FLASH) of the supported parts, used for
+# timed synchronization when a device doesn't specify its own
+SPM_TIME = 0.0045
+
+# Extra time to wait on top of the datasheet SPM times
+SPM_TIME_MARGIN = 1.1
+
+# Maximum number of bytes that can be read in one transaction, limited by the 16-bit breakpoint
+# register that counts two steps per byte
+MAX_READ_LEN = 0x7fff
+
+# Flash above this can only be reached with RAMPZ
+RAMPZ_START = 0x10000
+
+# How many bytes to read at once with elpm into r0-r15 above RAMPZ_START
+ELPM_BATCH_LEN = 16
+
+# How many data bytes of buffer load instructions to write at once by default
+# The best value for this depends on the serial adapter, see DebugWire.calibrate_chunk_len
+DEFAULT_CHUNK_LEN = 16
+
+def needs_erase(current, data):
+    """Check whether a page containing current must be erased before data can be written to it.
+
+    Programming can only clear bits, so the erase can be skipped if data has no 1 bits that are 0 in
+    current."""
+
+    cur = int.from_bytes(bytes(current), "little")
+    new = int.from_bytes(bytes(data), "little")
+
+    return cur & new != new
+
+# Command builders shared by DebugWire and AsyncDebugWire
+
+def rw_cmd(mode, pc, bp):
+    """Command for a memory or register transfer. pc and bp delimit the transfer."""
+
+    return bytes([
+        CMD_RW,
+        CMD_RW_MODE, mode,
+        CMD_SET_PC, (pc >> 8) & 0xff, pc & 0xff,
+        CMD_SET_BP, (bp >> 8) & 0xff, bp & 0xff,
+        CMD_GO])
+
+def write_regs_cmd(start, values):
+    return rw_cmd(RW_MODE_WRITE_REGS, start, start + len(values)) + bytes(values)
+
+def exec_cmd(code):
+    """Command for executing a list of instructions. bytes objects in the list are sent as is."""
+
+    return b"".join(
+        inst if type(inst) == bytes else bytes([CMD_SET_IR, (inst >> 8) & 0xff, inst & 0xff, CMD_STEP])
+        for inst in code)
+
+def load_word_code(dev, low, high):
+    """Code for loading one word into the self-programming buffer at Z and incrementing Z."""
+
+    if dev.reg_dwdr:
+        code = [
+            asm.in_(dev.reg_dwdr, 0), bytes([low]),  # in r0, DWDR ; (low byte)
+            asm.in_(dev.reg_dwdr, 1), bytes([high])] # in r1, DWDR ; (high byte)
+    else:
+        code = [
+            asm.ldi(22, low),                        # ldi r22, (low byte)
+            asm.ldi(23, high),                       # ldi r23, (high byte)
+            asm.movw(0, 22)]                         # movw r0, r22
+
+    return code + [
+        asm.out(dev.reg_spmcsr, 26),                 # out SPMCSR, r26 ; SPMEN
+        asm.spm(),                                   # spm
+        asm.adiw(30, 2)]                             # adiw Z, 2
+
+class LoadTemplate:
+    """Precompiled buffer load commands for a whole page of a device.
+
+    The commands for all words of a page only differ in the data bytes, so they are encoded once
+    and the data of each page is patched in with slice assignments. Depending on the device a data
+    byte is sent either as is or split into the nibbles of ldi instructions, so each position that
+    depends on the data has a translate table that maps the data byte to the value there."""
+
+    def __init__(self, dev):
+        word = exec_cmd(load_word_code(dev, 0, 0))
+
+        self.word_len = len(word)
+        self.template = word * (dev.flash_pagesize // 2)
+
+        # (0 for low byte or 1 for high byte, position in word command, translate table)
+        self.patches = []
+
+        for byte in (0, 1):
+            encoded = [
+                exec_cmd(load_word_code(dev, v, 0) if byte == 0 else load_word_code(dev, 0, v))
+                for v in range(256)]
+
+            for pos in range(self.word_len):
+                if any(e[pos] != word[pos] for e in encoded):
+                    self.patches.append((byte, pos, bytes(e[pos] for e in encoded)))
+
+    def fill(self, data):
+        """Returns the load commands for a page of data as one bytearray."""
+
+        buf = bytearray(self.template)
+        data = bytes(data)
+
+        for byte, pos, table in self.patches:
+            buf[pos::self.word_len] = data[byte::2].translate(table)
+
+        return buf
+
+_load_templates = {}
+
+def load_template(dev):
+    """Returns the LoadTemplate of a device, compiling it on first use."""
+
+    template = _load_templates.get(dev.devid)
+
+    if template is None:
+        template = _load_templates[dev.devid] = LoadTemplate(dev)
+
+    return template
+
+PageCmds = namedtuple("PageCmds", ["setup", "erase", "load", "write"])
+
+def page_write_cmds(dev, start, data, chunk_len):
+    """Build the commands for writing a page of flash memory.
+
+    setup sets up registers and clears the self-programming buffer, erase erases the page, load is
+    a list of commands that each load chunk_len bytes into the buffer and write writes the buffer
+    to flash. The load commands are consecutive slices of a single buffer, except that the first one
+    starts with a marker that shows the whole load arrived. write adds the marker and the end of the
+    loaded data to a running sum of the pages written (see page_write_check)."""
+
+    # set up constants in registers and clear self-programming buffer
+
+    setup = write_regs_cmd(26, [
+        SPMEN,                            # r26
+        PGERS | SPMEN,                    # r27
+        PGWRT | SPMEN,                    # r28
+        CTPB | SPMEN,                     # r29
+        start & 0xff, (start >> 8) & 0xff # r30:r31(Z)
+    ]) + exec_cmd(([
+        asm.ldi(16, start >> 16),         # ldi r16, (bits 16-23 of address)
+        asm.out(dev.reg_rampz, 16),       # out RAMPZ, r16
+    ] if dev.reg_rampz else []) + [
+        asm.movw(24, 30),                 # movw r24, r30
+        asm.out(dev.reg_spmcsr, 29),      # out SPMCSR, r29 ; CTPB | SPMEN
+        asm.spm()])                       # spm
+
+    # erase flash page
+
+    erase = exec_cmd([
+        asm.out(dev.reg_spmcsr, 27),      # out SPMCSR, r27 ; PGERS | SPMEN
+        asm.spm(),                        # spm
+    ])
+
+    # write data to buffer
+
+    template = load_template(dev)
+    buf = memoryview(template.fill(data))
+
+    chunk_cmd_len = max(1, min(chunk_len, len(data)) // 2) * template.word_len
+
+    load = [buf[i:i + chunk_cmd_len] for i in range(0, len(buf), chunk_cmd_len)]
+
+    load[0] = exec_cmd([
+        asm.ldi(29, 0)]) + load[0]        # ldi r29, 0 ; marker, r29 is only needed by setup
+
+    # write buffer to flash
+
+    write = exec_cmd([
+        asm.add(20, 30),                  # add r20, r30 ; r20:r21 += end of loaded data
+        asm.adc(21, 31),                  # adc r21, r31
+        asm.add(21, 29),                  # add r21, r29 ; r21 += marker
+        asm.movw(30, 24),                 # movw r30, r24
+        asm.out(dev.reg_spmcsr, 28),      # out SPMCSR, r28 ; PGWRT | SPMEN
+        asm.spm()])                       # spm
+
+    return PageCmds(setup, erase, load, write)
+
+def page_write_check(dev, starts):
+    """Value of r20:r21 once the commands from page_write_cmds have run for pages at starts, with
+    r20:r21 cleared first.
+
+    r29 is only cleared if the start of the buffer load arrived, and every loaded word advances Z, so
+    a page only adds its end to the sum if all of its commands arrived."""
+
+    check = sum(start + dev.flash_pagesize for start in starts) & 0xffff
+
+    return bytes([check & 0xff, check >> 8])
+
+# Sync point of a command stream that waits for the sync byte after a break
+SYNC_BREAK = "break"
+
+StreamSegment = namedtuple("StreamSegment", ["writes", "sync", "page", "done"])
+
+def page_stream(dev, pages, chunk_len, no_erase=(), timed=False):
+    """Turn a list of (start, bytes) pages into one command stream that writes all of them.
+
+    The stream is a list of StreamSegments. writes is a list of commands that are each sent with a
+    single write, with buffer loads split into chunk_len bytes of page data like in
+    page_write_cmds. After the writes of a segment the host synchronizes with the target: sync is
+    SYNC_BREAK for waiting for the sync byte after a break, the time in seconds the target is busy
+    for with timed synchronization, or None. page is the index of the page the segment belongs to
+    and done is True for its last segment. Pages with a start in no_erase are programmed without
+    erasing them first."""
+
+    segments = []
+
+    for i, (start, data) in enumerate(pages):
+        if start % dev.flash_pagesize != 0:
+            raise DWException("Bad page offset")
+
+        if len(data) != dev.flash_pagesize:
+            raise DWException("Bad page size")
+
+        cmds = page_write_cmds(dev, start, data, chunk_len)
+
+        # the short setup and write commands go along with the first and last chunk
+        load_and_write = [bytes(buf) for buf in cmds.load]
+        load_and_write[-1] += cmds.write
+
+        write_sync = spm_time(dev, "write") if timed else SYNC_BREAK
+
+        if start in no_erase:
+            load_and_write[0] = cmds.setup + load_and_write[0]
+
+            segments.append(StreamSegment(load_and_write, write_sync, i, True))
+        else:
+            # clearing the buffer is immediate, so erasing can follow without synchronization
+            segments.append(StreamSegment(
+                [cmds.setup + cmds.erase], spm_time(dev, "erase") if timed else SYNC_BREAK, i, False))
+            segments.append(StreamSegment(load_and_write, write_sync, i, True))
+
+    return segments
+
+def read_fuses_code(dev):
+    """Code for reading the fuse and lock bits into r0-r3."""
+
+    # set up constants
+
+    buf = [
+        asm.ldi(29, RFLB | SPMEN),       # ldi r29, RFLB | SPMEN
+        asm.ldi(31, 0),                  # ldi r31, 0 ; (high byte of Z)
+    ]
+
+    # there are four bytes to read
+
+    for index in reversed(range(4)):
+
+        # read fuse/lock bit into r0
+
+        buf += [
+            asm.ldi(30, index),          # ldi r31, index ; (low byte of Z)
+            asm.out(dev.reg_spmcsr, 29), # out SPMCSR, r29 ; RFLB | SPMEN
+            asm.lpm(),                   # lpm
+        ]
+
+        # move into another register if not reading index 0
+
+        if index != 0:
+            buf += [
+                asm.mov(index, 0),       # mov r[index], r0
+            ]
+
+    return buf
+
+def eeprom_addr_code(dev):
+    """Code for pointing the EEPROM address register at Z. EEDR, EEARL and EEARH follow EECR."""
+
+    buf = []
+
+    if dev.eeprom_size > 0x100:
+        buf.append(asm.out(dev.reg_eecr + 3, 31)) # out EEARH, r31
+
+    buf.append(asm.out(dev.reg_eecr + 2, 30))     # out EEARL, r30
+
+    return buf
+
+def read_eeprom_code(dev, count):
+    """Code for reading count bytes of EEPROM starting at Z into r0 onwards, incrementing Z."""
+
+    buf = []
+
+    for reg in range(count):
+        buf += eeprom_addr_code(dev) + [
+            asm.sbi(dev.reg_eecr, EERE),          # sbi EECR, EERE
+            asm.in_(dev.reg_eecr + 1, reg),       # in r[reg], EEDR
+            asm.adiw(30, 1),                      # adiw r30, 1
+        ]
+
+    return buf
+
+def write_eeprom_code(dev):
+    """Code for writing r29 to the EEPROM address in Z."""
+
+    return eeprom_addr_code(dev) + [
+        asm.out(dev.reg_eecr + 1, 29),            # out EEDR, r29
+        asm.sbi(dev.reg_eecr, EEMPE),             # sbi EECR, EEMPE
+        asm.sbi(dev.reg_eecr, EEPE),              # sbi EECR, EEPE
+    ]
+
+def spm_time(dev, op):
+    """Time the target is busy with a self-programming operation ("erase" or "write")."""
+
+    return (getattr(dev, "spm_{}_time".format(op), None) or SPM_TIME) * SPM_TIME_MARGIN
+
+def _slow_link_retry(func):
+    """Makes a DebugWire operation drop back to the default clock divisor and try again once if it
+    fails on a faster link. Only the outermost operation is retried."""
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if self._in_operation or self.divisor == DEFAULT_DIVISOR:
+            return func(self, *args, **kwargs)
+
+        self._in_operation = True
+        try:
+            return func(self, *args, **kwargs)
+        except DWException:
+            if self.divisor == DEFAULT_DIVISOR:
+                raise
+
+            self._fall_back_to_slow_link()
+        finally:
+            self._in_operation = False
+
+        return func(self, *args, **kwargs)
+
+    return wrapper
+
 # Mostly everything courtesy of http://www.ruemohr.org/docs/debugwire.html
 class DebugWire:
-    def __init__(self, iface, enable_log=False):
+    def __init__(self, iface, enable_log=False, timed_sync=False, chunk_len=DEFAULT_CHUNK_LEN,
+            fast_link=False, metrics=None):
         self.iface = iface
         self.enable_log = enable_log
+        self.chunk_len = chunk_len
+
+        # counters and latencies of operations, see metrics.Metrics
+        self.metrics = metrics or DummyMetrics()
+
+        # profiler to use for page writes instead of printing timings with enable_log
+        self.profiler = None
+
+        # wait for fixed SPM times instead of synchronizing with a break after erase/write
+        self.timed_sync = timed_sync
+
+        # switch to the fastest clock divisor the adapter can follow after every reset
+        self.fast_link = fast_link
+
+        # current clock divisor of the link
+        self.divisor = DEFAULT_DIVISOR
+
+        self._busy_until = 0
+        self._base_baudrate = None
+
+        # commands have been sent without synchronizing with the target since the last break
+        self._unsynced = False
+
+        # (start, bytes) pages written with timed synchronization that haven't been checked yet, see
+        # check_timed_pages
+        self._timed_pages = []
+        self._timed_dev = None
+
+        # an operation that falls back to the slow link on errors is running, see _slow_link_retry
+        self._in_operation = False
 
     def open(self):
         """Open the interface. Returns interface baud rate."""
 
-        baudrate = self.iface.open()
+        self._base_baudrate = self.iface.open()
         self.reset()
 
-        return baudrate
+        return self.iface.baudrate
 
     def close(self):
+        self.wait_ready()
+
+        if self.divisor != DEFAULT_DIVISOR:
+            try:
+                self._restore_divisor()
+            except DWException:
+                pass
+
         self.iface.close()
 
     def __enter__(self):
@@ -70,55 +470,164 @@ class DebugWire:
     def __exit__(self, type, value, traceback):
         self.close()
 
+    def _write(self, data):
+        self.wait_ready()
+        self.iface.write(data)
+
+    def wait_ready(self):
+        """Wait until the target is done with a timed SPM operation."""
+
+        delay = self._busy_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _set_busy(self, duration):
+        # the operation only starts once the command has actually been sent
+        self.iface.flush()
+
+        self._busy_until = time.monotonic() + duration
+        self._unsynced = True
+
+    def _resync(self):
+        """Get back in sync with a target that may have missed commands or still be sending.
+        Returns the response to the break."""
+
+        self.iface.discard_input()
+        response = self.iface.send_break()
+        self._unsynced = False
+
+        # the sync byte may arrive after the break has been read, don't let it confuse later reads
+        time.sleep(0.01)
+        self.iface.discard_input()
+
+        return response
+
     def reset(self):
         """Reset the target device."""
 
+        self._check_timed_pages()
+
+        if self.divisor != DEFAULT_DIVISOR:
+            self._restore_divisor()
+
+        self.wait_ready()
         self.iface.send_break()
+        self._unsynced = False
         self.iface.write([CMD_RESET])
 
         while self.iface.read(1)[0] != 0x55:
             pass
 
+        if self.fast_link:
+            self._select_fast_divisor()
+
+    def _set_divisor(self, divisor):
+        self.wait_ready()
+        self.iface.write([CMD_DIVISOR[divisor]])
+
+        self.divisor = divisor
+        self.iface.set_baudrate(self._base_baudrate * DEFAULT_DIVISOR // divisor)
+
+        # anything received while switching is garbage
+        time.sleep(0.001)
+        self.iface.discard_input()
+
+    def _restore_divisor(self):
+        # the link may be broken at this point, so the echo can't be trusted
+        try:
+            self.iface.write([CMD_DIVISOR[DEFAULT_DIVISOR]])
+            self.iface.flush()
+        except DWException:
+            pass
+
+        self.divisor = DEFAULT_DIVISOR
+        self.iface.set_baudrate(self._base_baudrate)
+        self.iface.discard_input()
+
+    def _select_fast_divisor(self):
+        """Switch to the smallest divisor at which the link still works reliably."""
+
+        sig = self.read_signature()
+
+        for divisor in (d for d in CMD_DIVISOR if d < DEFAULT_DIVISOR):
+            baudrate = self._base_baudrate * DEFAULT_DIVISOR // divisor
+
+            if self.iface.max_baudrate and baudrate > self.iface.max_baudrate:
+                continue
+
+            try:
+                self._set_divisor(divisor)
+
+                if self._read_signature() == sig:
+                    if self.enable_log:
+                        print("Switched link to clock/{} ({} baud)".format(divisor, baudrate))
+
+                    return
+            except DWException:
+                pass
+
+            self._restore_divisor()
+
+            # make sure the target is back at the default rate before trying the next divisor
+            if self._read_signature() != sig:
+                raise DWException("Failed to restore link speed.")
+
+    def _fall_back_to_slow_link(self):
+        """Go back to the default clock divisor after the faster link has failed."""
+
+        self.metrics.inc("fast_link_fallbacks")
+
+        if self.enable_log:
+            print("Link failed at clock/{}, falling back to clock/{}".format(
+                self.divisor, DEFAULT_DIVISOR))
+
+        # the link can't be trusted at this speed for the rest of the session
+        self.fast_link = False
+
+        self.wait_ready()
+        self._restore_divisor()
+        self._resync()
+
     def run(self):
         """Run the code on the target device."""
 
-        self.iface.write([CMD_RUN])
+        if self.divisor != DEFAULT_DIVISOR:
+            self._restore_divisor()
+
+        self._write([CMD_RUN])
 
     def disable(self):
         """Disable DebugWire and enable ISP until the next power cycle."""
 
-        self.iface.write([CMD_DISABLE])
+        self._write([CMD_DISABLE])
 
+    @_slow_link_retry
     def read_signature(self):
         """Returns the device debugWIRE signature as an integer."""
 
-        self.iface.write([CMD_READ_SIG])
+        return self._read_signature()
+
+    def _read_signature(self):
+        self._write([CMD_READ_SIG])
         sig = self.iface.read(2)
 
         return (sig[0] << 8) | sig[1]
 
+    @_slow_link_retry
     def read_regs(self, start, count):
         """Read registers from the target and return a list."""
 
-        self.iface.write([
-            CMD_RW,
-            CMD_RW_MODE, RW_MODE_READ_REGS,
-            CMD_SET_PC, 0x00, start,
-            CMD_SET_BP, 0x00, start + count,
-            CMD_GO])
+        self._write(rw_cmd(RW_MODE_READ_REGS, start, start + count))
 
         return self.iface.read(count)
 
+    @_slow_link_retry
     def write_regs(self, start, values):
         """Write a list of register values to the target."""
 
-        self.iface.write([
-            CMD_RW,
-            CMD_RW_MODE, RW_MODE_WRITE_REGS,
-            CMD_SET_PC, 0x00, start,
-            CMD_SET_BP, 0x00, start + len(values),
-            CMD_GO] + list(values))
+        self._write(write_regs_cmd(start, values))
 
+    @_slow_link_retry
     def read_sram(self, start, count):
         """Read a segment of SRAM memory from the target."""
 
@@ -126,15 +635,11 @@ class DebugWire:
 
         self.write_regs(REG_Z, [start & 0xff, (start >> 8) & 0xff])
 
-        self.iface.write([
-            CMD_RW,
-            CMD_RW_MODE, RW_MODE_READ_SRAM,
-            CMD_SET_PC, 0x00, 0x00,
-            CMD_SET_BP, (end >> 8) & 0xff, end & 0xff,
-            CMD_GO])
+        self._write(rw_cmd(RW_MODE_READ_SRAM, 0, end))
 
         return self.iface.read(count)
 
+    @_slow_link_retry
     def write_sram(self, start, values):
         """Write a segment of SRAM memory to the target."""
 
@@ -142,159 +647,463 @@ class DebugWire:
 
         self.write_regs(REG_Z, [start & 0xff, (start >> 8) & 0xff])
 
-        self.iface.write([
-            CMD_RW,
-            CMD_RW_MODE, RW_MODE_WRITE_SRAM,
-            CMD_SET_PC, 0x00, 0x01,
-            CMD_SET_BP, (end >> 8) & 0xff, end & 0xff,
-            CMD_GO] + list(values))
+        self._write(rw_cmd(RW_MODE_WRITE_SRAM, 1, end) + bytes(values))
 
-    def read_flash(self, start, count):
-        """Read a segment of flash memory from the target."""
+    @_slow_link_retry
+    def read_flash(self, start, count, dev=None):
+        """Read a segment of flash memory from the target. dev is needed above 64 KiB."""
 
-        end = count * 2
+        # the data keeps streaming in between blocks, but a single read of a large segment would
+        # take longer than the interface timeout on a slow link
+        return b"".join(self.read_flash_stream(start, count, dev=dev))
+
+    def read_flash_stream(self, start, count, block_len=64, dev=None):
+        """Read a segment of flash memory from the target, yielding blocks of data as they arrive.
+
+        The segment is read in as few transactions as possible. Closing the generator early aborts
+        the transfer. dev is needed above 64 KiB."""
+
+        while count > 0:
+            if start >= RAMPZ_START:
+                yield from self._read_flash_extended(dev, start, count)
+                return
+
+            n = min(count, MAX_READ_LEN, RAMPZ_START - start)
+            end = n * 2
+
+            self.write_regs(REG_Z, [start & 0xff, (start >> 8) & 0xff])
+
+            self._write(rw_cmd(RW_MODE_READ_FLASH, 0, end))
+
+            remaining = n
+
+            try:
+                while remaining:
+                    block = self.iface.read(min(remaining, block_len))
+                    remaining -= len(block)
+
+                    yield block
+            finally:
+                if remaining:
+                    self._abort_transfer()
+
+            start += n
+            count -= n
+
+    def _read_flash_extended(self, dev, start, count):
+        # the flash read mode only has a 16-bit pointer, so above that flash is read with elpm into
+        # registers, which is slower but can reach all of it
+
+        if not dev or not dev.reg_rampz:
+            raise DWException("Flash above 64 KiB can only be read from devices with RAMPZ")
 
         self.write_regs(REG_Z, [start & 0xff, (start >> 8) & 0xff])
+        self._exec([
+            asm.ldi(16, start >> 16),     # ldi r16, (bits 16-23 of address)
+            asm.out(dev.reg_rampz, 16)])  # out RAMPZ, r16
 
-        self.iface.write([
-            CMD_RW,
-            CMD_RW_MODE, RW_MODE_READ_FLASH,
-            CMD_SET_PC, 0x00, 0x00,
-            CMD_SET_BP, (end >> 8) & 0xff, end & 0xff,
-            CMD_GO])
+        while count > 0:
+            n = min(count, ELPM_BATCH_LEN)
 
-        return self.iface.read(count)
+            # elpm rN, Z+ for each byte, which also increments RAMPZ when Z wraps
+            self._exec([asm.elpm_inc(r) for r in range(n)])
+
+            yield self.read_regs(0, n)
+
+            count -= n
+
+    @_slow_link_retry
+    def verify_pages(self, pages, progress=None, dev=None):
+        """Compare a list of (start, bytes) flash pages against the target.
+
+        Returns None if everything matches, otherwise the start of the first mismatching page. The
+        optional progress(current, count) callback is called as each page is verified. dev is needed
+        above 64 KiB."""
+
+        self._check_timed_pages()
+
+        # a target that missed commands during timed synchronization can't be trusted to answer
+        if self._unsynced:
+            self._resync()
+
+        with self.metrics.timer("verify"):
+            mismatch = self._verify_pages(pages, progress, dev)
+
+        if mismatch is not None:
+            self.metrics.inc("verify_mismatches")
+
+        return mismatch
+
+    def _verify_pages(self, pages, progress, dev):
+        if not pages:
+            return None
+
+        pagesize = len(pages[0][1])
+
+        # group consecutive pages so that each group can be read in one go
+
+        runs = []
+
+        for start, pagebytes in pages:
+            if runs and runs[-1][0] + len(runs[-1][1]) * pagesize == start:
+                runs[-1][1].append(pagebytes)
+            else:
+                runs.append((start, [pagebytes]))
+
+        done = 0
+
+        for run_start, run_pages in runs:
+            expected = b"".join(run_pages)
+            run_done = done
+            pos = 0
+
+            stream = self.read_flash_stream(run_start, len(expected), dev=dev)
+
+            for block in stream:
+                if block != expected[pos:pos + len(block)]:
+                    stream.close()
+
+                    offset = pos + next(i for i, b in enumerate(block) if b != expected[pos + i])
+
+                    return run_start + offset - offset % pagesize
+
+                pos += len(block)
+
+                while done < run_done + pos // pagesize:
+                    if progress:
+                        progress(done, len(pages))
+
+                    done += 1
+
+        return None
+
+    def _abort_transfer(self):
+        """Stop the target from sending the rest of a read transaction."""
+
+        self.metrics.inc("transfer_aborts")
+
+        self._resync()
 
     def _exec(self, code):
-        buf = bytes()
+        with self.metrics.timer("exec"):
+            self._write(exec_cmd(code))
+
+    @_slow_link_retry
+    def write_flash_pages(self, dev, pages, no_erase=(), progress=None):
+        """Write a list of (start, bytes) flash pages to the target as a single command stream.
+
+        Commands are only split where the target has to be waited for and where buffer loads are
+        split into chunk_len bytes, so the number of round trips depends on the number of page
+        erases, writes and chunks instead of the number of commands. Pages with a start in no_erase
+        are programmed without erasing them first (see write_flash_page). The optional
+        progress(current, count) callback is called as each page is completed."""
+
+        prof = self.profiler or (SimpleProfiler if self.enable_log else DummyProfiler)()
+        prof.step("Starting page write")
+
+        stream = page_stream(dev, pages, self.chunk_len, no_erase, self.timed_sync)
+
+        prof.step("Prepare commands")
+
+        if self.timed_sync:
+            self._start_timed_pages(dev)
+
+        for seg in stream:
+            # with timed sync the target is still busy with the previous segment
+            self.wait_ready()
+
+            prof.step("Erase page" if seg.done else "Write flash")
+            seg_start = time.monotonic()
 
-        for inst in code:
-            if type(inst) == bytes:
-                buf += inst
+            for buf in seg.writes:
+                self._write(buf)
+
+            prof.step("Write data" if seg.done else "Clear buffer")
+            sync_start = time.monotonic()
+
+            if seg.sync == SYNC_BREAK:
+                self.iface.send_break()
+            elif seg.sync:
+                self._set_busy(seg.sync)
+
+            prof.step("Write flash" if seg.done else "Erase page")
+
+            if seg.done:
+                # the load and write commands are in the same segment
+                self.metrics.observe("page_load", sync_start - seg_start)
+                self.metrics.observe("page_write", time.monotonic() - sync_start)
+                self.metrics.inc("pages_written")
+
+                if self.timed_sync:
+                    self._timed_pages.append(pages[seg.page])
+
+                if progress:
+                    progress(seg.page, len(pages))
             else:
-                buf += bytes([
-                    CMD_SET_IR, (inst >> 8) & 0xff, inst & 0xff, CMD_STEP])
+                self.metrics.observe("page_erase", time.monotonic() - seg_start)
+                self.metrics.inc("pages_erased")
+
+        if self.timed_sync:
+            self._check_timed_pages(prof)
+
+    @_slow_link_retry
+    def write_flash_page(self, dev, start, data, erase=True):
+        """Write a page of flash memory to the target.
+
+        If erase is False the page is programmed without erasing it first, which is only correct if
+        the page already reads back as all ones wherever data has a one (see needs_erase).
 
-        self.iface.write(buf)
+        With timed_sync the method returns while the target is still writing the page, so the next
+        page can be prepared and sent in the meantime. Pages written that way are checked together
+        later (see check_timed_pages)."""
 
-    def write_flash_page(self, dev, start, data):
         if start % dev.flash_pagesize != 0:
             raise DWException("Bad page offset")
 
         if len(data) != dev.flash_pagesize:
             raise DWException("Bad page size")
 
-        prof = (SimpleProfiler if self.enable_log else DummyProfiler)()
+        prof = self.profiler or (SimpleProfiler if self.enable_log else DummyProfiler)()
         prof.step("Starting page write")
 
-        # set up constants in registers
+        if self.timed_sync:
+            self._start_timed_pages(dev)
 
-        self.write_regs(26, [
-            SPMEN,                            # r26
-            PGERS | SPMEN,                    # r27
-            PGWRT | SPMEN,                    # r28
-            CTPB | SPMEN,                     # r29
-            start & 0xff, (start >> 8) & 0xff # r30:r31(Z)
-        ])
+        self._write_flash_page(dev, start, data, erase, prof, self.timed_sync)
 
-        # clear self-programming buffer
+        if self.timed_sync:
+            self._timed_pages.append((start, data))
 
-        prof.step("Write constants")
+    def _write_flash_page(self, dev, start, data, erase, prof, timed):
+        # prepare all commands before waiting for a previous timed page write to complete
 
-        self._exec([
-            asm.movw(24, 30),            # movw r24, r30
-            asm.out(dev.reg_spmcsr, 29), # out SPMCSR, r29 ; CTPB | SPMEN
-            asm.spm()])                  # spm
+        cmds = page_write_cmds(dev, start, data, self.chunk_len)
 
-        self.iface.send_break()
+        prof.step("Prepare commands")
 
-        prof.step("Clear buffer")
+        self.wait_ready()
 
-        # erase flash page
+        prof.step("Wait for previous page")
 
-        self._exec([
-            asm.out(dev.reg_spmcsr, 27), # out SPMCSR, r27 ; PGERS | SPMEN
-            asm.spm(),                   # spm
-        ])
+        if timed:
+            # clearing the buffer is immediate, so erasing can follow without synchronization
 
-        # wait for erase to complete
-        self.iface.send_break()
+            with self.metrics.timer("page_erase"):
+                self.iface.write(cmds.setup + (cmds.erase if erase else b""))
+
+                if erase:
+                    self._set_busy(spm_time(dev, "erase"))
 
-        prof.step("Erase page")
+            prof.step("Clear buffer and erase page")
+        else:
+            self.iface.write(cmds.setup)
+            self.iface.send_break()
 
-        # write data to buffer
+            prof.step("Clear buffer")
 
-        # How many instruction bytes to write at once
-        # The maximum suitable value for this is probably related to USB buffer sizes etc.
-        CHUNK_LEN = 16
+            if erase:
+                with self.metrics.timer("page_erase"):
+                    self.iface.write(cmds.erase)
 
-        for ci in range(0, len(data), CHUNK_LEN):
-            buf = []
+                    # wait for erase to complete
+                    self.iface.send_break()
 
-            for ii in range(ci, ci + CHUNK_LEN, 2):
-                if dev.reg_dwdr:
-                    buf += [
-                        asm.in_(dev.reg_dwdr, 0), bytes([data[ii]]),     # in r0, DWDR ; (low byte)
-                        asm.in_(dev.reg_dwdr, 1), bytes([data[ii + 1]])] # in r1, DWDR ; (high byte)
-                else:
-                    buf += [
-                        asm.ldi(22, data[ii]),                           # ldi r22, (low byte)
-                        asm.ldi(23, data[ii + 1]),                       # ldi r23, (high byte)
-                        asm.movw(0, 22)]                                 # movw r0, r22
+                prof.step("Erase page")
 
-                buf += [
-                    asm.out(dev.reg_spmcsr, 26),                         # out SPMCSR, r26 ; SPMEN
-                    asm.spm(),                                           # spm
-                    asm.adiw(30, 2)]                                     # adiw Z, 2
+        if erase:
+            self.metrics.inc("pages_erased")
 
-            self._exec(buf)
+        with self.metrics.timer("page_load"):
+            for buf in cmds.load:
+                self._write(buf)
 
         prof.step("Write data")
 
-        # write buffer to flash
+        with self.metrics.timer("page_write"):
+            self.iface.write(cmds.write)
 
-        self._exec([
-            asm.movw(30, 24),            # movw r30, r24
-            asm.out(dev.reg_spmcsr, 28), # out SPMCSR, r28 ; PGWRT | SPMEN
-            asm.spm()])                  # spm
+            if timed:
+                # the next command will wait for the write to complete
+                self._set_busy(spm_time(dev, "write"))
+            else:
+                # wait for write to complete
+                self.iface.send_break()
 
-        # wait for write to complete
-        self.iface.send_break()
+        self.metrics.inc("pages_written")
 
         prof.step("Write flash")
 
-    def read_fuses(self, dev):
-        """Reads the fuse and lock bits from the target and returns them as a named tuple."""
+    def _start_timed_pages(self, dev):
+        if not self._timed_pages:
+            # clear the sum checked by check_timed_pages
+            self.write_regs(20, [0, 0])
 
-        # set up constants
+        self._timed_dev = dev
 
-        buf = [
-            asm.ldi(29, RFLB | SPMEN),       # ldi r29, RFLB | SPMEN
-            asm.ldi(31, 0),                  # ldi r31, 0 ; (high byte of Z)
-        ]
+    @_slow_link_retry
+    def check_timed_pages(self):
+        """Check the pages written with timed synchronization since the last check.
 
-        # there are four bytes to read
+        The target drops commands sent while it's busy without an error, because the echo comes
+        from the adapter, so every page write adds to a sum in r20:r21 that is only right if all
+        commands arrived (see page_write_check). It is read back once for all pages, and only if it
+        is wrong are the pages read back and the ones that don't match written again with break
+        synchronization. This is done by write_flash_pages, verify_pages and reset."""
 
-        for index in reversed(range(4)):
+        self._check_timed_pages()
 
-            # read fuse/lock bit into r0
+    def _check_timed_pages(self, prof=None):
+        if not self._timed_pages:
+            return
 
-            buf += [
-                asm.ldi(30, index),          # ldi r31, index ; (low byte of Z)
-                asm.out(dev.reg_spmcsr, 29), # out SPMCSR, r29 ; RFLB | SPMEN
-                asm.lpm(),                   # lpm
-            ]
+        prof = prof or DummyProfiler()
+
+        dev, pages = self._timed_dev, self._timed_pages
+        self._timed_pages = []
+
+        # wait for the last page and get back in sync if the target missed commands
+        self.wait_ready()
+        self._find_target()
+
+        ok = self.read_regs(20, 2) == page_write_check(dev, (start for start, data in pages))
+
+        prof.step("Check pages")
+
+        if ok:
+            return
+
+        for start, data in pages:
+            if self.read_flash(start, len(data), dev=dev) != data:
+                self.metrics.inc("sync_fallbacks")
+                self._write_flash_page(dev, start, data, True, prof, timed=False)
+
+        prof.step("Rewrite missed pages")
+
+    def _find_target(self):
+        """Get back in sync with a target that missed commands and may have taken the rest of a
+        command stream for other commands, including one that changed its clock divisor."""
+
+        divisor = self.divisor
+
+        for d in sorted(CMD_DIVISOR, key=lambda d: d != divisor):
+            self.iface.set_baudrate(self._base_baudrate * DEFAULT_DIVISOR // d)
+
+            try:
+                # the sync byte only reads back right at the target's rate
+                if self._resync()[-1:] != b"\x55":
+                    continue
+            except DWException:
+                continue
+
+            if d != divisor:
+                self.divisor = d
+                self._set_divisor(divisor)
+
+            return
+
+        self.iface.set_baudrate(self._base_baudrate * DEFAULT_DIVISOR // divisor)
 
-            # move into another register if not reading index 0
+        raise DWException("Target stopped responding after missing commands.")
 
-            if index != 0:
-                buf += [
-                    asm.mov(index, 0),       # mov r[index], r0
-                ]
+    def calibrate_chunk_len(self, dev, chunk_lens=(8, 16, 32, 64, 128, 256), total=128, repeats=2):
+        """Find the fastest reliable chunk length for loading the self-programming buffer.
 
-        # execute generated code
+        Sends total bytes worth of harmless nop instructions in chunks the same size as buffer load
+        commands for each chunk length and returns the chunk length with the best throughput."""
+
+        word_cmd_len = len(exec_cmd(load_word_code(dev, 0, 0)))
+        nop_cmd = exec_cmd([asm.nop()])
+
+        best = None
+
+        for chunk_len in chunk_lens:
+            chunk = nop_cmd * (word_cmd_len * chunk_len // 2 // len(nop_cmd))
+
+            try:
+                start = time.monotonic()
+
+                for i in range(repeats * total // chunk_len):
+                    self._write(chunk)
+
+                self.iface.flush()
+
+                elapsed = time.monotonic() - start
+            except DWException:
+                # adapter can't keep up, resync and stop trying larger chunks
+                self.iface.send_break()
+                break
+
+            if self.enable_log:
+                print("Chunk length {}: {:.1f}ms".format(chunk_len, elapsed / repeats * 1000))
+
+            if best is None or elapsed < best[1]:
+                best = (chunk_len, elapsed)
+
+        if best is None:
+            raise DWException("Failed to calibrate chunk length.")
+
+        return best[0]
+
+    def _check_eeprom_range(self, dev, start, count):
+        if start < 0 or start + count > dev.eeprom_size:
+            raise DWException("EEPROM range 0x{:x}-0x{:x} is outside of the {} byte EEPROM.".format(
+                start, start + count, dev.eeprom_size))
+
+    @_slow_link_retry
+    def read_eeprom(self, dev, start, count):
+        """Read a segment of EEPROM from the target."""
+
+        self._check_eeprom_range(dev, start, count)
+
+        buf = b""
+
+        self.write_regs(REG_Z, [start & 0xff, (start >> 8) & 0xff])
+
+        while len(buf) < count:
+            n = min(count - len(buf), EEPROM_BATCH_LEN)
+
+            self._exec(read_eeprom_code(dev, n))
+
+            buf += self.read_regs(0, n)
+
+        return buf
+
+    @_slow_link_retry
+    def write_eeprom(self, dev, start, data, progress=None):
+        """Write a segment of EEPROM to the target.
+
+        Each byte takes milliseconds to program, so the current contents are read first and only the
+        bytes that differ are written. Returns the number of bytes written. The optional
+        progress(current, count) callback is called before each byte is written."""
+
+        self._check_eeprom_range(dev, start, len(data))
+
+        current = self.read_eeprom(dev, start, len(data))
+
+        changed = [i for i, (a, b) in enumerate(zip(current, data)) if a != b]
+
+        code = exec_cmd(write_eeprom_code(dev))
+
+        for done, i in enumerate(changed):
+            if progress:
+                progress(done, len(changed))
+
+            addr = start + i
+
+            # the CPU keeps running while the EEPROM is being programmed, but the next access has to
+            # wait until it's done
+            self._write(write_regs_cmd(29, [data[i], addr & 0xff, (addr >> 8) & 0xff]) + code)
+            self._set_busy(EEPROM_WRITE_TIME * SPM_TIME_MARGIN)
+
+        self.wait_ready()
+
+        return len(changed)
+
+    @_slow_link_retry
+    def read_fuses(self, dev):
+        """Reads the fuse and lock bits from the target and returns them as a named tuple."""
 
-        self._exec(buf)
+        self._exec(read_fuses_code(dev))
 
         # read r0-r3 which now contain the bytes that were read
 
@@ -1,158 +1,194 @@
 # Generated with generatedevices.py
 
-class Device:
-    def __init__(self, **kwargs):
-        for key in kwargs:
-            setattr(self, key, kwargs[key])
+from collections import namedtuple
 
-devices = [
-    Device(devid="at90can128", name="AT90CAN128", signature=0x978103f, flash_size=0x20000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="at90can32", name="AT90CAN32", signature=0x958103f, flash_size=0x8000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="at90can64", name="AT90CAN64", signature=0x968103f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="at90pwm1", name="AT90PWM1", signature=0x9383, flash_size=0x2000, flash_pagesize=0x40, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="at90pwm161", name="AT90PWM161", signature=0x948b, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="at90pwm216", name="AT90PWM216", signature=0x9483, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="at90pwm2b", name="AT90PWM2B", signature=0x9383, flash_size=0x2000, flash_pagesize=0x40, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="at90pwm316", name="AT90PWM316", signature=0x9483, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="at90pwm3b", name="AT90PWM3B", signature=0x9383, flash_size=0x2000, flash_pagesize=0x40, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="at90pwm81", name="AT90PWM81", signature=0x9388, flash_size=0x2000, flash_pagesize=0x40, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="at90usb1286", name="AT90USB1286", signature=0x978203f, flash_size=0x20000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="at90usb1287", name="AT90USB1287", signature=0x978203f, flash_size=0x20000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="at90usb162", name="AT90USB162", signature=0x9482, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=0x31, reg_spmcsr=0x37),
-    Device(devid="at90usb646", name="AT90USB646", signature=0x968203f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="at90usb647", name="AT90USB647", signature=0x968203f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="at90usb82", name="AT90USB82", signature=0x9682, flash_size=0x2000, flash_pagesize=0x80, reg_dwdr=0x31, reg_spmcsr=0x37),
-    Device(devid="atmega128", name="ATmega128", signature=0x970203f, flash_size=0x20000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x48),
-    Device(devid="atmega1280", name="ATmega1280", signature=0x970303f, flash_size=0x20000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega1281", name="ATmega1281", signature=0x970403f, flash_size=0x20000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega1284", name="ATmega1284", signature=0x970503f, flash_size=0x20000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega1284p", name="ATmega1284P", signature=0x970503f, flash_size=0x20000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega1284rfr2", name="ATmega1284RFR2", signature=0xa70303f, flash_size=0x20000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega128a", name="ATmega128A", signature=0x970203f, flash_size=0x20000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x48),
-    Device(devid="atmega128rfa1", name="ATmega128RFA1", signature=0xa70103f, flash_size=0x20000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega128rfr2", name="ATmega128RFR2", signature=0xa70203f, flash_size=0x20000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega16", name="ATmega16", signature=0x940303f, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega162", name="ATmega162", signature=0x940403f, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega164a", name="ATmega164A", signature=0x940a03f, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega164p", name="ATmega164P", signature=0x940a03f, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega164pa", name="ATmega164PA", signature=0x940a03f, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega165a", name="ATmega165A", signature=0x940703f, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega165p", name="ATmega165P", signature=0x940703f, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega165pa", name="ATmega165PA", signature=0x940703f, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega168", name="ATmega168", signature=0x9406, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega168a", name="ATmega168A", signature=0x940b, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega168p", name="ATmega168P", signature=0x940b, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega168pa", name="ATmega168PA", signature=0x940b, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega168pb", name="ATmega168PB", signature=0x9415, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega169a", name="ATmega169A", signature=0x940503f, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega169p", name="ATmega169P", signature=0x940503f, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega169pa", name="ATmega169PA", signature=0x940503f, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega16a", name="ATmega16A", signature=0x940303f, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega16hva", name="ATmega16HVA", signature=0x940c, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega16hvb", name="ATmega16HVB", signature=0x940d, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega16hvbrevb", name="ATmega16HVBrevB", signature=0x940d, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega16m1", name="ATmega16M1", signature=0x9484, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega16u2", name="ATmega16U2", signature=0x9489, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=0x31, reg_spmcsr=0x37),
-    Device(devid="atmega16u4", name="ATmega16U4", signature=0x948803f, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega2560", name="ATmega2560", signature=0x980103f, flash_size=0x40000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega2561", name="ATmega2561", signature=0x980203f, flash_size=0x40000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega2564rfr2", name="ATmega2564RFR2", signature=0xa80303f, flash_size=0x40000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega256rfr2", name="ATmega256RFR2", signature=0xa80203f, flash_size=0x40000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega32", name="ATmega32", signature=0x950203f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega324a", name="ATmega324A", signature=0x951103f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega324p", name="ATmega324P", signature=0x950803f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega324pa", name="ATmega324PA", signature=0x951103f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega324pb", name="ATmega324PB", signature=0x951703f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega325", name="ATmega325", signature=0x950503f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega3250", name="ATmega3250", signature=0x950603f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega3250a", name="ATmega3250A", signature=0x950e03f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega3250p", name="ATmega3250P", signature=0x950e03f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega3250pa", name="ATmega3250PA", signature=0x950e03f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega325a", name="ATmega325A", signature=0x950d03f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega325p", name="ATmega325P", signature=0x950d03f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega325pa", name="ATmega325PA", signature=0x950d03f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega328", name="ATmega328", signature=0x950f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega328p", name="ATmega328P", signature=0x950f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega328pb", name="ATmega328PB", signature=0x9516, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega329", name="ATmega329", signature=0x950303f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega3290", name="ATmega3290", signature=0x950403f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega3290a", name="ATmega3290A", signature=0x950c03f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega3290p", name="ATmega3290P", signature=0x950c03f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega3290pa", name="ATmega3290PA", signature=0x950c03f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega329a", name="ATmega329A", signature=0x950b03f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega329p", name="ATmega329P", signature=0x950b03f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega329pa", name="ATmega329PA", signature=0x950b03f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega32a", name="ATmega32A", signature=0x950203f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega32c1", name="ATmega32C1", signature=0x9586, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega32hvb", name="ATmega32HVB", signature=0x9510, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega32hvbrevb", name="ATmega32HVBrevB", signature=0x9510, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega32m1", name="ATmega32M1", signature=0x9584, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega32u2", name="ATmega32U2", signature=0x958a, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=0x31, reg_spmcsr=0x37),
-    Device(devid="atmega32u4", name="ATmega32U4", signature=0x958703f, flash_size=0x8000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega406", name="ATmega406", signature=0x950703f, flash_size=0xa000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega48", name="ATmega48", signature=0x9205, flash_size=0x1000, flash_pagesize=0x40, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega48a", name="ATmega48A", signature=0x920a, flash_size=0x1000, flash_pagesize=0x40, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega48p", name="ATmega48P", signature=0x920a, flash_size=0x1000, flash_pagesize=0x40, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega48pa", name="ATmega48PA", signature=0x920a, flash_size=0x1000, flash_pagesize=0x40, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega48pb", name="ATmega48PB", signature=0x9210, flash_size=0x1000, flash_pagesize=0x40, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega64", name="ATmega64", signature=0x960203f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x48),
-    Device(devid="atmega640", name="ATmega640", signature=0x960803f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega644", name="ATmega644", signature=0x960903f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega644a", name="ATmega644A", signature=0x960a03f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega644p", name="ATmega644P", signature=0x960a03f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega644pa", name="ATmega644PA", signature=0x960a03f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega644rfr2", name="ATmega644RFR2", signature=0xa60303f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega645", name="ATmega645", signature=0x960503f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega6450", name="ATmega6450", signature=0x960603f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega6450a", name="ATmega6450A", signature=0x960e03f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega6450p", name="ATmega6450P", signature=0x960e03f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega645a", name="ATmega645A", signature=0x960d03f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega645p", name="ATmega645P", signature=0x960d03f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega649", name="ATmega649", signature=0x960303f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega6490", name="ATmega6490", signature=0x960403f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega6490a", name="ATmega6490A", signature=0x960c03f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega6490p", name="ATmega6490P", signature=0x960c03f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega649a", name="ATmega649A", signature=0x960b03f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega649p", name="ATmega649P", signature=0x960b03f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega64a", name="ATmega64A", signature=0x960203f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x48),
-    Device(devid="atmega64c1", name="ATmega64C1", signature=0x9686, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega64hve2", name="ATmega64HVE2", signature=0x9610, flash_size=0x10000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega64m1", name="ATmega64M1", signature=0x9684, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega64rfr2", name="ATmega64RFR2", signature=0xa60203f, flash_size=0x10000, flash_pagesize=0x100, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega88", name="ATmega88", signature=0x930a, flash_size=0x2000, flash_pagesize=0x40, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega88a", name="ATmega88A", signature=0x930f, flash_size=0x2000, flash_pagesize=0x40, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega88p", name="ATmega88P", signature=0x930f, flash_size=0x2000, flash_pagesize=0x40, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega88pa", name="ATmega88PA", signature=0x930f, flash_size=0x2000, flash_pagesize=0x40, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega88pb", name="ATmega88PB", signature=0x9316, flash_size=0x2000, flash_pagesize=0x40, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega8hva", name="ATmega8HVA", signature=0x9310, flash_size=0x2000, flash_pagesize=0x80, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="atmega8u2", name="ATmega8U2", signature=0x9389, flash_size=0x2000, flash_pagesize=0x80, reg_dwdr=0x31, reg_spmcsr=0x37),
-    Device(devid="attiny13", name="ATtiny13", signature=0x9007, flash_size=0x400, flash_pagesize=0x20, reg_dwdr=0x2e, reg_spmcsr=0x37),
-    Device(devid="attiny13a", name="ATtiny13A", signature=0x9007, flash_size=0x400, flash_pagesize=0x20, reg_dwdr=0x2e, reg_spmcsr=0x37),
-    Device(devid="attiny1634", name="ATtiny1634", signature=0x9412, flash_size=0x4000, flash_pagesize=0x20, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="attiny167", name="ATtiny167", signature=0x9487, flash_size=0x4000, flash_pagesize=0x80, reg_dwdr=0x31, reg_spmcsr=0x37),
-    Device(devid="attiny2313", name="ATtiny2313", signature=0x910a, flash_size=0x800, flash_pagesize=0x20, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="attiny2313a", name="ATtiny2313A", signature=0x910a, flash_size=0x800, flash_pagesize=0x20, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="attiny24", name="ATtiny24", signature=0x910b, flash_size=0x800, flash_pagesize=0x20, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="attiny24a", name="ATtiny24A", signature=0x910b, flash_size=0x800, flash_pagesize=0x20, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="attiny25", name="ATtiny25", signature=0x9108, flash_size=0x800, flash_pagesize=0x20, reg_dwdr=0x22, reg_spmcsr=0x37),
-    Device(devid="attiny261", name="ATtiny261", signature=0x910c, flash_size=0x800, flash_pagesize=0x20, reg_dwdr=0x20, reg_spmcsr=0x37),
-    Device(devid="attiny261a", name="ATtiny261A", signature=0x910c, flash_size=0x800, flash_pagesize=0x20, reg_dwdr=0x20, reg_spmcsr=0x37),
-    Device(devid="attiny4313", name="ATtiny4313", signature=0x920d, flash_size=0x1000, flash_pagesize=0x40, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="attiny43u", name="ATtiny43U", signature=0x920c, flash_size=0x1000, flash_pagesize=0x40, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="attiny44", name="ATtiny44", signature=0x9207, flash_size=0x1000, flash_pagesize=0x40, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="attiny441", name="ATtiny441", signature=0x9215, flash_size=0x1000, flash_pagesize=0x10, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="attiny44a", name="ATtiny44A", signature=0x9207, flash_size=0x1000, flash_pagesize=0x40, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="attiny45", name="ATtiny45", signature=0x9206, flash_size=0x1000, flash_pagesize=0x40, reg_dwdr=0x22, reg_spmcsr=0x37),
-    Device(devid="attiny461", name="ATtiny461", signature=0x9208, flash_size=0x1000, flash_pagesize=0x40, reg_dwdr=0x20, reg_spmcsr=0x37),
-    Device(devid="attiny461a", name="ATtiny461A", signature=0x9208, flash_size=0x1000, flash_pagesize=0x40, reg_dwdr=0x20, reg_spmcsr=0x37),
-    Device(devid="attiny48", name="ATtiny48", signature=0x9209, flash_size=0x1000, flash_pagesize=0x40, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="attiny828", name="ATtiny828", signature=0x9314, flash_size=0x2000, flash_pagesize=0x40, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="attiny84", name="ATtiny84", signature=0x930c, flash_size=0x2000, flash_pagesize=0x40, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="attiny841", name="ATtiny841", signature=0x9315, flash_size=0x2000, flash_pagesize=0x10, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="attiny84a", name="ATtiny84A", signature=0x930c, flash_size=0x2000, flash_pagesize=0x40, reg_dwdr=None, reg_spmcsr=0x37),
-    Device(devid="attiny85", name="ATtiny85", signature=0x930b, flash_size=0x2000, flash_pagesize=0x40, reg_dwdr=0x22, reg_spmcsr=0x37),
-    Device(devid="attiny861", name="ATtiny861", signature=0x930d, flash_size=0x2000, flash_pagesize=0x40, reg_dwdr=0x20, reg_spmcsr=0x37),
-    Device(devid="attiny861a", name="ATtiny861A", signature=0x930d, flash_size=0x2000, flash_pagesize=0x40, reg_dwdr=0x20, reg_spmcsr=0x37),
-    Device(devid="attiny87", name="ATtiny87", signature=0x9387, flash_size=0x2000, flash_pagesize=0x80, reg_dwdr=0x31, reg_spmcsr=0x37),
-    Device(devid="attiny88", name="ATtiny88", signature=0x9311, flash_size=0x2000, flash_pagesize=0x40, reg_dwdr=None, reg_spmcsr=0x37),
-]
+Device = namedtuple("Device", [
+    "devid", "name", "signature", "flash_size", "flash_pagesize", "reg_dwdr", "reg_spmcsr",
+    "reg_rampz", "spm_erase_time", "spm_write_time", "eeprom_size", "reg_eecr"])
+
+# Rows are only turned into Device objects when they are looked up
+_rows = (
+    ("at90can128", "AT90CAN128", 0x978103f, 0x20000, 0x100, None, 0x37, 0x3b, 0.0045, 0.0045, 0x1000, 0x1f),
+    ("at90can32", "AT90CAN32", 0x958103f, 0x8000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("at90can64", "AT90CAN64", 0x968103f, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x800, 0x1f),
+    ("at90pwm1", "AT90PWM1", 0x9383, 0x2000, 0x40, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("at90pwm161", "AT90PWM161", 0x948b, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("at90pwm216", "AT90PWM216", 0x9483, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("at90pwm2b", "AT90PWM2B", 0x9383, 0x2000, 0x40, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("at90pwm316", "AT90PWM316", 0x9483, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("at90pwm3b", "AT90PWM3B", 0x9383, 0x2000, 0x40, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("at90pwm81", "AT90PWM81", 0x9388, 0x2000, 0x40, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("at90usb1286", "AT90USB1286", 0x978203f, 0x20000, 0x100, None, 0x37, 0x3b, 0.0045, 0.0045, 0x1000, 0x1f),
+    ("at90usb1287", "AT90USB1287", 0x978203f, 0x20000, 0x100, None, 0x37, 0x3b, 0.0045, 0.0045, 0x1000, 0x1f),
+    ("at90usb162", "AT90USB162", 0x9482, 0x4000, 0x80, 0x31, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("at90usb646", "AT90USB646", 0x968203f, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x800, 0x1f),
+    ("at90usb647", "AT90USB647", 0x968203f, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x800, 0x1f),
+    ("at90usb82", "AT90USB82", 0x9682, 0x2000, 0x80, 0x31, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega128", "ATmega128", 0x970203f, 0x20000, 0x100, None, 0x48, 0x3b, 0.0045, 0.0045, 0x1000, 0x1c),
+    ("atmega1280", "ATmega1280", 0x970303f, 0x20000, 0x100, None, 0x37, 0x3b, 0.0045, 0.0045, 0x1000, 0x1f),
+    ("atmega1281", "ATmega1281", 0x970403f, 0x20000, 0x100, None, 0x37, 0x3b, 0.0045, 0.0045, 0x1000, 0x1f),
+    ("atmega1284", "ATmega1284", 0x970503f, 0x20000, 0x100, None, 0x37, 0x3b, 0.0045, 0.0045, 0x1000, 0x1f),
+    ("atmega1284p", "ATmega1284P", 0x970503f, 0x20000, 0x100, None, 0x37, 0x3b, 0.0045, 0.0045, 0x1000, 0x1f),
+    ("atmega1284rfr2", "ATmega1284RFR2", 0xa70303f, 0x20000, 0x100, None, 0x37, 0x3b, 0.0045, 0.0045, 0x1000, 0x1f),
+    ("atmega128a", "ATmega128A", 0x970203f, 0x20000, 0x100, None, 0x48, 0x3b, 0.0045, 0.0045, 0x1000, 0x1c),
+    ("atmega128rfa1", "ATmega128RFA1", 0xa70103f, 0x20000, 0x100, None, 0x37, 0x3b, 0.0045, 0.0045, 0x1000, 0x1f),
+    ("atmega128rfr2", "ATmega128RFR2", 0xa70203f, 0x20000, 0x100, None, 0x37, 0x3b, 0.0045, 0.0045, 0x1000, 0x1f),
+    ("atmega16", "ATmega16", 0x940303f, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1c),
+    ("atmega162", "ATmega162", 0x940403f, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1c),
+    ("atmega164a", "ATmega164A", 0x940a03f, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega164p", "ATmega164P", 0x940a03f, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega164pa", "ATmega164PA", 0x940a03f, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega165a", "ATmega165A", 0x940703f, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega165p", "ATmega165P", 0x940703f, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega165pa", "ATmega165PA", 0x940703f, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega168", "ATmega168", 0x9406, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega168a", "ATmega168A", 0x940b, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega168p", "ATmega168P", 0x940b, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega168pa", "ATmega168PA", 0x940b, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega168pb", "ATmega168PB", 0x9415, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega169a", "ATmega169A", 0x940503f, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega169p", "ATmega169P", 0x940503f, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega169pa", "ATmega169PA", 0x940503f, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega16a", "ATmega16A", 0x940303f, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1c),
+    ("atmega16hva", "ATmega16HVA", 0x940c, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x100, 0x1f),
+    ("atmega16hvb", "ATmega16HVB", 0x940d, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega16hvbrevb", "ATmega16HVBrevB", 0x940d, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega16m1", "ATmega16M1", 0x9484, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega16u2", "ATmega16U2", 0x9489, 0x4000, 0x80, 0x31, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega16u4", "ATmega16U4", 0x948803f, 0x4000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega2560", "ATmega2560", 0x980103f, 0x40000, 0x100, None, 0x37, 0x3b, 0.0045, 0.0045, 0x1000, 0x1f),
+    ("atmega2561", "ATmega2561", 0x980203f, 0x40000, 0x100, None, 0x37, 0x3b, 0.0045, 0.0045, 0x1000, 0x1f),
+    ("atmega2564rfr2", "ATmega2564RFR2", 0xa80303f, 0x40000, 0x100, None, 0x37, 0x3b, 0.0045, 0.0045, 0x2000, 0x1f),
+    ("atmega256rfr2", "ATmega256RFR2", 0xa80203f, 0x40000, 0x100, None, 0x37, 0x3b, 0.0045, 0.0045, 0x2000, 0x1f),
+    ("atmega32", "ATmega32", 0x950203f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1c),
+    ("atmega324a", "ATmega324A", 0x951103f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega324p", "ATmega324P", 0x950803f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega324pa", "ATmega324PA", 0x951103f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega324pb", "ATmega324PB", 0x951703f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega325", "ATmega325", 0x950503f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega3250", "ATmega3250", 0x950603f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega3250a", "ATmega3250A", 0x950e03f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega3250p", "ATmega3250P", 0x950e03f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega3250pa", "ATmega3250PA", 0x950e03f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega325a", "ATmega325A", 0x950d03f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega325p", "ATmega325P", 0x950d03f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega325pa", "ATmega325PA", 0x950d03f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega328", "ATmega328", 0x950f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega328p", "ATmega328P", 0x950f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega328pb", "ATmega328PB", 0x9516, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega329", "ATmega329", 0x950303f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega3290", "ATmega3290", 0x950403f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega3290a", "ATmega3290A", 0x950c03f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega3290p", "ATmega3290P", 0x950c03f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega3290pa", "ATmega3290PA", 0x950c03f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega329a", "ATmega329A", 0x950b03f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega329p", "ATmega329P", 0x950b03f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega329pa", "ATmega329PA", 0x950b03f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega32a", "ATmega32A", 0x950203f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1c),
+    ("atmega32c1", "ATmega32C1", 0x9586, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega32hvb", "ATmega32HVB", 0x9510, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega32hvbrevb", "ATmega32HVBrevB", 0x9510, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega32m1", "ATmega32M1", 0x9584, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega32u2", "ATmega32U2", 0x958a, 0x8000, 0x80, 0x31, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega32u4", "ATmega32U4", 0x958703f, 0x8000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega406", "ATmega406", 0x950703f, 0xa000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega48", "ATmega48", 0x9205, 0x1000, 0x40, None, 0x37, None, 0.0045, 0.0045, 0x100, 0x1f),
+    ("atmega48a", "ATmega48A", 0x920a, 0x1000, 0x40, None, 0x37, None, 0.0045, 0.0045, 0x100, 0x1f),
+    ("atmega48p", "ATmega48P", 0x920a, 0x1000, 0x40, None, 0x37, None, 0.0045, 0.0045, 0x100, 0x1f),
+    ("atmega48pa", "ATmega48PA", 0x920a, 0x1000, 0x40, None, 0x37, None, 0.0045, 0.0045, 0x100, 0x1f),
+    ("atmega48pb", "ATmega48PB", 0x9210, 0x1000, 0x40, None, 0x37, None, 0.0045, 0.0045, 0x100, 0x1f),
+    ("atmega64", "ATmega64", 0x960203f, 0x10000, 0x100, None, 0x48, None, 0.0045, 0.0045, 0x800, 0x1c),
+    ("atmega640", "ATmega640", 0x960803f, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x1000, 0x1f),
+    ("atmega644", "ATmega644", 0x960903f, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x800, 0x1f),
+    ("atmega644a", "ATmega644A", 0x960a03f, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x800, 0x1f),
+    ("atmega644p", "ATmega644P", 0x960a03f, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x800, 0x1f),
+    ("atmega644pa", "ATmega644PA", 0x960a03f, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x800, 0x1f),
+    ("atmega644rfr2", "ATmega644RFR2", 0xa60303f, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x800, 0x1f),
+    ("atmega645", "ATmega645", 0x960503f, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x800, 0x1f),
+    ("atmega6450", "ATmega6450", 0x960603f, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x800, 0x1f),
+    ("atmega6450a", "ATmega6450A", 0x960e03f, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x800, 0x1f),
+    ("atmega6450p", "ATmega6450P", 0x960e03f, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x800, 0x1f),
+    ("atmega645a", "ATmega645A", 0x960d03f, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x800, 0x1f),
+    ("atmega645p", "ATmega645P", 0x960d03f, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x800, 0x1f),
+    ("atmega649", "ATmega649", 0x960303f, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x800, 0x1f),
+    ("atmega6490", "ATmega6490", 0x960403f, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x800, 0x1f),
+    ("atmega6490a", "ATmega6490A", 0x960c03f, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x800, 0x1f),
+    ("atmega6490p", "ATmega6490P", 0x960c03f, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x800, 0x1f),
+    ("atmega649a", "ATmega649A", 0x960b03f, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x800, 0x1f),
+    ("atmega649p", "ATmega649P", 0x960b03f, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x800, 0x1f),
+    ("atmega64a", "ATmega64A", 0x960203f, 0x10000, 0x100, None, 0x48, None, 0.0045, 0.0045, 0x800, 0x1c),
+    ("atmega64c1", "ATmega64C1", 0x9686, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x800, 0x1f),
+    ("atmega64hve2", "ATmega64HVE2", 0x9610, 0x10000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x400, 0x1f),
+    ("atmega64m1", "ATmega64M1", 0x9684, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x800, 0x1f),
+    ("atmega64rfr2", "ATmega64RFR2", 0xa60203f, 0x10000, 0x100, None, 0x37, None, 0.0045, 0.0045, 0x800, 0x1f),
+    ("atmega88", "ATmega88", 0x930a, 0x2000, 0x40, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega88a", "ATmega88A", 0x930f, 0x2000, 0x40, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega88p", "ATmega88P", 0x930f, 0x2000, 0x40, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega88pa", "ATmega88PA", 0x930f, 0x2000, 0x40, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega88pb", "ATmega88PB", 0x9316, 0x2000, 0x40, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("atmega8hva", "ATmega8HVA", 0x9310, 0x2000, 0x80, None, 0x37, None, 0.0045, 0.0045, 0x100, 0x1f),
+    ("atmega8u2", "ATmega8U2", 0x9389, 0x2000, 0x80, 0x31, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("attiny13", "ATtiny13", 0x9007, 0x400, 0x20, 0x2e, 0x37, None, 0.0045, 0.0045, 0x40, 0x1c),
+    ("attiny13a", "ATtiny13A", 0x9007, 0x400, 0x20, 0x2e, 0x37, None, 0.0045, 0.0045, 0x40, 0x1c),
+    ("attiny1634", "ATtiny1634", 0x9412, 0x4000, 0x20, None, 0x37, None, 0.0045, 0.0045, 0x100, 0x1c),
+    ("attiny167", "ATtiny167", 0x9487, 0x4000, 0x80, 0x31, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("attiny2313", "ATtiny2313", 0x910a, 0x800, 0x20, None, 0x37, None, 0.0045, 0.0045, 0x80, 0x1c),
+    ("attiny2313a", "ATtiny2313A", 0x910a, 0x800, 0x20, None, 0x37, None, 0.0045, 0.0045, 0x80, 0x1c),
+    ("attiny24", "ATtiny24", 0x910b, 0x800, 0x20, None, 0x37, None, 0.0045, 0.0045, 0x80, 0x1c),
+    ("attiny24a", "ATtiny24A", 0x910b, 0x800, 0x20, None, 0x37, None, 0.0045, 0.0045, 0x80, 0x1c),
+    ("attiny25", "ATtiny25", 0x9108, 0x800, 0x20, 0x22, 0x37, None, 0.0045, 0.0045, 0x80, 0x1c),
+    ("attiny261", "ATtiny261", 0x910c, 0x800, 0x20, 0x20, 0x37, None, 0.0045, 0.0045, 0x80, 0x1c),
+    ("attiny261a", "ATtiny261A", 0x910c, 0x800, 0x20, 0x20, 0x37, None, 0.0045, 0.0045, 0x80, 0x1c),
+    ("attiny4313", "ATtiny4313", 0x920d, 0x1000, 0x40, None, 0x37, None, 0.0045, 0.0045, 0x100, 0x1c),
+    ("attiny43u", "ATtiny43U", 0x920c, 0x1000, 0x40, None, 0x37, None, 0.0045, 0.0045, 0x40, 0x1c),
+    ("attiny44", "ATtiny44", 0x9207, 0x1000, 0x40, None, 0x37, None, 0.0045, 0.0045, 0x100, 0x1c),
+    ("attiny441", "ATtiny441", 0x9215, 0x1000, 0x10, None, 0x37, None, 0.0045, 0.0045, 0x100, 0x1c),
+    ("attiny44a", "ATtiny44A", 0x9207, 0x1000, 0x40, None, 0x37, None, 0.0045, 0.0045, 0x100, 0x1c),
+    ("attiny45", "ATtiny45", 0x9206, 0x1000, 0x40, 0x22, 0x37, None, 0.0045, 0.0045, 0x100, 0x1c),
+    ("attiny461", "ATtiny461", 0x9208, 0x1000, 0x40, 0x20, 0x37, None, 0.0045, 0.0045, 0x100, 0x1c),
+    ("attiny461a", "ATtiny461A", 0x9208, 0x1000, 0x40, 0x20, 0x37, None, 0.0045, 0.0045, 0x100, 0x1c),
+    ("attiny48", "ATtiny48", 0x9209, 0x1000, 0x40, None, 0x37, None, 0.0045, 0.0045, 0x40, 0x1f),
+    ("attiny828", "ATtiny828", 0x9314, 0x2000, 0x40, None, 0x37, None, 0.0045, 0.0045, 0x100, 0x1f),
+    ("attiny84", "ATtiny84", 0x930c, 0x2000, 0x40, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1c),
+    ("attiny841", "ATtiny841", 0x9315, 0x2000, 0x10, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1c),
+    ("attiny84a", "ATtiny84A", 0x930c, 0x2000, 0x40, None, 0x37, None, 0.0045, 0.0045, 0x200, 0x1c),
+    ("attiny85", "ATtiny85", 0x930b, 0x2000, 0x40, 0x22, 0x37, None, 0.0045, 0.0045, 0x200, 0x1c),
+    ("attiny861", "ATtiny861", 0x930d, 0x2000, 0x40, 0x20, 0x37, None, 0.0045, 0.0045, 0x200, 0x1c),
+    ("attiny861a", "ATtiny861A", 0x930d, 0x2000, 0x40, 0x20, 0x37, None, 0.0045, 0.0045, 0x200, 0x1c),
+    ("attiny87", "ATtiny87", 0x9387, 0x2000, 0x80, 0x31, 0x37, None, 0.0045, 0.0045, 0x200, 0x1f),
+    ("attiny88", "ATtiny88", 0x9311, 0x2000, 0x40, None, 0x37, None, 0.0045, 0.0045, 0x40, 0x1f),
+)
+
+_by_devid = None
+_by_signature = None
+
+def _index():
+    global _by_devid, _by_signature
+
+    if _by_devid is None:
+        _by_devid = {}
+        _by_signature = {}
+
+        for row in _rows:
+            _by_devid[row[0]] = row
+            _by_signature.setdefault(row[2], []).append(row)
+
+def find_device(devid):
+    """Returns the device with the given ID, or None if it's not supported."""
+
+    _index()
+
+    row = _by_devid.get(devid)
+
+    return Device(*row) if row else None
+
+def find_devices_by_signature(signature):
+    """Returns a list of all devices with the given signature. Many signatures are shared by
+    variants of the same part."""
+
+    _index()
+
+    return [Device(*row) for row in _by_signature.get(signature, [])]
+
+def all_devices():
+    return [Device(*row) for row in _rows]
@@ -1,12 +1,43 @@
 #!/usr/bin/env python3
 
 import argparse
+import json
+import os
+import socket
 import sys
 import time
-from debugwire import DebugWire, DWException
-from interfaces import FTDIInterface, SerialInterface
-from devices import devices
-from binparser import parse_binary
+import bench
+import threading
+from debugwire import DebugWire, DWException, needs_erase
+from interfaces import interfaces, usb_serial_ports
+from gang import GangProgrammer
+from devices import find_device, find_devices_by_signature
+from binparser import binary_format, parse_binary, split_into_pages, write_hex
+from hoststate import FlashCache, ImageCache, LinkCache, load_state, save_state, state_path
+from wiretrace import TraceRecorder, TracingInterface
+from metrics import Metrics, MeteredInterface
+
+# Commands that can be sent to dwprog serve
+SERVE_COMMANDS = ["reset", "identify", "flash", "verify", "readfuses", "read", "eeprom"]
+
+# Global options that are set per job instead of by the server
+JOB_OPTIONS = ["stop"]
+
+def default_socket_path():
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+
+    return os.path.join(runtime_dir, "dwprog.sock") if runtime_dir else state_path("dwprog.sock")
+
+def parse_int(value):
+    return int(value, 0)
+
+def parse_chunk_len(value):
+    chunk_len = int(value)
+
+    if chunk_len < 2 or chunk_len % 2:
+        raise argparse.ArgumentTypeError("chunk length must be a positive even number")
+
+    return chunk_len
 
 class DWProg:
     BAR_LEN = 50
@@ -14,6 +45,9 @@ class DWProg:
     def main(self):
         parser = argparse.ArgumentParser()
 
+        parser.add_argument("-i", "--interface", choices=sorted(interfaces), default="auto",
+            help="interface type to use, \"auto\" picks the fastest one for the adapter, \"sim\" "
+                "simulates the device given with --port (default=auto)")
         parser.add_argument("-p", "--port",
             help="port for interface to use (default=first USB serial adapter found)")
         parser.add_argument("-b", "--baudrate", type=int, default=None,
@@ -24,11 +58,32 @@ class DWProg:
             help="leave target stopped (default=false)")
         parser.add_argument("-q", "--quiet", action="count",
             help="specify once to hide progress bars, twice to hide everything except errors")
+        parser.add_argument("-c", "--chunk-len", type=parse_chunk_len, default=None,
+            help="bytes of page data to send per serial write (default=calibrate once per adapter)")
+        parser.add_argument("--calibrate", action="store_true",
+            help="measure the best chunk length for the adapter again")
+        parser.add_argument("-a", "--async-echo", action="store_true",
+            help="check echoes in the background instead of waiting for them after every write")
+        parser.add_argument("-F", "--fast-link", action="store_true",
+            help="switch the target to a faster link speed after connecting if the adapter keeps up")
+        parser.add_argument("--trace", metavar="FILE",
+            help="record everything sent to and received from the target to FILE, play it back "
+                "with -i replay -p FILE")
+        parser.add_argument("--metrics", metavar="FILE",
+            help="save counters and latencies of operations to FILE at exit, in the Prometheus "
+                "text format if it ends with .prom and as JSON otherwise")
+        parser.add_argument("-S", "--socket", metavar="PATH",
+            help="send the command to a dwprog serve process listening on PATH instead of opening "
+                "the interface, or the path to listen on with serve (default={})".format(
+                    default_socket_path()))
         parser.add_argument("-v", "--verbose", action="store_true",
             help="enable debug logging (default=false)")
 
         subp = parser.add_subparsers()
 
+        # jobs sent to serve are completed with the defaults of their subcommand
+        self.subparsers = subp
+
         pdisable = subp.add_parser("reset", help="reset the target")
         pdisable.set_defaults(func=self.cmd_reset)
 
@@ -42,15 +97,63 @@ class DWProg:
         pflash.add_argument("file", help="file (.hex or .elf) to flash")
         pflash.add_argument("-V", "--no-verify", action="store_true",
             help="skip verification")
+        pflash.add_argument("-D", "--diff", action="store_true",
+            help="read back each page first and only write pages that differ")
+        pflash.add_argument("-t", "--target-id",
+            help="remember what was flashed to this target and only write pages that changed")
+        pflash.add_argument("-T", "--timed-sync", action="store_true",
+            help="wait for datasheet page erase/write times instead of synchronizing with a break")
         pflash.set_defaults(func=self.cmd_flash)
 
         pverify = subp.add_parser("verify", help="verify previously flashed program")
         pverify.add_argument("file", help="file (.hex or .elf) to verify")
         pverify.set_defaults(func=self.cmd_verify)
 
+        peeprom = subp.add_parser("eeprom", help="read, write or verify EEPROM")
+        peeprom.add_argument("action", choices=["read", "write", "verify"],
+            help="read EEPROM into file, write file to EEPROM or compare EEPROM against file")
+        peeprom.add_argument("file",
+            help="file (.hex or .elf with an .eeprom section) to write or verify, or .hex to read to")
+        peeprom.set_defaults(func=self.cmd_eeprom)
+
+        pread = subp.add_parser("read", help="read flash or SRAM into a .hex file")
+        pread.add_argument("memory", choices=["flash", "sram"], help="memory to read")
+        pread.add_argument("file", help=".hex file to write")
+        pread.add_argument("--start", type=parse_int, default=0,
+            help="address to start reading from (default=0)")
+        pread.add_argument("--count", type=parse_int, default=None,
+            help="number of bytes to read (default=all of flash)")
+        pread.set_defaults(func=self.cmd_read)
+
         preadfuses = subp.add_parser("readfuses", help="read and display fuse and lock bits")
         preadfuses.set_defaults(func=self.cmd_readfuses)
 
+        pgang = subp.add_parser("gang", help="flash program to multiple targets at the same time")
+        pgang.add_argument("file", help="file (.hex or .elf) to flash")
+        pgang.add_argument("ports", nargs="*",
+            help="ports of the targets to flash (default=all USB serial adapters found)")
+        pgang.add_argument("-V", "--no-verify", action="store_true",
+            help="skip verification")
+        pgang.add_argument("-T", "--timed-sync", action="store_true",
+            help="wait for datasheet page erase/write times instead of synchronizing with a break")
+        pgang.set_defaults(func=self.cmd_gang)
+
+        pbench = subp.add_parser("bench",
+            help="measure programming throughput (overwrites the flash memory of the target)")
+        pbench.add_argument("-w", "--workload", action="append", choices=bench.WORKLOADS,
+            help="workload to run, can be specified multiple times (default=all)")
+        pbench.add_argument("-o", "--output",
+            help="file to write JSON results to (default=stdout)")
+        pbench.add_argument("-T", "--timed-sync", action="store_true",
+            help="wait for datasheet page erase/write times instead of synchronizing with a break")
+        pbench.add_argument("--overwrite", action="store_true",
+            help="confirm that the flash memory of a real target may be overwritten")
+        pbench.set_defaults(func=self.cmd_bench)
+
+        pserve = subp.add_parser("serve",
+            help="keep the target connected and run commands sent with --socket")
+        pserve.set_defaults(func=self.cmd_serve)
+
         args = parser.parse_args()
         if not hasattr(args, "func"):
             self.log_error("Specify a subcommand.")
@@ -58,48 +161,111 @@ class DWProg:
             sys.exit(1)
 
         self._dev = None
+        self._dw = None
+        self._chunk_len_ready = False
+        self._job = None
+        self.metrics = Metrics()
         self.verbosity = 2 - (args.quiet or 0)
         self.stop_after_cmd = args.stop
         self.device_id = args.device
 
-        self.log("Starting dwprog.")
+        # a replayed trace uses the host state it was recorded with and leaves this host's alone
+        self.replaying = args.interface == "replay"
 
-        try:
-            interface = SerialInterface(args.port, args.baudrate, timeout=2, enable_log=args.verbose)
+        if args.socket and args.func != self.cmd_serve:
+            return self.run_client(args)
 
-            #with DebugWire(FTDIInterface(args.baudrate)) as dw:
-            with DebugWire(interface, enable_log=args.verbose) as dw:
-                self._dw = dw
-                self._dw_is_open = False
+        self.log("Starting dwprog.")
 
+        try:
+            if args.func == self.cmd_gang:
+                # every target gets an interface of its own
                 args.func(args)
                 self.log("")
-
-                if not self.stop_after_cmd:
-                    self.log("Starting program on target.")
-                    self.dw.run()
-                else:
-                    self.log("Target was left stopped.")
+            else:
+                self.run_with_interface(args)
         except DWException as ex:
+            self.metrics.inc("errors")
             self.log_error("ERROR: {}".format(str(ex)))
             return 1
+        finally:
+            if args.metrics:
+                self.save_metrics(args)
 
         self.log("Existing dwprog successfully.")
         return 0
 
+    def run_with_interface(self, args):
+        """Run the command with the interface given by the global options."""
+
+        interface = interfaces[args.interface](
+            args.port, args.baudrate, timeout=2, enable_log=args.verbose)
+        interface.async_echo = args.async_echo
+
+        self.link_cache = LinkCache(read_only=self.replaying)
+        interface.link_cache = self.link_cache
+
+        if args.metrics:
+            interface = MeteredInterface(interface, self.metrics)
+
+        if args.trace:
+            interface = TracingInterface(interface, TraceRecorder(args.trace))
+
+        with DebugWire(interface, enable_log=args.verbose, fast_link=args.fast_link,
+                metrics=self.metrics if args.metrics else None) as dw:
+            self._dw = dw
+            self._dw_is_open = False
+
+            args.func(args)
+            self.log("")
+
+            if not self._dw_is_open:
+                # command didn't use the interface
+                pass
+            elif not self.stop_after_cmd:
+                self.log("Starting program on target.")
+                self.dw.run()
+            else:
+                self.log("Target was left stopped.")
+
+    def save_metrics(self, args):
+        labels = self.metrics.labels
+        labels["command"] = args.func.__name__[len("cmd_"):]
+
+        if self._dw:
+            labels["port"] = self._dw.iface.port
+            labels["adapter"] = self._dw.iface.adapter_id or ""
+
+        if self._dev:
+            labels["device"] = self._dev.devid
+
+        try:
+            self.metrics.save(args.metrics)
+        except OSError as ex:
+            self.log_error("Failed to save metrics: {}".format(ex))
+
     def log(self, msg):
-        if self.verbosity >= 1:
+        if self._job:
+            self._job.send({"type": "log", "message": msg})
+        elif self.verbosity >= 1:
             print(msg)
 
     def log_error(self, msg):
-        print(msg, file=sys.stderr)
-
-    def progress_bar(self, current, count):
-        if self.verbosity >= 2:
+        if self._job:
+            self._job.errors.append(msg.strip())
+            self._job.send({"type": "log", "level": "error", "message": msg})
+        else:
+            print(msg, file=sys.stderr)
+
+    def progress_bar(self, current, count, unit="page"):
+        if self._job:
+            self._job.send({"type": "progress", "unit": unit, "current": current, "count": count})
+        elif self.verbosity >= 2:
             progress = DWProg.BAR_LEN * (current + 1) // count
 
-            print("\r[{0}] page {1}/{2}...".format(
+            print("\r[{0}] {1} {2}/{3}...".format(
                 ("#" * progress) + " " * (DWProg.BAR_LEN - progress),
+                unit,
                 current + 1,
                 count), end="")
             sys.stdout.flush()
@@ -126,7 +292,7 @@ class DWProg:
             self.log("Getting target device properties.")
 
             if self.device_id:
-                self._dev = next((d for d in devices if d.devid == self.device_id), None)
+                self._dev = find_device(self.device_id)
 
                 if not self._dev:
                     raise DWException("Device '{0}' is not supported.".format(self.device_id))
@@ -140,12 +306,25 @@ class DWProg:
 
                 sig = self.dw.read_signature()
 
-                self._dev = next((d for d in devices if d.signature == sig), None)
+                # the device from the previous run is still right if the signature matches
+                cached = find_device(self.dw.iface.host_state("device",
+                    lambda: self.link_cache.get(self.dw.iface.link_key).get("device", "")))
 
-                if not self._dev:
+                matches = [cached] if cached and cached.signature == sig \
+                    else find_devices_by_signature(sig)
+
+                if not matches:
                     raise DWException("Device with signature {0:04x} is not supported."
                         .format(sig))
 
+                self._dev = matches[0]
+
+                if len(matches) > 1:
+                    self.log("Signature is shared by {0}, assuming {1}. Use --device to choose."
+                        .format(", ".join(d.name for d in matches), self._dev.name))
+
+            self.link_cache.update(self.dw.iface.link_key, device=self._dev.devid)
+
             self.log("Target is: {0} (signature 0x{1:04x})"
                 .format(self._dev.name, self._dev.signature))
 
@@ -167,10 +346,38 @@ class DWProg:
 
         sig = self.dw.read_signature()
 
-        dev = next((d for d in devices if d.signature == sig), None)
+        matches = find_devices_by_signature(sig)
 
         self.log("Target is: {0} (signature 0x{1:04x})"
-            .format(dev.name if dev else "Unknown device", sig))
+            .format(" / ".join(d.name for d in matches) or "Unknown device", sig))
+
+    def cmd_read(self, args):
+        count = args.count
+
+        if args.memory == "flash":
+            if count is None:
+                count = self.dev.flash_size - args.start
+
+            if args.start < 0 or args.start + count > self.dev.flash_size:
+                raise DWException("Read is outside of the flash memory.")
+
+            self.log("Reading {} bytes of flash from 0x{:04x}...".format(count, args.start))
+
+            data = self.dw.read_flash(args.start, count, dev=self.dev)
+        else:
+            if count is None:
+                raise DWException("Specify the number of bytes to read with --count.")
+
+            self.log("Reading {} bytes of SRAM from 0x{:04x}...".format(count, args.start))
+
+            data = self.dw.read_sram(args.start, count)
+
+        with open(args.file, "wb") as f:
+            write_hex(f, data, args.start)
+
+        self.log("Saved to {}.".format(args.file))
+
+        return {"file": args.file, "start": args.start, "count": count}
 
     def cmd_readfuses(self, args):
         self.log("Reading fuse and lock bits...")
@@ -182,38 +389,130 @@ class DWProg:
 
         self.log("Lock bits: 0x{0:02X}".format(fuses.lock_bits))
 
-    def split_into_pages(self, mem):
-        if len(mem) > self.dev.flash_size:
-            raise DWException("Binary too large for target.")
+    def cmd_eeprom(self, args):
+        if not self.dev.eeprom_size:
+            raise DWException("{} has no EEPROM.".format(self.dev.name))
+
+        if args.action == "read":
+            self.log("Reading {} bytes of EEPROM...".format(self.dev.eeprom_size))
+
+            data = self.dw.read_eeprom(self.dev, 0, self.dev.eeprom_size)
+
+            with open(args.file, "wb") as f:
+                write_hex(f, data)
+
+            self.log("EEPROM saved to {}.".format(args.file))
+            return
+
+        segments = parse_binary(args.file, eeprom=True).segments()
+
+        if not segments:
+            raise DWException("No EEPROM data in {}.".format(args.file))
+
+        if segments[-1][0] + len(segments[-1][1]) > self.dev.eeprom_size:
+            raise DWException("EEPROM data too large for target.")
+
+        total = sum(len(data) for start, data in segments)
+
+        if args.action == "write":
+            self.log("Writing {} bytes of EEPROM, skipping bytes that are already correct."
+                .format(total))
+
+            start_time = time.time()
+            written = 0
+
+            for start, data in segments:
+                written += self.dw.write_eeprom(self.dev, start, data,
+                    lambda current, count: self.progress_bar(current, count, "byte"))
+
+            self.log("\nWrote {} changed bytes in {}ms.".format(
+                written, round((time.time() - start_time) * 1000)))
+        else:
+            self.log("Verifying {} bytes of EEPROM against target.".format(total))
+
+            for start, data in segments:
+                current = self.dw.read_eeprom(self.dev, start, len(data))
+
+                if current != data:
+                    offset = next(i for i, (a, b) in enumerate(zip(current, data)) if a != b)
+
+                    self.log_error("ERROR! EEPROM mismatch at 0x{:04x}.".format(start + offset))
+                    return
+
+            self.log("No errors detected!")
+
+    def setup_chunk_len(self, args):
+        """Pick the chunk length for page writes. Only done once, right before the first write,
+        so that nothing is calibrated when every page is already up to date."""
+
+        if self._chunk_len_ready:
+            return
+
+        if args.chunk_len:
+            self.dw.chunk_len = args.chunk_len
+            self._chunk_len_ready = True
+            return
+
+        key = "{}/{}".format(self.dw.iface.port, self.dw.iface.adapter_id)
+
+        # looked up first so that its host state isn't recorded in the middle of a calibration
+        dev = self.dev
 
-        pages = []
+        def choose():
+            saved = load_state("chunklen.json", {})
+            chunk_len = saved.get(key)
 
-        for start in range(0, self.dev.flash_size, self.dev.flash_pagesize):
-            page = mem[start:start+self.dev.flash_pagesize]
+            if chunk_len is None or args.calibrate:
+                self.log("Calibrating chunk length for {}...".format(self.dw.iface.port))
 
-            if any(b is not None for b in page):
-                pagebytes = bytes(0 if b is None else b for b in page)
-                pagebytes += b"\00" * max(0, self.dev.flash_pagesize - len(pagebytes))
+                chunk_len = self.dw.calibrate_chunk_len(dev)
 
-                pages.append((start, pagebytes))
+                saved[key] = chunk_len
+                save_state("chunklen.json", saved)
+
+            return chunk_len
+
+        # a replay uses the chunk length that was chosen when it was recorded without calibrating
+        self.dw.chunk_len = self.dw.iface.host_state("chunk_len", choose)
+        self._chunk_len_ready = True
+
+        self.log("Using chunk length {}.".format(self.dw.chunk_len))
+
+    def load_pages(self, filename):
+        """Parse a binary file into pages for the target, or load them from the image cache."""
+
+        with open(filename, "rb") as f:
+            data = f.read()
+
+        cache = ImageCache(data, binary_format(data), self.dev)
+        pages = cache.load()
+
+        if pages is None:
+            pages = split_into_pages(parse_binary(filename), self.dev)
+
+            try:
+                if not self.replaying:
+                    cache.save(pages)
+            except OSError as ex:
+                self.log("Failed to cache parsed binary: {}".format(ex))
 
         return pages
 
-    def do_verify(self, pages):
+    def do_verify(self, pages, log_mismatch=None):
+        """Verify pages against the target. A mismatch is logged with log_mismatch, which defaults
+        to logging it as an error."""
+
         self.log("\nVerifying {0} pages ({1} bytes) against target.".format(
             len(pages), len(pages) * self.dev.flash_pagesize))
 
         start_time = time.time()
 
-        for i, (start, pagebytes) in enumerate(pages):
-            self.progress_bar(i, len(pages))
+        mismatch = self.dw.verify_pages(pages, self.progress_bar, dev=self.dev)
 
-            devbytes = self.dw.read_flash(start, self.dev.flash_pagesize)
-
-            if devbytes != pagebytes:
-                self.log_error("\nERROR! Mismatch at 0x{:04x}-0x{:04x}."
-                    .format(start, start + self.dev.flash_pagesize))
-                return False
+        if mismatch is not None:
+            (log_mismatch or self.log_error)("\nERROR! Mismatch at 0x{:04x}-0x{:04x}."
+                .format(mismatch, mismatch + self.dev.flash_pagesize))
+            return False
 
         self.log("\nNo errors detected! Verifying took {0}ms."
             .format(round((time.time() - start_time) * 1000)))
@@ -221,47 +520,441 @@ class DWProg:
         return True
 
     def cmd_flash(self, args):
-        # parse input binary file
+        self._dw.timed_sync = args.timed_sync
 
-        mem = parse_binary(args.file)
+        # open and check target device and parse input binary file
 
-        # open and check target device
+        pages = self.load_pages(args.file)
 
-        pages = self.split_into_pages(mem)
+        # check what is already on the target
 
-        self.log("\nWriting {0} pages ({1} bytes) to target.".format(
-            len(pages), len(pages) * self.dev.flash_pagesize))
+        diff = args.diff
+        cache = None
+
+        if args.target_id:
+            cache = FlashCache(self.dw.iface.port, self.dev.signature, args.target_id,
+                read_only=self.replaying)
+            cache.load()
+
+            cache.pages = dict(self.dw.iface.host_state("flash_cache",
+                lambda: sorted(cache.pages.items())))
+
+            if cache.pages:
+                self.log("Checking cached state of target '{0}'...".format(args.target_id))
+
+                read_page = lambda start: self.dw.read_flash(
+                    start, self.dev.flash_pagesize, dev=self.dev)
+
+                if not cache.spot_check(read_page, [start for start, pagebytes in pages]):
+                    self.log("Target contents do not match the cache, reading back every page.")
+
+                    cache.clear()
+                    diff = True
+
+        try:
+            skipped_by_cache = self.write_changed_pages(args, pages, diff, cache)
+
+            ok = args.no_verify or self.do_verify(pages,
+                log_mismatch=self.log if skipped_by_cache else None)
+
+            if not ok and skipped_by_cache:
+                # the spot check can miss pages that changed behind the cache's back, so don't
+                # trust it for anything and compare every page instead
+                self.log("Pages skipped because of the cache of target '{0}' do not match, "
+                    "reading back every page.".format(args.target_id))
+
+                cache.clear()
+                cache.save()
+
+                self.write_changed_pages(args, pages, True, cache)
+
+                ok = self.do_verify(pages)
+        except Exception:
+            # the target is in an unknown state
+            if cache:
+                cache.clear()
+                cache.save()
+
+            raise
+
+        if not ok:
+            if cache:
+                cache.clear()
+                cache.save()
+
+            self.log("Target will be left stopped due to a verification error.")
+            self.stop_after_cmd = True
+            return
+
+        if cache and not args.no_verify:
+            cache.update(pages)
+            cache.save()
+
+        self.dw.reset()
+
+    def write_changed_pages(self, args, pages, diff, cache):
+        """Write the pages that are not known to be up to date on the target. With diff every page
+        that isn't skipped because of the cache is read back first. Returns the number of pages
+        skipped because of the cache."""
+
+        # forget pages that are about to change so an interrupted write can't leave the cache stale
+
+        if cache:
+            cache.forget(start for start, pagebytes in pages if not cache.is_current(start, pagebytes))
+            cache.save()
+
+        # pick the pages that need to be written
 
         start_time = time.time()
 
-        # write page by page
+        to_write = [(start, pagebytes) for start, pagebytes in pages
+            if not (cache and cache.is_current(start, pagebytes))]
+
+        skipped_by_cache = len(pages) - len(to_write)
+
+        no_erase = set()
+
+        if diff:
+            self.log("\nComparing {0} pages against target.".format(len(to_write)))
+
+            changed = []
+
+            for i, (start, pagebytes) in enumerate(to_write):
+                self.progress_bar(i, len(to_write))
+
+                devbytes = self.dw.read_flash(start, self.dev.flash_pagesize, dev=self.dev)
+
+                if devbytes == pagebytes:
+                    continue
+
+                if not needs_erase(devbytes, pagebytes):
+                    no_erase.add(start)
+
+                changed.append((start, pagebytes))
 
-        for i, (start, pagebytes) in enumerate(pages):
-            self.progress_bar(i, len(pages))
+            to_write = changed
 
-            self.dw.write_flash_page(self.dev, start, pagebytes)
+        # write all pages as one stream
+
+        if to_write:
+            self.setup_chunk_len(args)
+
+        self.log("\nWriting {0} pages ({1} bytes) to target.".format(
+            len(to_write), len(to_write) * self.dev.flash_pagesize))
+
+        write_start_time = time.time()
+
+        if to_write:
+            self.dw.write_flash_pages(self.dev, to_write, no_erase, self.progress_bar)
+
+        self.dw.wait_ready()
+
+        write_time = time.time() - write_start_time
+        written = len(to_write)
+        erases_skipped = len(no_erase)
 
         self.log("\nDone! Programming took {0}ms."
             .format(round((time.time() - start_time) * 1000)))
 
-        # verify
+        if diff or cache:
+            self.log("Skipped {0} of {1} pages that were already up to date.".format(
+                len(pages) - written, len(pages)))
 
-        if not args.no_verify:
-            if not self.do_verify(pages):
-                self.log("Target will be left stopped due to a verification error.")
-                self.stop_after_cmd = True
-                return
+            if written:
+                self.log("Writing all pages would have taken about {0}ms.".format(
+                    round(write_time / written * len(pages) * 1000)))
 
-        self.dw.reset()
+        if erases_skipped:
+            self.log("Avoided {0} page erase cycles by only clearing bits.".format(erases_skipped))
 
-    def cmd_verify(self, args):
-        # parse input binary file
+        return skipped_by_cache
+
+    def cmd_gang(self, args):
+        ports = args.ports
+
+        if not ports:
+            if args.interface == "sim":
+                raise DWException("Specify the devices to simulate as ports.")
+
+            ports = usb_serial_ports()
+
+            if not ports:
+                raise DWException("Failed to find any USB serial adapters.")
 
         mem = parse_binary(args.file)
 
-        # open and check target device
+        self.log("Flashing {} targets: {}\n".format(len(ports), ", ".join(ports)))
+
+        lines = {port: i for i, port in enumerate(ports)}
+        lock = threading.Lock()
+        redraw = self.verbosity >= 2 and sys.stdout.isatty()
+
+        def describe(target):
+            desc = "{:20} {:10}".format(target.port, target.status)
+
+            if target.status in ("writing", "verifying") and target.count:
+                desc += " page {}/{}".format(target.current, target.count)
+            elif target.status == "done":
+                desc += " {} in {}ms".format(target.device, round(target.elapsed * 1000))
+            elif target.status == "failed":
+                desc += " " + target.error
+
+            return desc
+
+        if redraw:
+            for port in ports:
+                print("{:20} waiting".format(port))
+
+        def on_update(target, status_changed):
+            with lock:
+                if redraw:
+                    # move up to the line of the target and rewrite it
+                    up = len(ports) - lines[target.port]
+                    print("\x1b[{}A\r\x1b[K{}\x1b[{}B\r".format(up, describe(target), up), end="")
+                    sys.stdout.flush()
+                elif status_changed:
+                    self.log(describe(target))
+
+        programmer = GangProgrammer(
+            mem,
+            lambda port: interfaces[args.interface](port, args.baudrate, timeout=2),
+            device_id=self.device_id,
+            verify=not args.no_verify,
+            timed_sync=args.timed_sync,
+            fast_link=args.fast_link,
+            run_after=not self.stop_after_cmd,
+            on_update=on_update)
+
+        targets = programmer.run(ports)
+
+        failed = [t for t in targets if not t.ok]
+
+        self.log("\n{} of {} targets flashed successfully.".format(
+            len(targets) - len(failed), len(targets)))
 
-        pages = self.split_into_pages(mem)
+        if failed:
+            raise DWException("Failed targets: {}".format(", ".join(t.port for t in failed)))
+
+    def cmd_bench(self, args):
+        if args.interface != "sim" and not args.overwrite:
+            raise DWException("Benchmarking overwrites the flash memory of the target, "
+                "specify --overwrite to confirm.")
+
+        self._dw.timed_sync = args.timed_sync
+
+        dev = self.dev
+        self.setup_chunk_len(args)
+
+        self.log("Running benchmarks...")
+
+        def progress(workload, current, count):
+            if self.verbosity >= 2:
+                print("\r{:10} {}/{}".format(workload, current + 1, count), end="")
+                sys.stdout.flush()
+
+        results = bench.run_benchmarks(self.dw, dev, args.workload or bench.WORKLOADS,
+            progress=progress)
+
+        self.log("")
+
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+        else:
+            print(json.dumps(results, indent=2))
+
+        self.dw.reset()
+
+    def cmd_serve(self, args):
+        path = os.path.abspath(args.socket or default_socket_path())
+
+        # connect and identify the target once for all jobs
+        self.dev
+
+        if os.path.exists(path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+            try:
+                probe.connect(path)
+                raise DWException("Another dwprog is already serving on {}.".format(path))
+            except OSError:
+                # left over from a server that didn't exit cleanly
+                os.unlink(path)
+            finally:
+                probe.close()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        os.chmod(path, 0o600)
+        server.listen(1)
+
+        self.serve_args = args
+        self.target_running = False
+
+        self.log("\nServing jobs on {}. Press Ctrl-C to stop.".format(path))
+
+        try:
+            while True:
+                conn, _ = server.accept()
+
+                with conn:
+                    for line in conn.makefile("r", encoding="utf-8"):
+                        self.run_job(conn, line)
+        except KeyboardInterrupt:
+            self.log("\nStopping server.")
+        finally:
+            server.close()
+            os.unlink(path)
+
+        # the usual end of command handling applies to a stopped target
+        if self.target_running:
+            self.dw.reset()
+
+    def run_job(self, conn, line):
+        """Run a job sent by run_client and send back log messages, progress and the result."""
+
+        job = Job(conn)
+
+        try:
+            request = json.loads(line)
+            command = request["command"]
+            job_args = request["args"]
+
+            if not isinstance(command, str) or not isinstance(job_args, dict):
+                raise TypeError()
+        except (ValueError, KeyError, TypeError):
+            job.send({"type": "result", "ok": False, "errors": [], "exception": "Invalid job."})
+            return
+
+        if command not in SERVE_COMMANDS:
+            job.send({"type": "result", "ok": False, "errors": [],
+                "exception": "Command '{}' can't be run by the server.".format(command)})
+            return
+
+        # connection options are the server's own, the rest come from the job or the defaults of
+        # the subcommand
+        server_options = vars(self.serve_args)
+        actions = [a for a in self.subparsers.choices[command]._actions if a.dest != "help"]
+
+        unknown = [k for k in job_args
+            if k not in server_options and k not in (a.dest for a in actions)]
+        missing = [a.dest for a in actions if a.required and a.dest not in job_args]
+
+        if unknown or missing:
+            job.send({"type": "result", "ok": False, "errors": [],
+                "exception": "Unknown option '{}' for {}.".format(unknown[0], command) if unknown
+                    else "Missing argument '{}' for {}.".format(missing[0], command)})
+            return
+
+        options = dict(server_options)
+        options.update((a.dest, a.default) for a in actions)
+        options.update((k, v) for k, v in job_args.items()
+            if k not in server_options or k in JOB_OPTIONS)
+
+        args = argparse.Namespace(**options)
+        args.func = getattr(self, "cmd_" + command)
+
+        self.log("Running job: {}".format(command))
+
+        self._job = job
+        self.stop_after_cmd = args.stop
+        start_time = time.monotonic()
+        result = None
+        exception = None
+
+        try:
+            if self.target_running:
+                self.dw.reset()
+                self.target_running = False
+
+            result = args.func(args)
+
+            if not self.stop_after_cmd:
+                self.log("Starting program on target.")
+                self.dw.run()
+                self.target_running = True
+        except Exception as ex:
+            # a bad request, e.g. a missing or malformed file, only fails the job
+            exception = str(ex) if isinstance(ex, DWException) else "{}: {}".format(
+                type(ex).__name__, ex)
+            job.errors.append(exception)
+        finally:
+            self._job = None
+
+        if exception:
+            self.log_error("Job failed: {}".format(exception))
+
+            # get the link into a known state for the next job
+            try:
+                self.dw.reset()
+                self.target_running = False
+            except DWException as ex:
+                self.log_error("Failed to reset target: {}".format(ex))
+
+        job.send({
+            "type": "result",
+            "ok": not job.errors,
+            "errors": job.errors,
+            "exception": exception,
+            "device": self._dev.devid if self._dev else None,
+            "seconds": time.monotonic() - start_time,
+            "value": result,
+        })
+
+    def run_client(self, args):
+        """Send the command to a server started with serve and show what it sends back."""
+
+        command = args.func.__name__[len("cmd_"):]
+
+        if command not in SERVE_COMMANDS:
+            self.log_error("ERROR: Command '{}' can't be run by the server.".format(command))
+            return 1
+
+        job_args = {k: v for k, v in vars(args).items() if k != "func"}
+
+        # the server may have a different working directory
+        if job_args.get("file"):
+            job_args["file"] = os.path.abspath(job_args["file"])
+
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        try:
+            client.connect(args.socket)
+            client.sendall((json.dumps({"command": command, "args": job_args}) + "\n")
+                .encode("utf-8"))
+            client.shutdown(socket.SHUT_WR)
+
+            for line in client.makefile("r", encoding="utf-8"):
+                msg = json.loads(line)
+
+                if msg["type"] == "log":
+                    if msg.get("level") == "error":
+                        self.log_error(msg["message"])
+                    else:
+                        self.log(msg["message"])
+                elif msg["type"] == "progress":
+                    self.progress_bar(msg["current"], msg["count"], msg["unit"])
+                elif msg["type"] == "result":
+                    # other errors have already been shown as log messages
+                    if msg["exception"]:
+                        self.log_error("ERROR: {}".format(msg["exception"]))
+
+                    return 0 if msg["ok"] else 1
+        except OSError as ex:
+            self.log_error("ERROR: Failed to talk to server at {}: {}".format(args.socket, ex))
+            return 1
+        finally:
+            client.close()
+
+        self.log_error("ERROR: Server closed the connection before the job finished.")
+        return 1
+
+    def cmd_verify(self, args):
+        # open and check target device and parse input binary file
+
+        pages = self.load_pages(args.file)
 
         self.log("Writing {0} pages ({1} bytes) to target.".format(
             len(pages), len(pages) * self.dev.flash_pagesize))
@@ -272,5 +965,22 @@ class DWProg:
 
         self.dw.reset()
 
+class Job:
+    """A job being run by serve, see DWProg.run_job."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.errors = []
+
+    def send(self, msg):
+        if self.conn is None:
+            return
+
+        try:
+            self.conn.sendall((json.dumps(msg) + "\n").encode("utf-8"))
+        except OSError:
+            # the client went away, finish the job anyway
+            self.conn = None
+
 if __name__ == "__main__":
     sys.exit(DWProg().main())
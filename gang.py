@@ -0,0 +1,145 @@
+# Programs the same binary to multiple targets on separate interfaces at the same time. Each target
+# is handled in its own thread so that a slow or failing target doesn't hold up the others.
+
+import threading
+import time
+from binparser import split_into_pages
+from debugwire import DebugWire, DWException
+from devices import find_device, find_devices_by_signature
+
+class GangTarget:
+    """Programming state and result of a single target."""
+
+    def __init__(self, port):
+        self.port = port
+        self.status = "waiting"
+        self.device = None
+        self.current = 0
+        self.count = 0
+        self.ok = None
+        self.error = None
+        self.elapsed = None
+
+class GangProgrammer:
+    def __init__(self, mem, make_interface, device_id=None, verify=True, timed_sync=False,
+            fast_link=False, run_after=True, on_update=None):
+        """mem is a parsed binary, make_interface(port) creates an interface for a port and
+        on_update(target, status_changed) is called whenever the state of a target changes, from
+        the thread handling the target."""
+
+        self.mem = mem
+        self.make_interface = make_interface
+        self.device_id = device_id
+        self.verify = verify
+        self.timed_sync = timed_sync
+        self.fast_link = fast_link
+        self.run_after = run_after
+        self.on_update = on_update or (lambda target, status_changed: None)
+
+        self._pages = {}
+        self._pages_lock = threading.Lock()
+
+    def run(self, ports):
+        """Program all targets and return a list of GangTargets once all of them are done."""
+
+        targets = [GangTarget(port) for port in ports]
+
+        threads = [
+            threading.Thread(target=self._program, args=(target,), daemon=True)
+            for target in targets]
+
+        for t in threads:
+            t.start()
+
+        for t in threads:
+            t.join()
+
+        return targets
+
+    def _pages_for(self, dev):
+        # targets with the same page size share the same page list
+
+        with self._pages_lock:
+            key = (dev.flash_size, dev.flash_pagesize)
+
+            if key not in self._pages:
+                self._pages[key] = split_into_pages(self.mem, dev)
+
+            return self._pages[key]
+
+    def _set_status(self, target, status):
+        target.status = status
+        self.on_update(target, True)
+
+    def _progress(self, target, current, count):
+        target.current = current + 1
+        target.count = count
+        self.on_update(target, False)
+
+    def _identify(self, dw):
+        sig = dw.read_signature()
+
+        if self.device_id:
+            dev = find_device(self.device_id)
+
+            if not dev:
+                raise DWException("Device '{0}' is not supported.".format(self.device_id))
+
+            if sig != dev.signature:
+                raise DWException("Device signature mismatch (expected {0:04x}, got {1:04x})"
+                    .format(dev.signature, sig))
+        else:
+            matches = find_devices_by_signature(sig)
+
+            if not matches:
+                raise DWException("Device with signature {0:04x} is not supported.".format(sig))
+
+            dev = matches[0]
+
+        return dev
+
+    def _program(self, target):
+        start_time = time.monotonic()
+
+        try:
+            self._set_status(target, "connecting")
+
+            iface = self.make_interface(target.port)
+
+            with DebugWire(iface, timed_sync=self.timed_sync, fast_link=self.fast_link) as dw:
+                dw.open()
+
+                dev = self._identify(dw)
+                target.device = dev.name
+
+                pages = self._pages_for(dev)
+
+                self._set_status(target, "writing")
+
+                dw.write_flash_pages(
+                    dev, pages, progress=lambda current, count: self._progress(target, current, count))
+
+                if self.verify:
+                    self._set_status(target, "verifying")
+
+                    mismatch = dw.verify_pages(
+                        pages, lambda current, count: self._progress(target, current, count), dev)
+
+                    if mismatch is not None:
+                        raise DWException("Mismatch at 0x{:04x}-0x{:04x}"
+                            .format(mismatch, mismatch + dev.flash_pagesize))
+
+                dw.reset()
+
+                if self.run_after:
+                    dw.run()
+
+            target.ok = True
+            target.elapsed = time.monotonic() - start_time
+            self._set_status(target, "done")
+        except Exception as ex:
+            # anything that goes wrong only fails this target
+            target.ok = False
+            target.error = str(ex)
+            target.elapsed = time.monotonic() - start_time
+            self._set_status(target, "failed")
@@ -7,6 +7,10 @@ from fnmatch import fnmatch
 from zipfile import ZipFile
 import sys
 
+# tWD_FLASH, the self-programming page erase and write time. The device files don't include it and
+# the datasheets of all supported parts give the same worst case.
+TWD_FLASH = 0.0045
+
 spmcsr_bits = {
     0x01: ["SPMEN", "SELFPRGEN"],
     0x02: ["PGERS"],
@@ -19,8 +23,11 @@ def process_doc(doc):
 
     jtagid = device.find("property-groups/property-group[@name='SIGNATURES']/property[@name='JTAGID']")
     flash = device.find("address-spaces/address-space[@name='prog']/memory-segment[@name='FLASH']")
+    eeprom = device.find("address-spaces/address-space[@name='eeprom']/memory-segment[@name='EEPROM']")
     cpu = doc.find("modules/module[@name='CPU']")
     dwdr = doc.find(".//register[@name='DWDR']")
+    rampz = doc.find(".//register[@name='RAMPZ']")
+    eecr = doc.find(".//register[@name='EECR']")
     spmcsr = doc.find(".//register[@name='SPMCSR']")
     if spmcsr is None:
         spmcsr = doc.find(".//register[@name='SPMCR']")
@@ -33,6 +40,9 @@ def process_doc(doc):
     if flash is None:
         errors.append("no flash segment")
 
+    if eecr is None:
+        errors.append("no EECR register")
+
     if spmcsr is None:
         errors.append("no SPMCSR register")
     else:
@@ -57,15 +67,29 @@ def process_doc(doc):
     reg_dwdr = (int(dwdr.attrib["offset"], 16) - 0x20) if dwdr is not None else None
     reg_spmcsr = int(spmcsr.attrib["offset"], 16) - 0x20
 
-    print("    Device(devid=\"{}\", name=\"{}\", signature=0x{:x}, flash_size=0x{:x}, flash_pagesize=0x{:x}, reg_dwdr={}, reg_spmcsr=0x{:x}),"
-        .format(
-            devid,
-            name,
-            signature,
-            flash_size,
-            flash_pagesize,
-            "0x{:x}".format(reg_dwdr) if reg_dwdr else "None",
-            reg_spmcsr))
+    # RAMPZ only matters for reaching flash above 64 KiB
+    reg_rampz = (int(rampz.attrib["offset"], 16) - 0x20) if rampz is not None and flash_size > 0x10000 else None
+
+    reg_eecr = int(eecr.attrib["offset"], 16) - 0x20
+
+    eeprom_size = int(eeprom.attrib["size"], 16) if eeprom is not None else 0
+
+    def hex_or_none(value):
+        return "0x{:x}".format(value) if value else "None"
+
+    print("    (\"{}\", \"{}\", 0x{:x}, 0x{:x}, 0x{:x}, {}, 0x{:x}, {}, {}, {}, 0x{:x}, 0x{:x}),".format(
+        devid,
+        name,
+        signature,
+        flash_size,
+        flash_pagesize,
+        hex_or_none(reg_dwdr),
+        reg_spmcsr,
+        hex_or_none(reg_rampz),
+        TWD_FLASH,
+        TWD_FLASH,
+        eeprom_size,
+        reg_eecr))
 
 if len(sys.argv) < 2:
     print("USAGE: generatedevices.py *.atpack", file=sys.stderr)
@@ -73,12 +97,14 @@ if len(sys.argv) < 2:
 
 print("""# Generated with generatedevices.py
 
-class Device:
-    def __init__(self, **kwargs):
-        for key in kwargs:
-            setattr(self, key, kwargs[key])
+from collections import namedtuple
+
+Device = namedtuple("Device", [
+    "devid", "name", "signature", "flash_size", "flash_pagesize", "reg_dwdr", "reg_spmcsr",
+    "reg_rampz", "spm_erase_time", "spm_write_time", "eeprom_size", "reg_eecr"])
 
-devices = [""")
+# Rows are only turned into Device objects when they are looked up
+_rows = (""")
 
 for packfile in sys.argv[1:]:
     with ZipFile(packfile) as zfile:
@@ -88,4 +114,38 @@ for packfile in sys.argv[1:]:
 
                 process_doc(doc)
 
-print("]")
\ No newline at end of file
+print(""")
+
+_by_devid = None
+_by_signature = None
+
+def _index():
+    global _by_devid, _by_signature
+
+    if _by_devid is None:
+        _by_devid = {}
+        _by_signature = {}
+
+        for row in _rows:
+            _by_devid[row[0]] = row
+            _by_signature.setdefault(row[2], []).append(row)
+
+def find_device(devid):
+    \"\"\"Returns the device with the given ID, or None if it's not supported.\"\"\"
+
+    _index()
+
+    row = _by_devid.get(devid)
+
+    return Device(*row) if row else None
+
+def find_devices_by_signature(signature):
+    \"\"\"Returns a list of all devices with the given signature. Many signatures are shared by
+    variants of the same part.\"\"\"
+
+    _index()
+
+    return [Device(*row) for row in _by_signature.get(signature, [])]
+
+def all_devices():
+    return [Device(*row) for row in _rows]""")
@@ -0,0 +1,213 @@
+# State that dwprog keeps on the host between runs. Everything here is a cache: deleting the state
+# directory is always safe and only makes the next run slower.
+
+import hashlib
+import json
+import os
+import random
+import struct
+
+def state_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+
+    return os.path.join(base, "dwprog")
+
+def state_path(name):
+    return os.path.join(state_dir(), name)
+
+def load_state(name, default=None):
+    """Load a JSON state file, returning default if it doesn't exist or is unreadable."""
+
+    try:
+        with open(state_path(name), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def save_state(name, data):
+    """Atomically replace a JSON state file."""
+
+    path = state_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path + ".tmp", "w") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+
+    os.replace(path + ".tmp", path)
+
+def page_hash(data):
+    return hashlib.sha1(bytes(data)).hexdigest()
+
+class FlashCache:
+    """Hashes of the pages last written to and verified on a specific target. A read_only cache is
+    never saved, e.g. when replaying a trace."""
+
+    FILENAME = "flashcache.json"
+
+    # How many cached pages to read back before trusting the cache
+    SPOT_CHECK_PAGES = 3
+
+    def __init__(self, port, signature, target_id, read_only=False):
+        self.key = "{}/{:04x}/{}".format(port, signature, target_id)
+        self.pages = {}
+        self.read_only = read_only
+
+    def load(self):
+        entry = load_state(FlashCache.FILENAME, {}).get(self.key, {})
+
+        self.pages = {int(start): h for start, h in entry.items()}
+
+    def save(self):
+        if self.read_only:
+            return
+
+        data = load_state(FlashCache.FILENAME, {})
+        data[self.key] = {str(start): h for start, h in self.pages.items()}
+
+        save_state(FlashCache.FILENAME, data)
+
+    def clear(self):
+        self.pages = {}
+
+    def is_current(self, start, pagebytes):
+        return self.pages.get(start) == page_hash(pagebytes)
+
+    def forget(self, starts):
+        for start in starts:
+            self.pages.pop(start, None)
+
+    def update(self, pages):
+        for start, pagebytes in pages:
+            self.pages[start] = page_hash(pagebytes)
+
+    def spot_check(self, read_page, starts=None):
+        """Read back a few cached pages with read_page(start) and check that they still match.
+
+        Pages are picked from starts if given, otherwise from all cached pages."""
+
+        candidates = sorted(s for s in (starts or self.pages) if s in self.pages)
+
+        for start in random.sample(candidates, min(len(candidates), FlashCache.SPOT_CHECK_PAGES)):
+            if page_hash(read_page(start)) != self.pages[start]:
+                return False
+
+        return True
+
+class LinkCache:
+    """Link parameters that worked on the previous run with each adapter, tried before detecting
+    them again. Entries are keyed by BaseInterface.link_key. A read_only cache is never saved."""
+
+    FILENAME = "links.json"
+
+    def __init__(self, read_only=False):
+        self.entries = load_state(LinkCache.FILENAME, {})
+        self.read_only = read_only
+
+    def get(self, key):
+        return self.entries.get(key, {})
+
+    def update(self, key, **values):
+        entry = self.entries.setdefault(key, {})
+
+        if all(entry.get(k) == v for k, v in values.items()):
+            return
+
+        entry.update(values)
+
+        if not self.read_only:
+            save_state(LinkCache.FILENAME, self.entries)
+
+class ImageCache:
+    """Page lists of parsed binaries, so that flashing the same file again skips parsing.
+
+    Entries are keyed by the SHA-256 of the file contents, the file format and the page and flash
+    size of the target. Each entry is a binary file holding a header, the start address and SHA-1
+    of every page and then the page data, which is loaded with a single read."""
+
+    DIRNAME = "images"
+
+    MAGIC = b"DWPI\x01"
+
+    # magic, page size, page count
+    HEADER = struct.Struct("<5sII")
+
+    # start address, SHA-1 of the page
+    ENTRY = struct.Struct("<I20s")
+
+    # Number of entries to keep, the least recently used ones are removed first
+    MAX_ENTRIES = 32
+
+    def __init__(self, data, fmt, dev):
+        self.pagesize = dev.flash_pagesize
+
+        self.path = state_path(os.path.join(ImageCache.DIRNAME, "{}-{}-{:x}-{:x}.bin".format(
+            hashlib.sha256(data).hexdigest(), fmt, dev.flash_pagesize, dev.flash_size)))
+
+    def load(self):
+        """Returns the cached list of (start, bytes) pages, or None if there is no valid entry."""
+
+        try:
+            with open(self.path, "rb") as f:
+                buf = memoryview(f.read())
+
+            # mark as recently used
+            os.utime(self.path)
+        except OSError:
+            return None
+
+        try:
+            magic, pagesize, count = ImageCache.HEADER.unpack_from(buf)
+        except struct.error:
+            return None
+
+        data_start = ImageCache.HEADER.size + count * ImageCache.ENTRY.size
+
+        if (magic != ImageCache.MAGIC or pagesize != self.pagesize
+                or len(buf) != data_start + count * pagesize):
+            return None
+
+        pages = []
+
+        for i in range(count):
+            start, digest = ImageCache.ENTRY.unpack_from(
+                buf, ImageCache.HEADER.size + i * ImageCache.ENTRY.size)
+
+            page = buf[data_start + i * pagesize:data_start + (i + 1) * pagesize]
+
+            if hashlib.sha1(page).digest() != digest:
+                return None
+
+            pages.append((start, page))
+
+        return pages
+
+    def save(self, pages):
+        buf = bytearray(ImageCache.HEADER.pack(ImageCache.MAGIC, self.pagesize, len(pages)))
+
+        for start, pagebytes in pages:
+            buf += ImageCache.ENTRY.pack(start, hashlib.sha1(pagebytes).digest())
+
+        for start, pagebytes in pages:
+            buf += pagebytes
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        with open(self.path + ".tmp", "wb") as f:
+            f.write(buf)
+
+        os.replace(self.path + ".tmp", self.path)
+
+        self._evict()
+
+    def _evict(self):
+        dirname = os.path.dirname(self.path)
+
+        entries = sorted(
+            (os.path.join(dirname, name) for name in os.listdir(dirname) if name.endswith(".bin")),
+            key=os.path.getmtime)
+
+        for path in entries[:-ImageCache.MAX_ENTRIES]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -1,30 +1,344 @@
+import threading
 import time
-from debugwire import DWException
+from debugwire import DWException, CMD_READ_SIG
+from metrics import DummyMetrics
+from adapters import (GENERIC, DEFAULT_LATENCY, find_profile, find_profile_by_name,
+    usb_port_info, preferred_backend)
 
 def hexdump(data):
     return " ".join("{:02x}".format(b) for b in data)
 
+def usb_serial_ports():
+    """List the device names of all USB serial adapters."""
+
+    from serial.tools.list_ports import comports
+
+    return [p.device for p in comports() if p.vid]
+
+def echo_mismatch(offset, sent, received):
+    i = next(i for i, (s, r) in enumerate(zip(sent, received)) if s != r)
+
+    return DWException("Echo mismatch at offset {} (sent {:02x}, received {:02x})."
+        .format(offset + i, sent[i], received[i]))
+
+# UART rates at which the sync byte is sampled to measure the bit time of the target. Each one
+# covers target rates between 1/9.5 and 1/4.75 of it, so together they cover 128kHz to 20MHz clocks.
+SAMPLE_BAUDRATES = [1000000, 500000, 250000, 125000, 62500, 31250, 15625, 7812]
+
+# step between candidate rates when searching for the exact rate, well within UART tolerance
+BAUDRATE_STEP = 1.015
+
+# debugWIRE runs at the CPU clock / 128, so rates close to that of a common clock are snapped to it
+COMMON_CLOCKS = [
+    128000, 1000000, 1843200, 2000000, 3686400, 4000000, 4800000, 7372800, 8000000, 9600000,
+    11059200, 12000000, 14745600, 16000000, 18432000, 20000000]
+
+# how long it takes the target to send the sync byte after a break at the slowest rate
+SYNC_BYTE_TIME = 0.01
+
+# old fixed guesses, used if measuring the sync byte fails
+BAUDRATE_GUESSES = [62500, 12500, 7812, 5000, 6250]
+
+def sync_byte_bounds(data, sample_baudrate):
+    """Estimate the target rate from what a UART at sample_baudrate received for the sync byte.
+
+    The 0x55 sync byte is a square wave, so every complete run of equal bits inside a received
+    frame is one target bit long. The first run of a frame starts exactly at the falling edge that
+    started the frame and is accurate to half a sample, later runs only to a whole sample. Returns
+    the range of target rates consistent with all runs as (low, high), or None if there is nothing
+    to measure."""
+
+    low, high = 0, float("inf")
+
+    for b in data:
+        # 0x00 is the break itself or a frame with a framing error
+        if b == 0x00:
+            continue
+
+        slots = [0] + [(b >> i) & 1 for i in range(8)]
+
+        # the last run may continue past the frame, so only count runs that end inside it
+        run, error = 1, 0.5
+        for prev, cur in zip(slots, slots[1:]):
+            if cur == prev:
+                run += 1
+            else:
+                low = max(low, sample_baudrate / (run + error))
+                if run > error:
+                    high = min(high, sample_baudrate / (run - error))
+
+                run, error = 1, 1
+
+    if high == float("inf") or low >= high:
+        return None
+
+    return low, high
+
+# how far off a UART can be and still receive the sync byte correctly
+UART_TOLERANCE = 1.05
+
+def baudrate_candidates(low, high):
+    # the search extends past the bounds so that the whole window of working rates is found even
+    # when the target rate is near the edge of the bounds
+    low, high = low / UART_TOLERANCE, high * UART_TOLERANCE
+
+    rates = []
+
+    rate = low
+    while rate < high * BAUDRATE_STEP:
+        rates.append(round(rate))
+        rate *= BAUDRATE_STEP
+
+    return rates
+
+def pick_baudrate(rates):
+    """Pick the rate in the middle of the candidates that worked and snap it to a common clock."""
+
+    rate = round((rates[0] * rates[-1]) ** 0.5)
+
+    for clock in COMMON_CLOCKS:
+        if abs(clock / 128 - rate) < rate * 0.01:
+            return int(clock / 128)
+
+    return rate
+
 class BaseInterface:
+    # identifies the adapter model (and instance where possible) for caching per-adapter settings
+    adapter_id = None
+
+    # fastest rate the adapter can use, None if unknown
+    max_baudrate = None
+
+    # see metrics.MeteredInterface
+    metrics = DummyMetrics()
+
+    # USB serial number of the adapter if known
+    usb_serial = None
+
+    # hoststate.LinkCache to remember link parameters in, None to always detect them
+    link_cache = None
+
     def __init__(self, enable_log=False):
         self.enable_log = enable_log
 
+        # number of times the host has waited for data from the adapter
+        self.round_trips = 0
+
+    @property
+    def link_key(self):
+        """Identifies the adapter for caching link parameters. The USB serial number follows the
+        adapter to another port."""
+
+        return "usb:" + self.usb_serial if self.usb_serial else self.port
+
     def _log(self, msg):
         if self.enable_log:
             print(msg)
 
+    def flush(self):
+        """Wait until everything written so far has been sent."""
+
+        pass
+
+    def host_state(self, name, lookup):
+        """Returns lookup(), the JSON-serializable value of host state called name that a decision
+        about what to send is based on, such as a cache. Traces record it so that replays make the
+        same decision."""
+
+        return lookup()
+
+class EchoReader(threading.Thread):
+    """Reads everything an interface receives in the background.
+
+    Echoes of written data are checked against what was sent and the remaining data is queued to be
+    read as responses."""
+
+    def __init__(self, iface):
+        super().__init__(daemon=True)
+
+        self.iface = iface
+        self.cond = threading.Condition()
+        self.expected = bytearray()
+        self.received = bytearray()
+        self.offset = 0
+        self.error = None
+        self.running = True
+
+    def run(self):
+        while self.running:
+            try:
+                data = self.iface._read_available()
+            except Exception as ex:
+                with self.cond:
+                    self.error = DWException("Read failed: {}".format(ex))
+                    self.cond.notify_all()
+
+                return
+
+            if not data:
+                continue
+
+            with self.cond:
+                n = min(len(data), len(self.expected))
+
+                if data[:n] != self.expected[:n] and not self.error:
+                    self.error = echo_mismatch(self.offset, self.expected[:n], data[:n])
+                    self.iface.metrics.inc("echo_mismatches")
+
+                del self.expected[:n]
+                self.offset += n
+
+                self.received += data[n:]
+                self.cond.notify_all()
+
+    def stop(self):
+        self.running = False
+        self.join()
+
+    def expect(self, data):
+        with self.cond:
+            self.expected += data
+
+    def wait(self, nread, timeout):
+        """Wait until all echoes have been received and then read nread bytes."""
+
+        with self.cond:
+            ok = self.cond.wait_for(
+                lambda: self.error or (not self.expected and len(self.received) >= nread),
+                timeout)
+
+            if self.error:
+                error, self.error = self.error, None
+                raise error
+
+            if not ok:
+                raise DWException("Read timeout. Check connections and make sure debugWIRE is enabled.")
+
+            buf = bytes(self.received[:nread])
+            del self.received[:nread]
+
+            return buf
+
+    def discard(self):
+        with self.cond:
+            self.received.clear()
+
 class BaseSerialInterface(BaseInterface):
+    # consume echoes in a background thread so that writes don't wait for a USB round trip
+    async_echo = False
+
+    profile = GENERIC
+
+    # how long the adapter may hold on to received data before passing it on
+    latency = DEFAULT_LATENCY
+
+    _reader = None
+
+    def set_baudrate(self, baudrate):
+        """Change the rate of an open interface once everything written so far has been sent."""
+
+        self.flush()
+        self._set_baudrate(baudrate)
+
+        self.baudrate = baudrate
+
+    def _set_baudrate(self, baudrate):
+        self.dev.baudrate = baudrate
+
+    def _break_response(self, baudrate):
+        """Send a break at the given rate and return whatever is received shortly after it. The
+        response is waited for long enough for the adapter to pass on the sync byte."""
+
+        self._set_baudrate(baudrate)
+
+        return self._sample_break_response()
+
     def _detect_baudrate(self):
-        # TODO: Make an actual auto-detection algorithm
-        for guess in [62500, 12500, 7812, 5000, 6250]:
-            self.dev.baudrate = guess
+        """Measure the rate of the target from the sync byte it sends after a break.
+
+        The sync byte is sampled at a range of fast rates to narrow down the target rate, and the
+        candidates within that range are then tried to find the ones that actually work."""
+
+        # the fastest sample rate that sees anything is the most accurate one, slower rates than
+        # the target itself only see garbage
+        bounds = None
+
+        for sample_baudrate in SAMPLE_BAUDRATES:
+            bounds = sync_byte_bounds(self._break_response(sample_baudrate), sample_baudrate)
+
+            if bounds:
+                break
+
+        working = []
+
+        if bounds:
+            working = [
+                rate for rate in baudrate_candidates(*bounds)
+                if 0x55 in self._break_response(rate)]
+
+        if working:
+            baudrate = pick_baudrate(working)
+        else:
+            self._log("Failed to measure sync byte, trying fixed guesses")
+
+            baudrate = next(
+                (g for g in BAUDRATE_GUESSES if 0x55 in self._break_response(g)), None)
+
+            if baudrate is None:
+                raise DWException("Failed to autodetect baudrate.")
+
+        # make sure the link works both ways before trusting the rate
+        if not self._check_baudrate(baudrate):
+            raise DWException("Failed to autodetect baudrate.")
+
+        self._log("Baudrate detected as {}".format(baudrate))
+
+        return baudrate
+
+    def _check_baudrate(self, baudrate):
+        """Check that the target responds to a break and a command at the given rate."""
+
+        if 0x55 not in self._break_response(baudrate):
+            return False
 
-            if 0x55 in self.send_break():
-                self._log("Baudrate detected as {}".format(guess))
-                return self.dev.baudrate
+        try:
+            self.discard_input()
+            self.write([CMD_READ_SIG])
+            self.read(2)
+        except DWException:
+            return False
 
-        raise DWException("Failed to autodetect baudrate.")
+        return True
+
+    def _autobaud(self):
+        """Find the rate of the target, trying the one from the previous run first."""
+
+        entry = self.link_cache.get(self.link_key) if self.link_cache else {}
+
+        if entry.get("baudrate"):
+            if self._check_baudrate(entry["baudrate"]):
+                self._log("Using baudrate {} from the previous run".format(entry["baudrate"]))
+                return entry["baudrate"]
+
+            self._log("Baudrate from the previous run didn't work")
+
+        baudrate = self._detect_baudrate()
+
+        if self.link_cache:
+            self.link_cache.update(self.link_key, baudrate=baudrate, profile=self.profile.name)
+
+        return baudrate
+
+    def _start_reader(self):
+        if self.async_echo:
+            self._reader = EchoReader(self)
+            self._reader.start()
 
     def close(self):
+        if self._reader:
+            self._reader.stop()
+            self._reader = None
+
         if self.dev:
             self.dev.close()
             self.dev = None
@@ -32,7 +346,12 @@ class BaseSerialInterface(BaseInterface):
     def write(self, data):
         data = bytes(data)
 
-        self._log(">"+ hexdump(data))
+        if self.enable_log:
+            self._log(">" + hexdump(data))
+
+        if self._reader:
+            # must be registered before the echo can arrive
+            self._reader.expect(data)
 
         start = time.time()
 
@@ -43,9 +362,30 @@ class BaseSerialInterface(BaseInterface):
             if time.time() - start >= self.timeout:
                 raise DWException("Write timeout. Check connections and make sure debugWIRE is enabled.")
 
-        self.read(nwrite, _log=False)
+        if not self._reader:
+            with self.metrics.timer("echo"):
+                echo = self.read(nwrite, _log=False)
+
+            if echo != data:
+                self.metrics.inc("echo_mismatches")
+                raise echo_mismatch(0, data, echo)
+
+    def flush(self):
+        if self._reader:
+            self.round_trips += 1
+            self._reader.wait(0, self.timeout)
 
     def read(self, nread, _log=True):
+        self.round_trips += 1
+
+        if self._reader:
+            buf = self._reader.wait(nread, self.timeout)
+
+            if _log and self.enable_log:
+                self._log("<" + hexdump(buf))
+
+            return buf
+
         start = time.time()
 
         buf = b""
@@ -55,50 +395,102 @@ class BaseSerialInterface(BaseInterface):
             if time.time() - start >= self.timeout:
                 raise DWException("Read timeout. Check connections and make sure debugWIRE is enabled.")
 
-        if _log:
+        if _log and self.enable_log:
             self._log("<" + hexdump(buf))
 
         return buf
 
+    def discard_input(self):
+        """Throw away any received data that hasn't been read yet."""
+
+        self.flush()
+        self._discard_device_input()
+
+        if self._reader:
+            self._reader.discard()
+
 class FTDIInterface(BaseSerialInterface):
-    def __init__(self, baudrate, timeout=2, enable_log=False):
+    """Interface to an FTDI adapter through libftdi. The port is the USB serial number of the
+    adapter, or None for the first one found."""
+
+    def __init__(self, port, baudrate, timeout=2, enable_log=False, profile=None):
         super().__init__(enable_log)
 
-        self.port = "FTDI"
+        self.device_id = port
+        self.usb_serial = port
+        self.port = port or "FTDI"
+        self.adapter_id = "ftdi"
         self.baudrate = baudrate
         self.timeout = timeout
         self.dev = None
 
+        self.profile = profile or find_profile(0x0403, 0x6001)
+        self.max_baudrate = self.profile.max_baudrate
+
     def open(self):
         from pylibftdi.serial_device import SerialDevice
 
-        self.dev = SerialDevice()
+        self.dev = SerialDevice(device_id=self.device_id)
+
+        if self.profile.latency_timer:
+            self.dev.ftdi_fn.ftdi_set_latency_timer(self.profile.latency_timer)
+            self.latency = self.profile.latency_timer / 1000
+
+        if self.profile.transfer_size:
+            self.dev.ftdi_fn.ftdi_read_data_set_chunksize(self.profile.transfer_size)
+            self.dev.ftdi_fn.ftdi_write_data_set_chunksize(self.profile.transfer_size)
 
         if self.baudrate is None:
-            self.baudrate = self._detect_baudrate()
+            self.baudrate = self._autobaud()
         else:
             self.dev.baudrate = self.baudrate
 
         self.dev.read(1024)
 
+        self._start_reader()
+
         return self.dev.baudrate
 
+    def _discard_device_input(self):
+        self.dev.ftdi_fn.ftdi_usb_purge_rx_buffer()
+        self.dev.read(1024)
+
+    def _read_available(self):
+        data = self.dev.read(1024)
+
+        if not data:
+            time.sleep(0.0005)
+
+        return data
+
     def send_break(self):
         self._log(">break")
 
+        self.flush()
+
         self.dev.ftdi_fn.ftdi_set_line_property2(8, 0, 0, 1)
 
-        time.sleep(0.002)
+        time.sleep(self.profile.break_time)
 
-        self.dev.ftdi_fn.ftdi_usb_purge_rx_buffer()
-        self.dev.read(1024)
+        self.discard_input()
 
         self.dev.ftdi_fn.ftdi_set_line_property2(8, 0, 0, 0)
 
-        time.sleep(0.002)
+        time.sleep(self.profile.break_time)
 
         return self.read(1)
 
+    def _sample_break_response(self):
+        self._discard_device_input()
+
+        self.dev.ftdi_fn.ftdi_set_line_property2(8, 0, 0, 1)
+        time.sleep(self.profile.break_time)
+        self.dev.ftdi_fn.ftdi_set_line_property2(8, 0, 0, 0)
+
+        time.sleep(SYNC_BYTE_TIME + self.latency)
+
+        return self.dev.read(1024)
+
 class SerialInterface(BaseSerialInterface):
     def __init__(self, port, baudrate, timeout=2, enable_log=False):
         super().__init__(enable_log)
@@ -107,6 +499,7 @@ class SerialInterface(BaseSerialInterface):
         self.baudrate = baudrate
         self.timeout = timeout
         self.dev = None
+        self.profile = GENERIC
 
     def open(self):
         from serial import Serial
@@ -114,41 +507,401 @@ class SerialInterface(BaseSerialInterface):
         if self.port is None:
             self._detect_port()
 
+        info = usb_port_info(self.port)
+
+        if info:
+            self.adapter_id = "{:04x}:{:04x}:{}".format(info.vid, info.pid, info.serial_number or "")
+            self.usb_serial = info.serial_number
+            self.profile = find_profile(info.vid, info.pid)
+        else:
+            self.adapter_id = "unknown"
+
+            # ports that can't be matched to a USB device (e.g. symlinks) keep their last profile
+            if self.link_cache:
+                self.profile = find_profile_by_name(self.link_cache.get(self.port).get("profile"))
+
+        self.max_baudrate = self.profile.max_baudrate
+
         self.dev = Serial(
             port=self.port,
             baudrate=self.baudrate or 9600,
             timeout=self.timeout,
             write_timeout=self.timeout)
 
+        self._set_low_latency()
+
         self.dev.reset_input_buffer()
 
         if self.baudrate is None:
-            self.baudrate = self._detect_baudrate()
+            self.baudrate = self._autobaud()
+
+        if self.async_echo:
+            # short timeout so that the reader thread can be stopped promptly
+            self.dev.timeout = 0.05
+
+        self._start_reader()
 
         return self.baudrate
 
     def _detect_port(self):
-        from serial.tools.list_ports import comports
+        ports = usb_serial_ports()
 
-        for p in comports():
-            if p.vid:
-                self.port = p.device
-                break
-        else:
+        if not ports:
             raise DWException("Failed to find a USB serial adapter.")
 
+        self.port = ports[0]
+
+    def _set_low_latency(self):
+        if not self.profile.latency_timer:
+            return
+
+        # only supported on Linux, where it also sets the latency timer of FTDI adapters to 1ms
+        try:
+            self.dev.set_low_latency_mode(True)
+            self.latency = self.profile.latency_timer / 1000
+            self._log("Enabled low latency mode for {}".format(self.profile.name))
+        except (AttributeError, OSError, ValueError) as ex:
+            self._log("Failed to enable low latency mode: {}".format(ex))
+
+    def _discard_device_input(self):
+        self.dev.reset_input_buffer()
+
+    def _read_available(self):
+        return self.dev.read(max(1, self.dev.in_waiting))
+
     def send_break(self):
         self._log(">break")
 
+        self.flush()
+
         self.dev.break_condition = True
-        time.sleep(0.002)
+        time.sleep(self.profile.break_time)
         self.dev.break_condition = False
 
-        time.sleep(0.002)
+        time.sleep(self.profile.break_time)
 
         return self.read(2)
 
+    def _sample_break_response(self):
+        self.dev.reset_input_buffer()
+
+        self.dev.break_condition = True
+        time.sleep(self.profile.break_time)
+        self.dev.break_condition = False
+
+        time.sleep(SYNC_BYTE_TIME + self.latency)
+
+        return self.dev.read(self.dev.in_waiting)
+
+class SimInterface(BaseSerialInterface):
+    """Interface to a simulated target.
+
+    The port is the ID of the device to simulate, optionally followed by a colon and the name of a
+    file that holds the flash and EEPROM contents between runs."""
+
+    def __init__(self, port, baudrate, timeout=2, enable_log=False, timing=None):
+        super().__init__(enable_log)
+
+        from devices import find_device
+        from simulator import SimTiming, SimulatedTarget
+
+        devid, _, self.image_file = (port or "attiny85").partition(":")
+
+        dev = find_device(devid)
+        if not dev:
+            raise DWException("Device '{}' cannot be simulated.".format(devid))
+
+        self.port = "sim:" + dev.devid
+        self.adapter_id = "sim"
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.timing = timing or SimTiming()
+        self.target = SimulatedTarget(dev, self.timing)
+
+        # rate of the simulated host UART, the target only understands it if it's close enough
+        self._host_baudrate = None
+
+        # the image file has been loaded, so saving it doesn't lose anything
+        self._opened = False
+
+    def open(self):
+        if self.image_file:
+            try:
+                with open(self.image_file, "rb") as f:
+                    image = f.read(len(self.target.flash))
+                    self.target.flash[:len(image)] = image
+
+                    # older files only hold the flash
+                    image = f.read(len(self.target.eeprom))
+                    self.target.eeprom[:len(image)] = image
+            except FileNotFoundError:
+                pass
+
+        self._opened = True
+
+        if self.baudrate is None:
+            self.baudrate = self._autobaud()
+        else:
+            self._set_baudrate(self.baudrate)
+
+        return self.baudrate
+
+    def close(self):
+        target = self.target
+        modified = target.page_erases or target.page_writes or target.eeprom_writes
+
+        if self.image_file and self._opened and modified:
+            with open(self.image_file, "wb") as f:
+                f.write(self.target.flash)
+                f.write(self.target.eeprom)
+
+    def _delay(self, duration):
+        if self.timing.time_scale:
+            time.sleep(duration * self.timing.time_scale)
+
+    def write(self, data):
+        data = bytes(data)
+
+        if self.enable_log:
+            self._log(">" + hexdump(data))
+
+        if self._link_ok(receiving=False):
+            self.target.feed(data, time.monotonic())
+        else:
+            # the target can't make sense of anything sent at the wrong rate
+            self.target.lost += len(data)
+
+        self.round_trips += 1
+        self._delay(self.timing.usb_latency + self.timing.byte_time(len(data), self._host_baudrate))
+
+    def read(self, nread):
+        self.round_trips += 1
+
+        output = self.target.output
+
+        if len(output) < nread or not self._link_ok():
+            raise DWException("Read timeout. Check connections and make sure debugWIRE is enabled.")
+
+        buf = bytes(output[:nread])
+        del output[:nread]
+
+        self._delay(self.timing.usb_latency + self.timing.byte_time(nread, self._host_baudrate))
+
+        if self.enable_log:
+            self._log("<" + hexdump(buf))
+
+        return buf
+
+    def discard_input(self):
+        self.target.output.clear()
+
+    def send_break(self):
+        self._log(">break")
+
+        self._delay(self.timing.break_time + self.timing.usb_latency)
+
+        # the target only responds once it's done with a self-programming operation
+        delay = self.target.busy_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+        self.target.output += self._target_break()
+
+        return self.read(2)
+
+    def _set_baudrate(self, baudrate):
+        self._host_baudrate = baudrate
+
+    def _link_ok(self, receiving=True):
+        # an adapter that is too slow still sends fine but can't receive what the target sends
+        return (self._host_baudrate is not None
+            and abs(self._host_baudrate / self.target.baudrate - 1) <= self.timing.uart_tolerance
+            and (not receiving or not self.timing.max_baudrate
+                or self._host_baudrate <= self.timing.max_baudrate))
+
+    def _target_break(self):
+        from simulator import sample_sync_byte
+
+        response = self.target.send_break()
+
+        if not self._link_ok():
+            response = b"\x00" + sample_sync_byte(self.target.baudrate, self._host_baudrate)
+
+        return response
+
+    def _sample_break_response(self):
+        self._delay(self.timing.break_time + self.timing.usb_latency)
+
+        return self._target_break()
+
+class ReplayInterface(BaseInterface):
+    """Plays back a trace recorded with --trace.
+
+    The port is the name of the trace file. Every call must match the recorded one and gets the
+    recorded response, and host state is the recorded one instead of what this host has cached, so
+    the same command runs exactly as it did when it was recorded, only without waiting for the
+    adapter."""
+
+    def __init__(self, port, baudrate, timeout=2, enable_log=False):
+        super().__init__(enable_log)
+
+        self.filename = port
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.trace = None
+        self.pos = 0
+
+    def _next(self, event, payload=None):
+        from wiretrace import EV_ERROR, EVENT_NAMES
+
+        if self.pos >= len(self.trace.events):
+            raise DWException("Replay diverged at event {}: expected {}, trace ended."
+                .format(self.pos, EVENT_NAMES[event]))
+
+        rec_event, usec, rec_payload = self.trace.events[self.pos]
+
+        if rec_event == EV_ERROR:
+            # the call failed without a result
+            self.pos += 1
+            raise DWException(rec_payload.decode("utf-8"))
+
+        if rec_event != event or (payload is not None and rec_payload != payload):
+            raise DWException("Replay diverged at event {}: expected {} {}, trace has {} {}."
+                .format(self.pos, EVENT_NAMES[event], hexdump((payload or b"")[:16]),
+                    EVENT_NAMES.get(rec_event, rec_event), hexdump(rec_payload[:16])))
+
+        self.pos += 1
+
+        # a recorded failure of a call that had already sent its data is raised again
+        if self.pos < len(self.trace.events) and self.trace.events[self.pos][0] == EV_ERROR:
+            self.pos += 1
+            raise DWException(self.trace.events[self.pos - 1][2].decode("utf-8"))
+
+        return rec_payload
+
+    def open(self):
+        import json
+        import random
+        from wiretrace import Trace, EV_OPEN
+
+        self.trace = Trace(self.filename)
+        random.seed(self.trace.header["seed"])
+
+        props = json.loads(self._next(EV_OPEN).decode("utf-8"))
+
+        # recorded properties are used so that the same host state is looked up
+        self.port = props["port"]
+        self.adapter_id = props["adapter_id"]
+        self.max_baudrate = props["max_baudrate"]
+        self.baudrate = props["baudrate"]
+
+        self._log("Replaying {} events from {}".format(len(self.trace.events), self.filename))
+
+        return self.baudrate
+
+    def close(self):
+        from wiretrace import EV_CLOSE
+
+        # not an error if the trace ends early, close is also called after failures
+        if self.trace and self.pos < len(self.trace.events) \
+                and self.trace.events[self.pos][0] == EV_CLOSE:
+            self.pos += 1
+
+    def write(self, data):
+        from wiretrace import EV_WRITE
+
+        data = bytes(data)
+
+        if self.enable_log:
+            self._log(">" + hexdump(data))
+
+        self._next(EV_WRITE, data)
+
+    def read(self, nread):
+        from wiretrace import EV_READ
+
+        self.round_trips += 1
+
+        buf = self._next(EV_READ)
+
+        if len(buf) != nread:
+            raise DWException("Replay diverged at event {}: read of {} bytes, trace has {}."
+                .format(self.pos - 1, nread, len(buf)))
+
+        if self.enable_log:
+            self._log("<" + hexdump(buf))
+
+        return buf
+
+    def send_break(self):
+        from wiretrace import EV_BREAK
+
+        self._log(">break")
+
+        return self._next(EV_BREAK)
+
+    def flush(self):
+        from wiretrace import EV_FLUSH
+
+        self._next(EV_FLUSH)
+
+    def discard_input(self):
+        from wiretrace import EV_DISCARD
+
+        self._next(EV_DISCARD)
+
+    def set_baudrate(self, baudrate):
+        from wiretrace import EV_BAUDRATE, BAUDRATE
+
+        self._next(EV_BAUDRATE, BAUDRATE.pack(baudrate))
+
+        self.baudrate = baudrate
+
+    def host_state(self, name, lookup):
+        import json
+        from wiretrace import EV_STATE
+
+        # the recorded value is used without looking it up, so whatever the lookup sent is skipped
+        events = self.trace.events
+        state_pos = next((i for i in range(self.pos, len(events)) if events[i][0] == EV_STATE), None)
+
+        if state_pos is not None:
+            if json.loads(events[state_pos][2].decode("utf-8")).get("skip", 0) == state_pos - self.pos:
+                self.pos = state_pos
+
+        state = json.loads(self._next(EV_STATE).decode("utf-8"))
+
+        if state["name"] != name:
+            raise DWException("Replay diverged at event {}: expected state {}, trace has {}."
+                .format(self.pos - 1, name, state["name"]))
+
+        return state["value"]
+
+def auto_interface(port, baudrate, timeout=2, enable_log=False):
+    """Creates the fastest interface available for the adapter at port, or the first USB serial
+    adapter if port is None."""
+
+    if port is None:
+        ports = usb_serial_ports()
+
+        if not ports:
+            raise DWException("Failed to find a USB serial adapter.")
+
+        port = ports[0]
+
+    info = usb_port_info(port)
+    profile = find_profile(info.vid, info.pid) if info else GENERIC
+
+    if preferred_backend(profile) == "ftdi":
+        return FTDIInterface(info.serial_number, baudrate, timeout, enable_log, profile=profile)
+
+    return SerialInterface(port, baudrate, timeout, enable_log)
+
 interfaces = {
+    "auto": auto_interface,
     "serial": SerialInterface,
     "ftdi": FTDIInterface,
+    "sim": SimInterface,
+    "replay": ReplayInterface,
 }
@@ -0,0 +1,192 @@
+# Counters and latency histograms for the operations dwprog performs, for keeping an eye on the
+# health of adapters and targets. Exported as JSON or in the Prometheus text format, which can be
+# picked up by the node exporter textfile collector.
+
+import json
+import os
+import time
+from collections import OrderedDict
+
+# Upper bounds of the latency histogram buckets in seconds
+BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+
+# Prefix of all metric names in the Prometheus format
+PROMETHEUS_PREFIX = "dwprog_"
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def cumulative(self):
+        """Returns a list of (upper bound, count) with cumulative counts like Prometheus uses."""
+
+        total = 0
+        result = []
+
+        for bound, count in zip(BUCKETS + (float("inf"),), self.counts):
+            total += count
+            result.append((bound, total))
+
+        return result
+
+class _Timer:
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.monotonic()
+
+    def __exit__(self, type, value, traceback):
+        self.metrics.observe(self.name, time.monotonic() - self.start)
+
+        if type is not None:
+            self.metrics.inc(self.name + "_errors")
+
+class _DummyTimer:
+    def __enter__(self): pass
+    def __exit__(self, type, value, traceback): pass
+
+class DummyMetrics:
+    """Metrics that aren't kept, used when metrics are disabled."""
+
+    _timer = _DummyTimer()
+
+    def inc(self, name, amount=1): pass
+    def observe(self, name, seconds): pass
+
+    def timer(self, name):
+        return DummyMetrics._timer
+
+class Metrics:
+    """Named counters and latency histograms. Histograms are in seconds."""
+
+    def __init__(self):
+        self.counters = OrderedDict()
+        self.histograms = OrderedDict()
+
+        # added to every metric in the Prometheus format, e.g. the port and device
+        self.labels = OrderedDict()
+
+    def inc(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, seconds):
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = Histogram()
+
+        hist.observe(seconds)
+
+    def timer(self, name):
+        """Context manager that observes the time spent in it. Exceptions are also counted."""
+
+        return _Timer(self, name)
+
+    def to_json(self):
+        return {
+            "labels": self.labels,
+            "counters": self.counters,
+            "histograms": OrderedDict(
+                (name, {
+                    "count": hist.count,
+                    "sum": hist.sum,
+                    "buckets": OrderedDict(
+                        ("+Inf" if bound == float("inf") else str(bound), count)
+                        for bound, count in hist.cumulative()),
+                })
+                for name, hist in self.histograms.items()),
+        }
+
+    def to_prometheus(self):
+        def labels(extra=()):
+            items = list(extra) + list(self.labels.items())
+
+            if not items:
+                return ""
+
+            return "{" + ",".join(
+                '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+                for k, v in items) + "}"
+
+        lines = []
+
+        for name, value in self.counters.items():
+            metric = PROMETHEUS_PREFIX + name + "_total"
+
+            lines.append("# TYPE {} counter".format(metric))
+            lines.append("{}{} {}".format(metric, labels(), value))
+
+        for name, hist in self.histograms.items():
+            metric = PROMETHEUS_PREFIX + name + "_seconds"
+
+            lines.append("# TYPE {} histogram".format(metric))
+
+            for bound, count in hist.cumulative():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append("{}_bucket{} {}".format(metric, labels([("le", le)]), count))
+
+            lines.append("{}_sum{} {}".format(metric, labels(), hist.sum))
+            lines.append("{}_count{} {}".format(metric, labels(), hist.count))
+
+        return "\n".join(lines) + "\n"
+
+    def save(self, filename):
+        """Atomically write the metrics to filename, in the Prometheus format if it ends with .prom
+        and as JSON otherwise."""
+
+        if filename.endswith(".prom"):
+            text = self.to_prometheus()
+        else:
+            text = json.dumps(self.to_json(), indent=2) + "\n"
+
+        with open(filename + ".tmp", "w") as f:
+            f.write(text)
+
+        os.replace(filename + ".tmp", filename)
+
+class MeteredInterface:
+    """Wraps an interface and keeps metrics of every call that DebugWire makes to it."""
+
+    def __init__(self, iface, metrics):
+        self.iface = iface
+        self.metrics = metrics
+
+        # echoes are checked inside the interface
+        iface.metrics = metrics
+
+    def __getattr__(self, name):
+        return getattr(self.iface, name)
+
+    def write(self, data):
+        with self.metrics.timer("write"):
+            self.iface.write(data)
+
+        self.metrics.inc("bytes_written", len(data))
+
+    def read(self, nread):
+        with self.metrics.timer("read"):
+            buf = self.iface.read(nread)
+
+        self.metrics.inc("bytes_read", len(buf))
+
+        return buf
+
+    def send_break(self):
+        with self.metrics.timer("break"):
+            return self.iface.send_break()
+
+    def flush(self):
+        with self.metrics.timer("flush"):
+            self.iface.flush()
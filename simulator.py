@@ -0,0 +1,366 @@
+# Simulated debugWIRE target for testing and benchmarking without hardware. Only the commands and
+# instructions that dwprog itself uses are implemented.
+
+from debugwire import (DWException,
+    CMD_DISABLE, CMD_RESET, CMD_GO, CMD_STEP, CMD_RUN, CMD_RW, CMD_RW_MODE, CMD_SET_PC, CMD_SET_BP,
+    CMD_SET_IR, CMD_READ_SIG,
+    RW_MODE_READ_SRAM, RW_MODE_READ_REGS, RW_MODE_READ_FLASH, RW_MODE_WRITE_SRAM,
+    RW_MODE_WRITE_REGS,
+    SPMEN, PGERS, PGWRT, RFLB, CTPB, REG_Z, CMD_DIVISOR, DEFAULT_DIVISOR, EERE, EEPE, EEMPE)
+
+# I/O address of the status register, only the carry flag is simulated
+SREG = 0x3f
+
+class SimTiming:
+    """Timing model for a simulated target and adapter. All times are in seconds."""
+
+    def __init__(self, baudrate=62500, usb_latency=0.001, break_time=0.004, spm_erase_time=0.004,
+            spm_write_time=0.004, time_scale=1.0, max_baudrate=None, uart_tolerance=0.025):
+        # debugWIRE link rate of the target (clock / 128)
+        self.baudrate = baudrate
+
+        # fastest rate the simulated adapter can follow, None for no limit
+        self.max_baudrate = max_baudrate
+
+        # how far off the host rate can be from the target rate for the link to work, as a fraction
+        self.uart_tolerance = uart_tolerance
+
+        # round trip overhead of the USB serial adapter for each transfer
+        self.usb_latency = usb_latency
+
+        # time it takes to send a break and get the sync byte back
+        self.break_time = break_time
+
+        self.spm_erase_time = spm_erase_time
+        self.spm_write_time = spm_write_time
+
+        # multiplier for all simulated delays, 0 disables them entirely
+        self.time_scale = time_scale
+
+    def byte_time(self, count, baudrate=None):
+        return count * 10 / (baudrate or self.baudrate)
+
+def sample_sync_byte(baudrate, sample_baudrate):
+    """Returns what a UART running at sample_baudrate receives when the target sends the 0x55 sync
+    byte at baudrate. Like on Linux, bytes with a framing error are received as 0x00."""
+
+    # start bit, 0x55 LSB first and stop bit
+    bits = [0, 1, 0, 1, 0, 1, 0, 1, 0, 1]
+    falling_edges = [i / baudrate for i in range(0, len(bits), 2)]
+
+    def level(t):
+        i = int(t * baudrate)
+        return bits[i] if 0 <= i < len(bits) else 1
+
+    out = bytearray()
+    t = falling_edges[0]
+
+    while t is not None:
+        slots = [level(t + (i + 0.5) / sample_baudrate) for i in range(10)]
+
+        if slots[0] == 0:
+            value = sum(bit << i for i, bit in enumerate(slots[1:9]))
+            out.append(value if slots[9] else 0x00)
+
+        # the receiver waits for the next start bit after the stop bit
+        end = t + 9.5 / sample_baudrate
+        t = next((e for e in falling_edges if e > end), None)
+
+    return bytes(out)
+
+class SimulatedTarget:
+    """Emulates an AVR device with debugWIRE enabled."""
+
+    DEFAULT_FUSES = (0x62, 0xff, 0xff, 0x9f)
+
+    def __init__(self, dev, timing=None):
+        self.dev = dev
+        self.timing = timing or SimTiming()
+
+        self.flash = bytearray(b"\xff" * dev.flash_size)
+        self.data = bytearray(0x10000)
+        self.fuses = bytearray(SimulatedTarget.DEFAULT_FUSES)
+        self.eeprom = bytearray(b"\xff" * dev.eeprom_size)
+        self.page_buffer = bytearray(b"\xff" * dev.flash_pagesize)
+        self.spmcsr = 0
+        self.divisor = DEFAULT_DIVISOR
+
+        # time until which the CPU is halted by a self-programming operation
+        self.busy_until = 0
+
+        # bytes that arrived while the target was busy and were therefore ignored
+        self.lost = 0
+
+        # statistics
+        self.page_erases = 0
+        self.page_writes = 0
+        self.eeprom_writes = 0
+
+        self.running = False
+        self.disabled = False
+
+        self.output = bytearray()
+
+        self._parser = self._parse()
+        next(self._parser)
+
+    # register and I/O space access
+
+    def _io_addr(self, addr):
+        return addr + 0x20
+
+    def _z(self):
+        return self.data[REG_Z] | (self.data[REG_Z + 1] << 8)
+
+    def _set_z(self, value):
+        self.data[REG_Z] = value & 0xff
+        self.data[REG_Z + 1] = (value >> 8) & 0xff
+
+    def _rampz_z(self):
+        """RAMPZ:Z, used by elpm and spm on devices with more than 64 KiB of flash."""
+
+        rampz = self.data[self._io_addr(self.dev.reg_rampz)] if self.dev.reg_rampz else 0
+
+        return (rampz << 16) | self._z()
+
+    def _set_rampz_z(self, value):
+        if self.dev.reg_rampz:
+            self.data[self._io_addr(self.dev.reg_rampz)] = (value >> 16) & 0xff
+
+        self._set_z(value)
+
+    # wire interface
+
+    @property
+    def baudrate(self):
+        """Current rate of the debugWIRE link."""
+
+        return self.timing.baudrate * DEFAULT_DIVISOR // self.divisor
+
+    def send_break(self):
+        """Handle a break condition. Returns the bytes the target sends in response."""
+
+        self.running = False
+        self.spmcsr = 0
+
+        self._parser = self._parse()
+        next(self._parser)
+
+        return b"\x00\x55"
+
+    def feed(self, data, now):
+        """Handle bytes sent by the host. now is the time the first byte arrives."""
+
+        byte_time = self.timing.byte_time(1, self.baudrate) * self.timing.time_scale
+
+        for i, b in enumerate(data):
+            t = now + i * byte_time
+
+            if self.running or self.disabled:
+                continue
+
+            if t < self.busy_until:
+                self.lost += 1
+                continue
+
+            self._now = t
+            self._parser.send(b)
+
+    def _parse(self):
+        rw = False
+        mode = None
+        pc = 0
+        bp = 0
+        ir = 0
+
+        while True:
+            cmd = yield
+
+            if cmd == CMD_DISABLE:
+                self.disabled = True
+            elif cmd == CMD_RESET:
+                self.spmcsr = 0
+                self.output += b"\x55"
+            elif cmd == CMD_RUN:
+                self.running = True
+            elif cmd == CMD_RW:
+                rw = True
+            elif cmd == CMD_RW_MODE:
+                mode = yield
+            elif cmd in (CMD_SET_PC, CMD_SET_BP, CMD_SET_IR):
+                value = (yield) << 8
+                value |= yield
+
+                if cmd == CMD_SET_PC:
+                    pc = value
+                elif cmd == CMD_SET_BP:
+                    bp = value
+                else:
+                    ir = value
+            elif cmd == CMD_STEP:
+                yield from self._execute(ir)
+            elif cmd == CMD_GO:
+                if rw:
+                    yield from self._transfer(mode, pc, bp)
+                    rw = False
+                else:
+                    self.running = True
+            elif cmd in CMD_DIVISOR.values():
+                self.divisor = next(d for d, c in CMD_DIVISOR.items() if c == cmd)
+            elif cmd == CMD_READ_SIG:
+                sig = self.dev.signature & 0xffff
+                self.output += bytes([sig >> 8, sig & 0xff])
+
+    def _transfer(self, mode, pc, bp):
+        if mode == RW_MODE_READ_REGS:
+            self.output += self.data[pc:bp]
+        elif mode == RW_MODE_WRITE_REGS:
+            for i in range(pc, bp):
+                self.data[i] = yield
+        elif mode in (RW_MODE_READ_SRAM, RW_MODE_READ_FLASH):
+            mem = self.flash if mode == RW_MODE_READ_FLASH else self.data
+            z = self._z()
+
+            for i in range((bp - pc) // 2):
+                self.output.append(mem[(z + i) % len(mem)])
+
+            self._set_z(z + (bp - pc) // 2)
+        elif mode == RW_MODE_WRITE_SRAM:
+            z = self._z()
+
+            for i in range((bp - pc) // 2):
+                self.data[z + i] = yield
+
+            self._set_z(z + (bp - pc) // 2)
+        else:
+            raise DWException("Simulator: unsupported read/write mode 0x{:02x}".format(mode))
+
+    # CPU
+
+    def _execute(self, op):
+        d = self.data
+
+        if op == 0x0000:                  # nop
+            pass
+        elif op & 0xff00 == 0x0100:       # movw
+            rd = ((op >> 4) & 0x0f) * 2
+            rr = (op & 0x0f) * 2
+            d[rd:rd + 2] = d[rr:rr + 2]
+        elif op & 0xec00 == 0x0c00:       # add/adc
+            rd = (op >> 4) & 0x1f
+            sreg = self._io_addr(SREG)
+            value = d[rd] + d[(op & 0x0f) | ((op >> 5) & 0x10)]
+            if op & 0x1000:
+                value += d[sreg] & 0x01
+            d[rd] = value & 0xff
+            d[sreg] = (d[sreg] & 0xfe) | (value >> 8)
+        elif op & 0xfc00 == 0x2c00:       # mov
+            d[(op >> 4) & 0x1f] = d[(op & 0x0f) | ((op >> 5) & 0x10)]
+        elif op & 0xf000 == 0xe000:       # ldi
+            d[16 + ((op >> 4) & 0x0f)] = ((op >> 4) & 0xf0) | (op & 0x0f)
+        elif op & 0xff00 == 0x9600:       # adiw
+            rd = 24 + ((op >> 4) & 0x03) * 2
+            value = (d[rd] | (d[rd + 1] << 8)) + ((op & 0x0f) | ((op >> 2) & 0x30))
+            d[rd] = value & 0xff
+            d[rd + 1] = (value >> 8) & 0xff
+        elif op & 0xf000 == 0xb000:       # in/out
+            addr = (op & 0x0f) | ((op >> 5) & 0x30)
+            reg = (op >> 4) & 0x1f
+
+            if op & 0x0800:
+                self._io_write(addr, d[reg])
+            else:
+                d[reg] = yield from self._io_read(addr)
+        elif op & 0xff00 == 0x9a00:       # sbi
+            addr = (op >> 3) & 0x1f
+            self._io_write(addr, self.data[self._io_addr(addr)] | (1 << (op & 0x07)))
+        elif op == 0x95c8:                # lpm
+            self._lpm()
+        elif op & 0xfe0f == 0x9007:       # elpm Rd, Z+
+            z = self._rampz_z()
+            d[(op >> 4) & 0x1f] = self.flash[z % len(self.flash)]
+            self._set_rampz_z(z + 1)
+        elif op == 0x95e8:                # spm
+            self._spm()
+        else:
+            raise DWException("Simulator: unsupported instruction 0x{:04x}".format(op))
+
+    def _io_read(self, addr):
+        if addr == self.dev.reg_dwdr:
+            # reading DWDR receives the next byte from the host
+            return (yield)
+
+        if addr == self.dev.reg_spmcsr:
+            return self.spmcsr
+
+        return self.data[self._io_addr(addr)]
+
+    def _io_write(self, addr, value):
+        if addr == self.dev.reg_dwdr:
+            self.output.append(value)
+        elif addr == self.dev.reg_spmcsr:
+            self.spmcsr = value
+        elif addr == self.dev.reg_eecr:
+            self._eecr(value)
+        else:
+            self.data[self._io_addr(addr)] = value
+
+    def _eecr(self, value):
+        eecr = self._io_addr(self.dev.reg_eecr)
+
+        eear = self.data[eecr + 2]
+        if self.dev.eeprom_size > 0x100:
+            eear |= self.data[eecr + 3] << 8
+
+        eear %= max(len(self.eeprom), 1)
+
+        if value & (1 << EERE):
+            self.data[eecr + 1] = self.eeprom[eear]
+
+        if value & (1 << EEPE):
+            if self.data[eecr] & (1 << EEMPE):
+                # erase and write, this doesn't halt the CPU so the programming time isn't modeled
+                self.eeprom[eear] = self.data[eecr + 1]
+                self.eeprom_writes += 1
+
+            value &= ~(1 << EEMPE)
+
+        # EERE and EEPE clear themselves
+        self.data[eecr] = value & ~((1 << EERE) | (1 << EEPE))
+
+    def _lpm(self):
+        z = self._z()
+
+        if self.spmcsr == RFLB | SPMEN:
+            self.data[0] = self.fuses[z] if z < 4 else 0xff
+        else:
+            self.data[0] = self.flash[z % len(self.flash)]
+
+        self.spmcsr = 0
+
+    def _spm(self):
+        pagesize = self.dev.flash_pagesize
+        z = self._rampz_z()
+        page = (z & ~(pagesize - 1)) % len(self.flash)
+
+        if self.spmcsr == SPMEN:
+            i = z & (pagesize - 1) & ~1
+            self.page_buffer[i:i + 2] = self.data[0:2]
+        elif self.spmcsr == PGERS | SPMEN:
+            self.flash[page:page + pagesize] = b"\xff" * pagesize
+            self.page_erases += 1
+            self._set_busy(self.timing.spm_erase_time)
+        elif self.spmcsr == PGWRT | SPMEN:
+            # programming can only clear bits
+            self.flash[page:page + pagesize] = bytes(
+                a & b for a, b in zip(self.flash[page:page + pagesize], self.page_buffer))
+            self.page_buffer[:] = b"\xff" * pagesize
+            self.page_writes += 1
+            self._set_busy(self.timing.spm_write_time)
+        elif self.spmcsr == CTPB | SPMEN:
+            self.page_buffer[:] = b"\xff" * pagesize
+
+        self.spmcsr = 0
+
+    def _set_busy(self, duration):
+        self.busy_until = self._now + duration * self.timing.time_scale
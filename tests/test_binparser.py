@@ -0,0 +1,73 @@
+import io
+import pytest
+from binparser import parse_hex, write_hex, split_into_pages, MemoryImage
+from debugwire import DWException
+from devices import find_device
+
+def hex_file(*lines):
+    return io.BytesIO(b"".join(line.encode("ascii") + b"\r\n" for line in lines))
+
+def test_parse_hex_data():
+    mem = parse_hex(hex_file(":0400100001020304E2", ":00000001FF"))
+
+    assert mem.segments() == [(0x10, b"\x01\x02\x03\x04")]
+
+def test_parse_hex_checksum_zero():
+    # 01 + 00 + 03 + 00 + FC wraps to exactly 0x100
+    mem = parse_hex(hex_file(":01000300FC00", ":00000001FF"))
+
+    assert mem.segments() == [(3, b"\xfc")]
+
+def test_parse_hex_bad_checksum():
+    with pytest.raises(DWException):
+        parse_hex(hex_file(":01000300FC01"))
+
+def test_parse_hex_bad_length():
+    with pytest.raises(DWException):
+        parse_hex(hex_file(":02000300FC00"))
+
+def test_parse_hex_extended_segment_address():
+    mem = parse_hex(hex_file(":020000021000EC", ":020004001122C7", ":00000001FF"))
+
+    assert mem.segments() == [(0x10004, b"\x11\x22")]
+
+def test_parse_hex_extended_linear_address():
+    mem = parse_hex(hex_file(":020000040001F9", ":02000400AABB95", ":00000001FF"))
+
+    assert mem.segments() == [(0x10004, b"\xaa\xbb")]
+
+def test_parse_hex_stops_at_end_record():
+    mem = parse_hex(hex_file(":00000001FF", "garbage"))
+
+    assert len(mem) == 0
+
+def test_write_hex_round_trip_above_64k():
+    data = bytes(range(256)) * 2
+
+    f = io.BytesIO()
+    write_hex(f, data, 0xff00)
+    f.seek(0)
+
+    assert parse_hex(f).segments() == [(0xff00, data)]
+
+def test_split_into_pages():
+    dev = find_device("attiny85")
+
+    mem = MemoryImage()
+    mem.write(0, b"\x01\x02")
+    mem.write(dev.flash_pagesize * 3 + 1, b"\x03")
+
+    pages = split_into_pages(mem, dev)
+
+    assert [start for start, data in pages] == [0, dev.flash_pagesize * 3]
+    assert bytes(pages[0][1]) == b"\x01\x02" + bytes(dev.flash_pagesize - 2)
+    assert bytes(pages[1][1]) == b"\x00\x03" + bytes(dev.flash_pagesize - 2)
+
+def test_split_into_pages_too_large():
+    dev = find_device("attiny85")
+
+    mem = MemoryImage()
+    mem.write(dev.flash_size, b"\x00")
+
+    with pytest.raises(DWException):
+        split_into_pages(mem, dev)
@@ -0,0 +1,107 @@
+import pytest
+import avrasm as asm
+from debugwire import (DWException, CMD_RW, CMD_RW_MODE, CMD_SET_PC, CMD_SET_BP, CMD_GO, CMD_SET_IR,
+    CMD_STEP, RW_MODE_READ_FLASH, RW_MODE_WRITE_REGS, SYNC_BREAK, rw_cmd, write_regs_cmd, exec_cmd,
+    load_word_code, load_template, needs_erase, page_write_cmds, page_write_check, page_stream)
+from devices import find_device
+
+# attiny85 loads data through DWDR, at90can128 with ldi and has RAMPZ
+DEVICES = ["attiny85", "at90can128"]
+
+def page_data(dev, seed=1):
+    return bytes((i * 7 + seed) & 0xff for i in range(dev.flash_pagesize))
+
+def test_asm_encoding():
+    assert asm.ldi(29, 0) == 0xe0d0
+    assert asm.ldi(16, 0xa5) == 0xea05
+    assert asm.movw(30, 24) == 0x01fc
+    assert asm.add(20, 30) == 0x0f4e
+    assert asm.adc(21, 31) == 0x1f5f
+    assert asm.adiw(30, 2) == 0x9632
+    assert asm.out(0x37, 28) == 0xbfc7
+    assert asm.in_(0x22, 0) == 0xb402
+    assert asm.spm() == 0x95e8
+
+def test_rw_cmd():
+    assert rw_cmd(RW_MODE_READ_FLASH, 0, 0x100) == bytes([
+        CMD_RW, CMD_RW_MODE, RW_MODE_READ_FLASH, CMD_SET_PC, 0, 0, CMD_SET_BP, 1, 0, CMD_GO])
+
+def test_write_regs_cmd():
+    assert write_regs_cmd(30, [0x34, 0x12]) == rw_cmd(RW_MODE_WRITE_REGS, 30, 32) + b"\x34\x12"
+
+def test_exec_cmd():
+    assert exec_cmd([asm.spm(), b"\x42"]) == bytes([CMD_SET_IR, 0x95, 0xe8, CMD_STEP, 0x42])
+
+@pytest.mark.parametrize("devid", DEVICES)
+def test_load_template_matches_per_word_code(devid):
+    dev = find_device(devid)
+    data = page_data(dev)
+
+    expected = b"".join(
+        exec_cmd(load_word_code(dev, data[i], data[i + 1])) for i in range(0, len(data), 2))
+
+    assert load_template(dev).fill(data) == expected
+
+@pytest.mark.parametrize("devid", DEVICES)
+@pytest.mark.parametrize("chunk_len", [2, 16, 64, 1024])
+def test_page_write_cmds_load(devid, chunk_len):
+    dev = find_device(devid)
+    data = page_data(dev)
+    template = load_template(dev)
+
+    cmds = page_write_cmds(dev, 0x100, data, chunk_len)
+
+    marker = exec_cmd([asm.ldi(29, 0)])
+    assert bytes(cmds.load[0][:len(marker)]) == marker
+
+    load = [bytes(cmds.load[0][len(marker):])] + [bytes(buf) for buf in cmds.load[1:]]
+
+    assert b"".join(load) == template.fill(data)
+    assert all(len(buf) <= max(2, chunk_len) // 2 * template.word_len for buf in load)
+
+def test_page_write_cmds_rampz():
+    dev = find_device("at90can128")
+
+    cmds = page_write_cmds(dev, 0x10100, page_data(dev), 16)
+
+    assert exec_cmd([asm.ldi(16, 1), asm.out(dev.reg_rampz, 16)]) in cmds.setup
+    assert cmds.setup.startswith(write_regs_cmd(26, [0x01, 0x03, 0x05, 0x11, 0x00, 0x01]))
+
+def test_page_write_cmds_erase_and_write():
+    dev = find_device("attiny85")
+
+    cmds = page_write_cmds(dev, 0, page_data(dev), 16)
+
+    assert cmds.erase == exec_cmd([asm.out(dev.reg_spmcsr, 27), asm.spm()])
+    assert cmds.write.endswith(exec_cmd([asm.movw(30, 24), asm.out(dev.reg_spmcsr, 28), asm.spm()]))
+
+def test_page_write_check():
+    dev = find_device("attiny85")
+
+    assert page_write_check(dev, []) == b"\x00\x00"
+    assert page_write_check(dev, [0, 0x40]) == bytes([0xc0, 0x00])
+
+    # the sum wraps at 16 bits
+    dev = find_device("at90can128")
+    assert page_write_check(dev, [0xff00, 0xff00]) == bytes([0x00, 0x00])
+
+def test_page_stream():
+    dev = find_device("attiny85")
+    pages = [(0, page_data(dev)), (0x40, page_data(dev, 2))]
+
+    stream = page_stream(dev, pages, 16, no_erase={0x40})
+
+    assert [(seg.page, seg.done, seg.sync) for seg in stream] == [
+        (0, False, SYNC_BREAK), (0, True, SYNC_BREAK), (1, True, SYNC_BREAK)]
+
+    timed = page_stream(dev, pages, 16, timed=True)
+
+    assert all(seg.sync > 0 for seg in timed)
+
+    with pytest.raises(DWException):
+        page_stream(dev, [(1, page_data(dev))], 16)
+
+def test_needs_erase():
+    assert not needs_erase(b"\xff\xff", b"\x12\x34")
+    assert not needs_erase(b"\x0f\xf0", b"\x0a\x50")
+    assert needs_erase(b"\x0f\xf0", b"\x1a\x50")
@@ -0,0 +1,77 @@
+import pytest
+from hoststate import FlashCache, LinkCache, ImageCache, load_state
+from devices import find_device
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+
+    return tmp_path / "dwprog"
+
+def test_flash_cache_round_trip():
+    cache = FlashCache("/dev/ttyUSB0", 0x930b, "board1")
+    cache.update([(0, b"\x01" * 64), (0x40, b"\x02" * 64)])
+    cache.save()
+
+    # keys are strings in JSON and ints again after loading
+    assert set(load_state(FlashCache.FILENAME)["/dev/ttyUSB0/930b/board1"]) == {"0", "64"}
+
+    loaded = FlashCache("/dev/ttyUSB0", 0x930b, "board1")
+    loaded.load()
+
+    assert loaded.is_current(0, b"\x01" * 64)
+    assert not loaded.is_current(0x40, b"\x03" * 64)
+
+    other = FlashCache("/dev/ttyUSB0", 0x930b, "board2")
+    other.load()
+
+    assert other.pages == {}
+
+def test_flash_cache_read_only():
+    cache = FlashCache("/dev/ttyUSB0", 0x930b, "board1", read_only=True)
+    cache.update([(0, b"\x01" * 64)])
+    cache.save()
+
+    assert load_state(FlashCache.FILENAME) is None
+
+def test_flash_cache_spot_check():
+    cache = FlashCache("/dev/ttyUSB0", 0x930b, "board1")
+    pages = {start: bytes([start // 64]) * 64 for start in range(0, 0x400, 0x40)}
+    cache.update(pages.items())
+
+    assert cache.spot_check(pages.get)
+    assert not cache.spot_check(lambda start: b"\xff" * 64)
+
+def test_link_cache(state_dir):
+    cache = LinkCache()
+    cache.update("serial:/dev/ttyUSB0", baudrate=62500)
+
+    assert LinkCache().get("serial:/dev/ttyUSB0") == {"baudrate": 62500}
+
+    read_only = LinkCache(read_only=True)
+    read_only.update("serial:/dev/ttyUSB0", baudrate=7812)
+
+    assert LinkCache().get("serial:/dev/ttyUSB0") == {"baudrate": 62500}
+
+def test_image_cache_round_trip():
+    dev = find_device("attiny85")
+    pages = [(0, bytes(range(64))), (0x80, bytes(64))]
+
+    ImageCache(b"file contents", "hex", dev).save(pages)
+
+    loaded = ImageCache(b"file contents", "hex", dev).load()
+    assert [(start, bytes(data)) for start, data in loaded] == pages
+
+    assert ImageCache(b"other contents", "hex", dev).load() is None
+    assert ImageCache(b"file contents", "hex", find_device("atmega328p")).load() is None
+
+def test_image_cache_corrupt():
+    dev = find_device("attiny85")
+    cache = ImageCache(b"file contents", "hex", dev)
+    cache.save([(0, bytes(range(64)))])
+
+    with open(cache.path, "r+b") as f:
+        f.seek(-1, 2)
+        f.write(b"\xff")
+
+    assert cache.load() is None
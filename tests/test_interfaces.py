@@ -0,0 +1,31 @@
+import pytest
+from interfaces import (SAMPLE_BAUDRATES, sync_byte_bounds, baudrate_candidates, pick_baudrate,
+    UART_TOLERANCE)
+from simulator import sample_sync_byte
+
+@pytest.mark.parametrize("baudrate", [7812, 15625, 62500, 125000])
+def test_sync_byte_bounds_contain_target_rate(baudrate):
+    # like _detect_baudrate, the fastest sample rate that sees anything is used
+    bounds = next(b for b in (
+        sync_byte_bounds(sample_sync_byte(baudrate, sample_baudrate), sample_baudrate)
+        for sample_baudrate in SAMPLE_BAUDRATES) if b)
+
+    assert bounds[0] <= baudrate <= bounds[1]
+
+    candidates = baudrate_candidates(*bounds)
+    assert candidates[0] <= baudrate <= candidates[-1]
+
+def test_baudrate_candidates_cover_bounds():
+    rates = baudrate_candidates(60000, 65000)
+
+    assert rates == sorted(rates)
+    assert rates[0] <= 60000 / UART_TOLERANCE + 1
+    assert rates[-1] >= 65000 * UART_TOLERANCE
+
+@pytest.mark.parametrize("rates, expected", [
+    ([61000, 62000, 63000, 64000], 62500),   # 8 MHz
+    ([7700, 7800, 7900], 7812),              # 1 MHz, rounded down like the target
+    ([40000, 41000], 40497),                 # no common clock nearby
+])
+def test_pick_baudrate(rates, expected):
+    assert pick_baudrate(rates) == expected
@@ -0,0 +1,111 @@
+import asyncio
+import random
+import pytest
+from aiodebugwire import AsyncDebugWire, AsyncInterfaceAdapter
+from debugwire import DebugWire
+from devices import find_device
+from interfaces import SimInterface, ReplayInterface
+from metrics import Metrics
+from simulator import SimTiming
+from wiretrace import TraceRecorder, TracingInterface
+
+def random_pages(dev, starts, seed=0):
+    rng = random.Random(seed)
+
+    return [(start, bytes(rng.getrandbits(8) for i in range(dev.flash_pagesize))) for start in starts]
+
+def open_sim(devid, timing=None, **kwargs):
+    iface = SimInterface(devid, 62500, timing=timing or SimTiming(time_scale=0))
+    dw = DebugWire(iface, **kwargs)
+    dw.open()
+
+    return iface, dw
+
+@pytest.mark.parametrize("timed_sync", [False, True])
+@pytest.mark.parametrize("devid, first_page", [("attiny85", 0), ("at90can128", 0xfe00)])
+def test_write_and_verify_pages(devid, first_page, timed_sync):
+    dev = find_device(devid)
+    iface, dw = open_sim(devid, timed_sync=timed_sync)
+
+    pages = random_pages(dev, range(first_page, first_page + 4 * dev.flash_pagesize,
+        dev.flash_pagesize))
+
+    dw.write_flash_pages(dev, pages)
+
+    assert dw.verify_pages(pages, dev=dev) is None
+    assert dw.read_flash(first_page, len(pages) * dev.flash_pagesize, dev=dev) == \
+        b"".join(data for start, data in pages)
+
+    # a page that changed behind our back is found
+    iface.target.flash[pages[2][0]] ^= 0xff
+    assert dw.verify_pages(pages, dev=dev) == pages[2][0]
+
+    dw.close()
+
+def test_write_without_erase():
+    dev = find_device("attiny85")
+    iface, dw = open_sim("attiny85")
+
+    dw.write_flash_pages(dev, [(0, b"\x0f" * dev.flash_pagesize)])
+    dw.write_flash_pages(dev, [(0, b"\x05" * dev.flash_pagesize)], no_erase={0})
+
+    assert dw.read_flash(0, dev.flash_pagesize) == b"\x05" * dev.flash_pagesize
+    assert iface.target.page_erases == 1
+
+def test_timed_sync_rewrites_missed_pages():
+    # the target takes twice as long as the datasheet says, so it misses the start of each load
+    dev = find_device("attiny85")
+    timing = SimTiming(spm_erase_time=dev.spm_erase_time * 2, spm_write_time=dev.spm_write_time * 2)
+    metrics = Metrics()
+    iface, dw = open_sim("attiny85", timing, timed_sync=True, metrics=metrics)
+
+    pages = random_pages(dev, range(0, 4 * dev.flash_pagesize, dev.flash_pagesize))
+
+    dw.write_flash_pages(dev, pages)
+
+    assert iface.target.lost
+    assert metrics.counters["sync_fallbacks"]
+    assert dw.verify_pages(pages) is None
+
+def test_async_write_and_read():
+    dev = find_device("at90can128")
+    iface = SimInterface("at90can128", 62500, timing=SimTiming(time_scale=0))
+    pages = random_pages(dev, [0xff00, 0x10000])
+
+    async def run():
+        async with AsyncDebugWire(AsyncInterfaceAdapter(iface), timed_sync=True) as dw:
+            await dw.open()
+
+            for start, data in pages:
+                await dw.write_flash_page(dev, start, data)
+
+            return await dw.read_flash(0xff00, 0x200, dev)
+
+    assert asyncio.run(run()) == b"".join(data for start, data in pages)
+
+def test_replay_uses_recorded_host_state(tmp_path):
+    dev = find_device("attiny85")
+    trace = str(tmp_path / "flash.trace")
+    pages = random_pages(dev, [0, 0x40])
+
+    def flash(iface, lookup):
+        dw = DebugWire(iface)
+        dw.open()
+        dw.chunk_len = iface.host_state("chunk_len", lambda: lookup(dw))
+        dw.write_flash_pages(dev, pages)
+        dw.close()
+
+        return dw.chunk_len
+
+    def calibrate(dw):
+        # talks to the target while the host state is looked up
+        return dw.calibrate_chunk_len(dev, chunk_lens=(8, 16), total=16, repeats=1)
+
+    def fail(dw):
+        raise AssertionError("host state looked up during replay")
+
+    sim = SimInterface("attiny85", 62500, timing=SimTiming(time_scale=0))
+    chunk_len = flash(TracingInterface(sim, TraceRecorder(trace)), calibrate)
+
+    # the replay uses the recorded value and skips what the calibration sent
+    assert flash(ReplayInterface(trace, None), fail) == chunk_len
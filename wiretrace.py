@@ -0,0 +1,197 @@
+# Binary traces of everything DebugWire asks an interface to do, for reproducing problems and
+# measuring host side changes without hardware. A trace is recorded by wrapping an interface in
+# TracingInterface and played back with ReplayInterface from interfaces.py.
+#
+# A trace file starts with MAGIC and a length-prefixed JSON header, followed by events. Each event
+# is a fixed size record of its type, the time since the start of the recording in microseconds
+# and the payload length, followed by the payload.
+
+import json
+import random
+import struct
+import time
+from debugwire import DWException
+
+MAGIC = b"DWTR\x01"
+
+# type, microseconds, payload length
+EVENT = struct.Struct("<BQI")
+
+# payload is JSON with the properties of the opened interface
+EV_OPEN = 1
+# payload is the data that was written, after the echo was checked
+EV_WRITE = 2
+# payload is the data that was read
+EV_READ = 3
+# payload is the sync response
+EV_BREAK = 4
+EV_FLUSH = 5
+EV_DISCARD = 6
+# payload is the new rate as a 32-bit integer
+EV_BAUDRATE = 7
+EV_CLOSE = 8
+# the preceding call failed, payload is the error message
+EV_ERROR = 9
+# payload is JSON with the name and value of host state that a decision was based on, and the
+# number of preceding events that were recorded while looking it up
+EV_STATE = 10
+
+EVENT_NAMES = {
+    EV_OPEN: "open",
+    EV_WRITE: "write",
+    EV_READ: "read",
+    EV_BREAK: "break",
+    EV_FLUSH: "flush",
+    EV_DISCARD: "discard",
+    EV_BAUDRATE: "baudrate",
+    EV_CLOSE: "close",
+    EV_ERROR: "error",
+    EV_STATE: "state",
+}
+
+BAUDRATE = struct.Struct("<I")
+
+# Recorded events are buffered in memory and written out in blocks of this size
+FLUSH_LEN = 0x10000
+
+class TraceRecorder:
+    """Writes events to a trace file."""
+
+    def __init__(self, filename):
+        self.f = open(filename, "wb")
+        self.buf = bytearray()
+        self.start = time.monotonic()
+
+        # number of events recorded so far
+        self.events = 0
+
+        # flash cache spot checks pick pages at random, so replays need to make the same choices
+        self.seed = random.randrange(1 << 32)
+        random.seed(self.seed)
+
+        header = json.dumps({"seed": self.seed, "time": time.time()}).encode("utf-8")
+
+        self.f.write(MAGIC + struct.pack("<I", len(header)) + header)
+
+    def record(self, event, payload=b""):
+        self.buf += EVENT.pack(event, int((time.monotonic() - self.start) * 1e6), len(payload))
+        self.buf += payload
+        self.events += 1
+
+        if len(self.buf) >= FLUSH_LEN:
+            self.flush()
+
+    def flush(self):
+        self.f.write(self.buf)
+        self.buf.clear()
+
+    def close(self):
+        if self.f:
+            self.flush()
+            self.f.close()
+            self.f = None
+
+class Trace:
+    """A trace file loaded into memory. events is a list of (type, microseconds, payload)."""
+
+    def __init__(self, filename):
+        with open(filename, "rb") as f:
+            buf = memoryview(f.read())
+
+        if bytes(buf[:len(MAGIC)]) != MAGIC:
+            raise DWException("{} is not a trace file.".format(filename))
+
+        pos = len(MAGIC) + 4
+        header_len, = struct.unpack_from("<I", buf, len(MAGIC))
+
+        self.header = json.loads(bytes(buf[pos:pos + header_len]).decode("utf-8"))
+        pos += header_len
+
+        self.events = []
+
+        while pos + EVENT.size <= len(buf):
+            event, usec, length = EVENT.unpack_from(buf, pos)
+            pos += EVENT.size
+
+            self.events.append((event, usec, bytes(buf[pos:pos + length])))
+            pos += length
+
+class TracingInterface:
+    """Wraps an interface and records every call that DebugWire makes to it."""
+
+    def __init__(self, iface, recorder):
+        self.iface = iface
+        self.recorder = recorder
+
+    def __getattr__(self, name):
+        return getattr(self.iface, name)
+
+    def _call(self, event, func, *args, payload=None):
+        # the payload is the result of the call unless given
+        try:
+            result = func(*args)
+        except DWException as ex:
+            if payload is not None:
+                self.recorder.record(event, payload)
+
+            self.recorder.record(EV_ERROR, str(ex).encode("utf-8"))
+            raise
+
+        self.recorder.record(event, result if payload is None else payload)
+
+        return result
+
+    def open(self):
+        try:
+            baudrate = self.iface.open()
+        except DWException as ex:
+            self.recorder.record(EV_ERROR, str(ex).encode("utf-8"))
+            raise
+
+        self.recorder.record(EV_OPEN, json.dumps({
+            "port": self.iface.port,
+            "adapter_id": self.iface.adapter_id,
+            "max_baudrate": self.iface.max_baudrate,
+            "baudrate": baudrate,
+        }).encode("utf-8"))
+
+        return baudrate
+
+    def close(self):
+        try:
+            self.iface.close()
+        finally:
+            self.recorder.record(EV_CLOSE)
+            self.recorder.close()
+
+    def write(self, data):
+        data = bytes(data)
+
+        self._call(EV_WRITE, self.iface.write, data, payload=data)
+
+    def read(self, nread):
+        return self._call(EV_READ, self.iface.read, nread)
+
+    def send_break(self):
+        return self._call(EV_BREAK, self.iface.send_break)
+
+    def flush(self):
+        self._call(EV_FLUSH, self.iface.flush, payload=b"")
+
+    def discard_input(self):
+        self._call(EV_DISCARD, self.iface.discard_input, payload=b"")
+
+    def set_baudrate(self, baudrate):
+        self._call(EV_BAUDRATE, self.iface.set_baudrate, baudrate,
+            payload=BAUDRATE.pack(baudrate))
+
+    def host_state(self, name, lookup):
+        # the lookup may talk to the target itself, e.g. to calibrate, which a replay skips
+        first = self.recorder.events
+
+        value = self.iface.host_state(name, lookup)
+
+        self.recorder.record(EV_STATE, json.dumps({
+            "name": name, "value": value, "skip": self.recorder.events - first}).encode("utf-8"))
+
+        return value